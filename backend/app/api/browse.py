@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+from app.services import taxonomy_service
+from app.services.vector_store import get_vector_service
+
+router = APIRouter()
+
+class BrowseVideoItem(BaseModel):
+    yt_id: str = Field(..., example="abc123")
+    title: str = Field(..., example="Exemplo de vídeo")
+    description: str = Field("", example="Descrição do vídeo de exemplo.")
+    topics: List[str] = Field(default_factory=list, example=["entertainment-reality_tv-big_brother"])
+    view_count: Optional[int] = Field(None, example=125000)
+
+class VideosByTopicResponse(BaseModel):
+    videos: List[BrowseVideoItem]
+    total: int
+    next_cursor: Optional[str] = Field(None, description="Cursor para a próxima página (null na última)")
+
+@router.get("/videos_by_topic", response_model=VideosByTopicResponse, tags=["Tópicos"])
+def videos_by_topic(
+    topic_id: str = Query(..., description="ID do nó (ex.: entertainment-reality_tv) ou caminho (Entertainment > reality tv)"),
+    page: int = Query(1, ge=1, description="Usado apenas quando não há cursor"),
+    limit: int = Query(12, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    sort: Literal["default", "views"] = Query("default", description="Ordem: índice (default) ou mais vistos")
+):
+    """
+    GET /videos_by_topic — navega pelos vídeos de um tópico (incluindo sub-tópicos) com paginação por cursor,
+    de custo constante por página. `page` é mantido por compatibilidade e avança o cursor quando não informado.
+    """
+    node_id = taxonomy_service.resolve_node_id(topic_id)
+    vector_service = get_vector_service()
+    if cursor:
+        try:
+            vector_service.parse_cursor(cursor, sort)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    skip = 0 if cursor else (page - 1) * limit
+    result = vector_service.browse_by_topic(node_id, limit=limit, cursor=cursor, sort=sort, skip=skip)
+    node = taxonomy_service.get_node_index().get(node_id)
+    total = node["count"] if node and node.get("count") is not None else vector_service.count_by_topic(node_id)
+    return VideosByTopicResponse(videos=result["videos"], total=total, next_cursor=result["next_cursor"])
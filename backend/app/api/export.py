@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
+from app.core import config
+from app.api.taxonomy_endpoints import verify_api_key
+from app.services import taxonomy_service
+from app.services.export_service import EXPORT_FORMATS, export_ndjson, export_parquet
+from app.services.vector_store import get_vector_service
+
+router = APIRouter()
+
+@router.get("/export", tags=["Exportação"])
+def export_points(
+    format: Literal["ndjson", "parquet"] = Query("ndjson", description="ndjson (uma linha JSON por vídeo) ou parquet"),
+    fields: Optional[str] = Query(None, description="Campos do payload separados por vírgula, ex.: yt_id,title,view_count (padrão: todos)"),
+    topic_id: Optional[str] = Query(None, description="Só os vídeos deste nó da taxonomia (e descendentes): ID ou caminho"),
+    vectors: bool = Query(False, description="Incluir os vetores (float32; base64 no NDJSON, binário no Parquet)"),
+    batch_size: int = Query(None, ge=1, le=10000, description="Pontos por página do scroll"),
+    _: None = Depends(verify_api_key)
+):
+    """
+    GET /export — todos os pontos indexados em streaming (scroll paginado, memória constante no servidor),
+    com os campos escolhidos do payload, opcionalmente filtrados por tópico. Requer X-Internal-API-Key.
+    """
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    if fields is not None and not field_list:
+        raise HTTPException(status_code=400, detail="fields must name at least one payload field")
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+    node_id = taxonomy_service.resolve_node_id(topic_id) if topic_id else None
+    batches = get_vector_service().iter_points(
+        topic_filter=node_id,
+        fields=field_list,
+        with_vectors=vectors,
+        batch_size=batch_size or config.EXPORT_BATCH_SIZE
+    )
+    if format == "parquet":
+        body = export_parquet(batches, field_list, with_vectors=vectors)
+    else:
+        body = export_ndjson(batches, field_list)
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="videos.{extension}"'}
+    )
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.services.readiness import get_readiness
+
+router = APIRouter()
+
+@router.get("/healthz", include_in_schema=False)
+def healthz():
+    """Liveness: o processo está de pé e o event loop responde (não verifica dependências)."""
+    return {"status": "ok"}
+
+@router.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: 200 só com a taxonomia carregada, o backend vetorial acessível e os caches aquecidos."""
+    ready, report = await get_readiness().probe()
+    return JSONResponse(status_code=200 if ready else 503, content=report)
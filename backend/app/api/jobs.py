@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Path
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from app.services.job_service import get_job_service
+
+router = APIRouter()
+
+class JobError(BaseModel):
+    chunk: Optional[int] = None
+    yt_id: Optional[str] = None
+    error: str
+
+class JobStatus(BaseModel):
+    job_id: str = Field(..., example="3f2c9a0e6b7d4c1e8a5f0b2d9c7e6a41")
+    filename: str = Field(..., example="videos.csv")
+    status: str = Field(..., example="running", description="queued, running, completed, failed ou cancelled")
+    stage: Optional[str] = Field(None, example="extract", description="parse, extract, embed ou index")
+    rows_processed: int = Field(..., example=400)
+    rows_indexed: int = Field(..., example=396)
+    rows_failed: int = Field(..., example=4)
+    chunks_done: int = Field(..., example=2)
+    elapsed: float = Field(..., example=38.2)
+    rows_per_sec: float = Field(..., example=10.5)
+    error_count: int = Field(..., example=4)
+    errors: List[JobError] = Field(default_factory=list)
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+@router.get("/jobs", response_model=List[JobStatus], tags=["Jobs"])
+def list_jobs():
+    """GET /jobs — jobs de ingestão desta instância, mais recentes primeiro."""
+    return [job.to_dict() for job in get_job_service().list_jobs()]
+
+@router.get("/jobs/{job_id}", response_model=JobStatus, tags=["Jobs"])
+def get_job(job_id: str = Path(..., description="ID retornado por /upload-csv")):
+    """GET /jobs/{job_id} — progresso, vazão e erros de um job."""
+    job = get_job_service().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@router.delete("/jobs/{job_id}", response_model=JobStatus, tags=["Jobs"])
+def cancel_job(job_id: str = Path(..., description="ID retornado por /upload-csv")):
+    """DELETE /jobs/{job_id} — cancela o job (imediatamente se na fila; ao fim do bloco atual se em execução)."""
+    job = get_job_service().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
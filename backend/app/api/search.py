@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Query, Body, Request
+import asyncio
+from fastapi import APIRouter, Query, Body, Request, HTTPException
 from app.models.search import SearchRequest
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 from fastapi.responses import JSONResponse
-from app.services.qdrant_service import QdrantService
-import os
+from app.core import config
+from app.core.responses import trusted_response
+from app.services.vector_store import get_vector_service
+from app.services.search_cache import search_cache
+from app.services.facet_service import compute_topic_facets
+from app.services.search_filters import metadata_conditions
+from app.services.single_flight import SingleFlight
+from app.services.query_log import get_query_log
+from app.services.admission import AdmissionRejected, client_id, get_admission_controller
+from app.services.embedding_service import EmbeddingUnavailable
+from app.core.metrics import SEARCH_ADMISSION, SEARCH_STAGE_LATENCY
 
 router = APIRouter()
 
@@ -15,15 +25,18 @@ class SearchResultItem(BaseModel):
     description: str = Field(..., example="Tutorial completo de FastAPI para APIs modernas.")
     topics_path: List[str] = Field(..., example=["Tecnologia > Programação > Python"])
 
+class FacetCount(BaseModel):
+    id: str = Field(..., example="entertainment-reality_tv")
+    name: str = Field(..., example="reality tv")
+    count: int = Field(..., example=42)
+
 class SearchResponse(BaseModel):
     results: List[SearchResultItem]
     total: int
+    facets: Optional[Dict[str, List[FacetCount]]] = None
 
-qdrant_service = QdrantService(
-    host="qdrant",
-    port=6333,
-    collection_name=os.environ.get("QDRANT_COLLECTION_NAME", "videos_viewstats")
-)
+search_flights = SingleFlight("search", timeout=config.SEARCH_COALESCE_TIMEOUT)
+SEARCH_TOP_K = 1000  # Buscar muitos para paginar manualmente
 
 @router.get("/search", response_model=SearchResponse)
 def search_get(
@@ -51,16 +64,73 @@ def search_get(
     ]
     return SearchResponse(results=dummy_results[:limit], total=2)
 
+def _is_semantic(request: SearchRequest) -> bool:
+    return bool(request.query and request.query.strip())
+
+async def _search_and_cache(cache_key: tuple, request: SearchRequest, deadline: float = None) -> list:
+    """
+    Embedding + busca de uma chave; executada uma vez para todas as requisições idênticas em andamento.
+    Buscas com texto ocupam uma vaga do controle de admissão (limite global de chamadas à API de embeddings).
+    """
+    conditions = metadata_conditions(request.duration, request.upload_date, request.min_views)
+    if _is_semantic(request):
+        async with get_admission_controller().slot(deadline):
+            results = await get_vector_service().search_vectors(request.query, request.topic_filter, SEARCH_TOP_K, conditions)
+    else:
+        results = await get_vector_service().search_vectors(request.query, request.topic_filter, SEARCH_TOP_K, conditions)
+    search_cache.set(cache_key, results)
+    return results
+
+async def _lexical_search(request: SearchRequest) -> list:
+    """Modo degradado: termos da consulta nos títulos, sem embedding (o resultado não vai para o cache)."""
+    SEARCH_ADMISSION.inc(result="degraded")
+    conditions = metadata_conditions(request.duration, request.upload_date, request.min_views)
+    return await asyncio.to_thread(get_vector_service().lexical_search, request.query, request.topic_filter, SEARCH_TOP_K, conditions)
+
+async def warm_search(query: str, topic_filter: Optional[str] = None) -> bool:
+    """Coloca no cache a busca sem filtros de metadados (aquecimento); False se ela já estava lá."""
+    request = SearchRequest(query=query, topic_filter=topic_filter)
+    cache_key = search_cache.make_key(request.query, request.topic_filter, None, None, None)
+    if search_cache.get(cache_key) is not None:
+        return False
+    await search_flights.do(cache_key, lambda: _search_and_cache(cache_key, request))
+    return True
+
 @router.post("/search", response_model=SearchResponse)
-async def search_post(request: SearchRequest = Body(...), page: int = Query(1), limit: int = Query(10)):
-    """POST /search (busca real no Qdrant, assíncrono, com paginação)."""
-    results = await qdrant_service.search_vectors(
-        query=request.query,
-        topic_filter=request.topic_filter,
-        top_k=1000  # Buscar muitos para paginar manualmente
-    )
-    total = len(results)
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_results = results[start:end]
-    return SearchResponse(results=paginated_results, total=total) 
\ No newline at end of file
+async def search_post(http_request: Request, request: SearchRequest = Body(...), page: int = Query(1), limit: int = Query(10)):
+    """
+    POST /search (busca real no Qdrant, assíncrono, com paginação e facetas opcionais).
+    Buscas fora do cache passam pelo controle de admissão: 429 acima do limite do cliente; sem vaga ou com a
+    API de embeddings indisponível, busca lexical nos títulos (cabeçalho X-Search-Mode: lexical) ou 503.
+    """
+    if page == 1:
+        get_query_log().record(request.query, request.topic_filter)
+    cache_key = search_cache.make_key(request.query, request.topic_filter, request.duration, request.upload_date, request.min_views)
+    results = search_cache.get(cache_key)
+    degraded = False
+    if results is None:
+        controller = get_admission_controller()
+        try:
+            deadline = await controller.acquire_token(client_id(http_request)) if _is_semantic(request) else None
+            results = await search_flights.do(cache_key, lambda: _search_and_cache(cache_key, request, deadline))
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Search timed out")
+        except (AdmissionRejected, EmbeddingUnavailable) as e:
+            if isinstance(e, EmbeddingUnavailable):
+                controller.mark_exhausted()
+                e = AdmissionRejected(503, "Embedding service unavailable", controller.backoff)
+            if e.status_code == 429 or not config.SEARCH_DEGRADED_MODE:
+                raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+            results = await _lexical_search(request)
+            degraded = True
+    with SEARCH_STAGE_LATENCY.time(stage="shape"):
+        total = len(results)
+        start = (page - 1) * limit
+        end = start + limit
+        paginated_results = results[start:end]
+        facets = compute_topic_facets(results) if request.facets else None
+    with SEARCH_STAGE_LATENCY.time(stage="serialize"):
+        response = trusted_response({"results": paginated_results, "total": total, "facets": facets}, SearchResponse)
+    if degraded:
+        response.headers["X-Search-Mode"] = "lexical"
+    return response
\ No newline at end of file
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
+from app.core.responses import FastJSONResponse
 import os, json
 from app.services import taxonomy_service
+from app.core.metrics import TAXONOMY_SERVE_LATENCY
 
 router = APIRouter()
 
@@ -14,7 +16,9 @@ def verify_api_key(request: Request):
 
 @router.get("/taxonomy")
 def get_taxonomy():
-    return taxonomy_service.get_taxonomy()
+    # Bytes já serializados do snapshot atual: só a primeira requisição após uma atualização paga o JSON
+    with TAXONOMY_SERVE_LATENCY.time():
+        return FastJSONResponse(taxonomy_service.get_snapshot().to_json())
 
 @router.post("/taxonomy/upload")
 def upload_taxonomy(
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Path
+from fastapi import APIRouter, Path, HTTPException
 from fastapi.responses import JSONResponse
+from app.models.video import VideoIngestRequest, VideoIngestResponse
+from app.services.ingestion_service import get_ingestion_queue, IngestionQueueFull
 
 router = APIRouter()
 
@@ -52,4 +54,15 @@ def get_video(id: str = Path(..., description="ID do vídeo")):
             {"id": "t1", "startTime": 0, "endTime": 5, "text": "Hello and welcome to our first video about AI."}
         ]
     }
-    return JSONResponse(content=dummy_video) 
\ No newline at end of file
+    return JSONResponse(content=dummy_video) 
+
+@router.post("/video/ingest", response_model=VideoIngestResponse, tags=["Vídeo"])
+async def ingest_video(request: VideoIngestRequest):
+    """
+    POST /video/ingest — classifica um novo vídeo (LLM), mapeia os tópicos para a taxonomia canônica e o
+    indexa. As requisições são agrupadas em micro-lotes; com a fila cheia responde 503 com Retry-After.
+    """
+    try:
+        return await get_ingestion_queue().submit(request.model_dump())
+    except IngestionQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
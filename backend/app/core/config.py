@@ -1,4 +1,88 @@
 import os
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "SUA_CHAVE_AQUI")
-EMBEDDING_MODEL_OPENAI = os.getenv("EMBEDDING_MODEL_OPENAI", "text-embedding-3-small")
\ No newline at end of file
+EMBEDDING_MODEL_OPENAI = os.getenv("EMBEDDING_MODEL_OPENAI", "text-embedding-3-small")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", 1536))  # 1536 para text-embedding-3-small
+# Embeddings de consultas: as que chegam dentro da janela (s) viram uma única chamada, de até EMBEDDING_BATCH_MAX textos.
+# Janela 0 desliga o agrupamento (uma chamada por consulta)
+EMBEDDING_BATCH_WINDOW = float(os.getenv("EMBEDDING_BATCH_WINDOW", 0.005))
+EMBEDDING_BATCH_MAX = int(os.getenv("EMBEDDING_BATCH_MAX", 64))
+# Cache dos embeddings de consultas (o vetor de um texto não muda enquanto o modelo for o mesmo)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 4096))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", 86400))
+
+QDRANT_HOST = os.getenv("QDRANT_HOST", "qdrant")
+QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
+QDRANT_COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME", "videos_viewstats")
+
+# Backend de busca vetorial: "qdrant" (servidor) ou "local" (engine NumPy em processo)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
+LOCAL_VECTOR_DIR = os.getenv("LOCAL_VECTOR_DIR", "app/data/local_index")
+LOCAL_VECTOR_BLOCK_SIZE = int(os.getenv("LOCAL_VECTOR_BLOCK_SIZE", 16384))
+
+# Cache das listas de resultados de /search (paginação e facetas sem nova consulta ao Qdrant)
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 1024))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 300))
+# Buscas idênticas simultâneas compartilham um único embedding + busca; tempo máximo (s) de espera por ela
+SEARCH_COALESCE_TIMEOUT = float(os.getenv("SEARCH_COALESCE_TIMEOUT", 30))
+# Revalidar com os modelos Pydantic as respostas montadas a partir de dados internos (só para desenvolvimento)
+VALIDATE_RESPONSES = os.getenv("VALIDATE_RESPONSES", "false").lower() == "true"
+# Log das buscas mais frequentes (top-N em disco, contagens com meia-vida em segundos) e aquecimento dos caches
+# com as QUERY_WARMUP_TOP primeiras na inicialização, limitado a QUERY_WARMUP_BUDGET segundos
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", "app/data/query_log.json")
+QUERY_LOG_SIZE = int(os.getenv("QUERY_LOG_SIZE", 1000))
+QUERY_LOG_FLUSH_INTERVAL = float(os.getenv("QUERY_LOG_FLUSH_INTERVAL", 60))
+QUERY_LOG_HALF_LIFE = float(os.getenv("QUERY_LOG_HALF_LIFE", 86400))
+QUERY_WARMUP_TOP = int(os.getenv("QUERY_WARMUP_TOP", 200))
+QUERY_WARMUP_BUDGET = float(os.getenv("QUERY_WARMUP_BUDGET", 10))
+QUERY_WARMUP_CONCURRENCY = int(os.getenv("QUERY_WARMUP_CONCURRENCY", 4))
+
+# Controle de admissão das buscas que chamam a API de embeddings (consulta com texto fora do cache de resultados):
+# token bucket por cliente (buscas/s e rajada; 0 desliga), limite global de buscas simultâneas por worker e fila
+# com espera máxima (s) antes de responder 429/503. O cliente é identificado pelo cabeçalho RATE_LIMIT_CLIENT_HEADER
+# (ex.: X-Forwarded-For atrás de um proxy confiável) ou pelo IP da conexão
+SEARCH_RATE_LIMIT = float(os.getenv("SEARCH_RATE_LIMIT", 5))
+SEARCH_RATE_BURST = int(os.getenv("SEARCH_RATE_BURST", 20))
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", 32))
+SEARCH_MAX_QUEUE = int(os.getenv("SEARCH_MAX_QUEUE", 256))
+SEARCH_QUEUE_TIMEOUT = float(os.getenv("SEARCH_QUEUE_TIMEOUT", 2))
+RATE_LIMIT_CLIENT_HEADER = os.getenv("RATE_LIMIT_CLIENT_HEADER", "")
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", 10000))  # Buckets mantidos em memória (LRU)
+# Sem vaga para a busca semântica (fila cheia, espera esgotada ou API de embeddings falhando): busca lexical nos
+# títulos em vez de 503. Depois de um erro da API de embeddings, as buscas vão direto para o modo degradado por
+# EMBEDDING_BACKOFF segundos
+SEARCH_DEGRADED_MODE = os.getenv("SEARCH_DEGRADED_MODE", "true").lower() == "true"
+EMBEDDING_BACKOFF = float(os.getenv("EMBEDDING_BACKOFF", 10))
+
+# Atualização incremental da taxonomia: escrita adiada e agrupada (segundos / vídeos pendentes)
+TAXONOMY_FLUSH_INTERVAL = float(os.getenv("TAXONOMY_FLUSH_INTERVAL", 5))
+TAXONOMY_FLUSH_MAX_PENDING = int(os.getenv("TAXONOMY_FLUSH_MAX_PENDING", 500))
+# Vídeos contados recentemente lembrados em memória (LRU); "já indexado" de fato vem do backend vetorial
+TAXONOMY_SEEN_VIDEOS = int(os.getenv("TAXONOMY_SEEN_VIDEOS", 10000))
+# Intervalo (s) de verificação do arquivo da taxonomia: atualizações feitas por outro worker chegam neste prazo
+TAXONOMY_WATCH_INTERVAL = float(os.getenv("TAXONOMY_WATCH_INTERVAL", 2))
+
+# Classificação de tópicos e indexação online de novos vídeos
+TOPIC_PROVIDER = os.getenv("TOPIC_PROVIDER", "openai")  # "openai" ou "gemini"
+TOPIC_MODEL_OPENAI = os.getenv("TOPIC_MODEL_OPENAI", "gpt-4o-mini")
+TOPIC_MODEL_GEMINI = os.getenv("TOPIC_MODEL_GEMINI", "gemini-2.0-flash-lite")
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+TOPIC_TRANSCRIPT_MAX_CHARS = int(os.getenv("TOPIC_TRANSCRIPT_MAX_CHARS", 4000))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 1000))  # Acima disso novos vídeos são recusados (backpressure)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 16))
+INGEST_BATCH_WAIT = float(os.getenv("INGEST_BATCH_WAIT", 0.05))  # Espera máxima (s) para completar um micro-lote
+INGEST_LLM_CONCURRENCY = int(os.getenv("INGEST_LLM_CONCURRENCY", 8))
+INGEST_LATENCY_BUDGET = float(os.getenv("INGEST_LATENCY_BUDGET", 30))  # Tempo máximo (s) por vídeo, da fila ao upsert
+
+# Jobs de ingestão de CSV (/upload-csv): uploads gravados em disco e processados em blocos por um pool de workers
+JOBS_DIR = os.getenv("JOBS_DIR", "app/data/jobs")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", 200))
+UPLOAD_SPOOL_CHUNK_BYTES = int(os.getenv("UPLOAD_SPOOL_CHUNK_BYTES", 1 << 20))
+
+# Exportação dos pontos indexados (/export): pontos por página do scroll
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+# Inicialização em segundo plano e prontidão (/readyz)
+STARTUP_RETRY_INTERVAL = float(os.getenv("STARTUP_RETRY_INTERVAL", 5))  # Espera (s) antes de repetir uma etapa que falhou
+READY_CHECK_TIMEOUT = float(os.getenv("READY_CHECK_TIMEOUT", 2))  # Tempo máximo (s) da verificação do backend vetorial
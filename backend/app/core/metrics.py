@@ -0,0 +1,188 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, List, Tuple
+
+# Métricas no formato de texto do Prometheus, sem dependências externas. Cada worker do uvicorn tem o seu
+# próprio registro (os valores de /metrics são do processo que atendeu a requisição).
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """
+    Histograma com buckets fixos: observe() faz uma busca binária e incrementa um contador sob lock.
+    """
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [contagens por bucket (+Inf no fim), soma]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels) -> _Timer:
+        """Context manager que observa a duração do bloco (também dentro de funções async)."""
+        return _Timer(self, labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series[0]), series[1]) for key, series in self._series.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+def render_latest() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# --- Métricas da aplicação ---
+HTTP_REQUESTS = Counter("http_requests_total", "Requisições HTTP atendidas", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Latência das requisições HTTP por rota", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requisições HTTP em andamento")
+EMBEDDING_LATENCY = Histogram("embedding_request_duration_seconds", "Latência das chamadas de embedding (por lote enviado)")
+EMBEDDING_TEXTS = Counter("embedding_texts_total", "Textos enviados para embedding")
+EMBEDDING_QUERY_BATCH = Histogram("embedding_query_batch_size", "Consultas por lote enviado pelo dispatcher de embeddings",
+                                  buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+VECTOR_LATENCY = Histogram("vector_store_duration_seconds", "Latência das operações no backend vetorial", ("backend", "operation"))
+CACHE_REQUESTS = Counter("cache_requests_total", "Consultas a caches em memória", ("cache", "result"))
+TAXONOMY_SERVE_LATENCY = Histogram("taxonomy_serve_duration_seconds", "Tempo para serializar a taxonomia servida em /taxonomy")
+SEARCH_STAGE_LATENCY = Histogram("search_stage_duration_seconds", "Tempo das etapas de /search fora do backend vetorial", ("stage",))
+STARTUP_DURATION = Gauge("startup_duration_seconds", "Duração de cada etapa da inicialização e até o worker ficar pronto (phase=ready)", ("phase",))
+SINGLE_FLIGHT_REQUESTS = Counter("single_flight_requests_total", "Chamadas agrupadas por chave (leader executa, coalesced reaproveita)", ("name", "role"))
+CACHE_WARMUP = Counter("cache_warmup_queries_total", "Buscas do log aquecidas na inicialização (warmed, cached, failed, skipped)", ("result",))
+SEARCH_ADMISSION = Counter("search_admission_total", "Decisões do controle de admissão de /search (admitted, rate_limited, overloaded, degraded)", ("result",))
+SEARCH_ADMISSION_WAIT = Histogram("search_admission_wait_seconds", "Espera por token do cliente e vaga global antes da busca semântica")
+SEARCH_ADMISSION_QUEUE = Gauge("search_admission_queue", "Buscas esperando vaga global no controle de admissão")
+SINGLE_FLIGHT_TIMEOUTS = Counter("single_flight_timeouts_total", "Chamadas que desistiram de esperar o resultado compartilhado", ("name",))
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI (sem BaseHTTPMiddleware, que cria tarefas extras por requisição): mede latência e status
+    por rota. O rótulo é o template da rota ("/video/{video_id}"), não o caminho, para limitar a cardinalidade.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_LATENCY.observe(elapsed, method=method, route=route_path)
+            HTTP_REQUESTS.inc(method=method, route=route_path, status=status["code"])
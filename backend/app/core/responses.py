@@ -0,0 +1,31 @@
+from typing import Any, Type
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from app.core import config
+
+
+class FastJSONResponse(Response):
+    """
+    JSONResponse serializado com orjson (C): dicts, listas, dataclasses (inclusive slots=True) e datetimes
+    sem passar pelo jsonable_encoder. Bytes já serializados podem ser passados diretamente.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content)
+
+
+def trusted_response(content: Any, model: Type[BaseModel] = None, status_code: int = 200) -> Response:
+    """
+    Resposta para dados internos que já seguem o schema do endpoint: serializa direto, sem revalidar pelo
+    response_model (que continua declarado na rota para a documentação OpenAPI). Com VALIDATE_RESPONSES=true,
+    o conteúdo passa pelo modelo Pydantic antes (para pegar divergências de schema em desenvolvimento).
+    """
+    if config.VALIDATE_RESPONSES and model is not None:
+        content = model.model_validate(content, from_attributes=True).model_dump(mode="json")
+    return FastJSONResponse(content, status_code=status_code)
@@ -1,53 +1,86 @@
+import time
+
+STARTED_AT = time.perf_counter()  # Início do import: base do tempo de cold start (ver services/readiness.py)
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, File, UploadFile, Request
 from fastapi.responses import JSONResponse
-from app.services.file_processor import process_csv_file
-from app.api import search, video, channel
-from app.api import taxonomy_endpoints
+from app.core import config
+from app.services.file_processor import read_csv_columns
+from app.api import search, video, channel, browse, jobs
+from app.api import taxonomy_endpoints, metrics, health, export
+from app.core.metrics import MetricsMiddleware
 from app.services import taxonomy_service
-from app.services.qdrant_service import QdrantService
-import os
+from app.services.taxonomy_builder import flush_taxonomy_builder
+from app.services.ingestion_service import stop_ingestion_queue
+from app.services.job_service import get_job_service, stop_job_service
+from app.services.readiness import get_readiness
+from app.services.query_log import flush_query_log
+from app.services.vector_store import get_vector_service
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A inicialização (taxonomia, backend vetorial, aquecimento) roda em segundo plano: o worker já
+    # responde /healthz e só entra no balanceamento quando /readyz ficar 200
+    readiness = get_readiness()
+    readiness.start(STARTED_AT)
+    yield
+    await readiness.stop()
+    await stop_job_service()
+    await stop_ingestion_queue()
+    flush_taxonomy_builder()
+    flush_query_log()
+    taxonomy_service.stop_taxonomy_watcher()
 
-qdrant_service = QdrantService(
-    host=os.environ.get("QDRANT_HOST", "qdrant"),
-    port=int(os.environ.get("QDRANT_PORT", 6333)),
-    collection_name=os.environ.get("QDRANT_COLLECTION_NAME", "videos_viewstats")
-)
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(search.router)
 app.include_router(video.router)
 app.include_router(channel.router)
+app.include_router(browse.router)
 app.include_router(taxonomy_endpoints.router)
-
-@app.on_event("startup")
-def startup_event():
-    taxonomy_service.load_taxonomy()
+app.include_router(jobs.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
+app.include_router(export.router)
 
 @app.get("/")
 def read_root():
     return {"message": "Hello, world!"}
 
-@app.post("/upload-csv")
+@app.post("/upload-csv", status_code=202)
 async def upload_csv(file: UploadFile = File(...)):
+    """
+    Grava o CSV em disco em blocos e o enfileira como job de ingestão (parse -> extract -> embed -> index).
+    Retorna imediatamente o job_id; o progresso fica em /jobs/{job_id}.
+    """
     if not file.filename.endswith('.csv'):
         return JSONResponse(
             status_code=400,
             content={"error": "File must be a CSV"}
         )
+    job_service = get_job_service()
+    job_id, spool_path = job_service.new_spool_path(file.filename)
     try:
-        content = await file.read()
-        result = process_csv_file(content)
-        return {
-            "message": "CSV uploaded successfully",
-            "filename": file.filename,
-            **result
-        }
+        with open(spool_path, "wb") as out:
+            while chunk := await file.read(config.UPLOAD_SPOOL_CHUNK_BYTES):
+                out.write(chunk)
+        columns = read_csv_columns(spool_path)
     except Exception as e:
+        job_service.discard_spool(spool_path)
         return JSONResponse(
             status_code=400,
             content={"error": str(e)}
         )
+    job = await job_service.submit(job_id, file.filename, spool_path)
+    return {
+        "message": "CSV accepted for processing",
+        "filename": file.filename,
+        "job_id": job.id,
+        "status": job.status,
+        "columns": columns
+    }
 
 @app.post("/qdrant/insert")
 async def qdrant_insert(request: Request):
@@ -55,5 +88,5 @@ async def qdrant_insert(request: Request):
     id = data["id"]
     vector = data["vector"]
     payload = data.get("payload")
-    result = qdrant_service.insert_vector(id, vector, payload)
+    result = get_vector_service().insert_vector(id, vector, payload)
     return result
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 
 class SearchRequest(BaseModel):
     """Modelo de request para busca semântica."""
@@ -7,4 +7,8 @@ class SearchRequest(BaseModel):
     topic_filter: Optional[str] = Field(None, example="Tecnologia > Programação > Python")
     top_k: int = Field(10, example=5, description="Número máximo de resultados")
     page: Optional[int] = Field(1, example=1, description="Página de resultados")
-    limit: Optional[int] = Field(10, example=10, description="Resultados por página") 
\ No newline at end of file
+    limit: Optional[int] = Field(10, example=10, description="Resultados por página")
+    facets: bool = Field(False, example=True, description="Retorna contagens por tópico (1º e 2º nível) do conjunto de resultados")
+    duration: Optional[Literal["any", "short", "medium", "long"]] = Field(None, example="medium", description="short (< 4 min), medium (4-20 min), long (> 20 min)")
+    upload_date: Optional[Literal["any", "day", "week", "month", "year"]] = Field(None, example="month", description="Enviados nas últimas 24h/semana/mês/ano")
+    min_views: Optional[int] = Field(None, ge=0, example=10000, description="Número mínimo de visualizações")
@@ -1 +1,21 @@
- 
\ No newline at end of file
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class VideoIngestRequest(BaseModel):
+    """Modelo de request para classificar e indexar um novo vídeo."""
+    yt_id: str = Field(..., example="abc123")
+    title: str = Field(..., example="How to Build a Gaming PC in 2024")
+    description: str = Field("", example="A full walkthrough of picking parts, assembling, and optimizing performance.")
+    transcript: str = Field("", example="...we begin with choosing the right CPU...")
+    channel_id: Optional[str] = Field(None, example="canal123")
+    view_count: Optional[int] = Field(None, ge=0, example=125000)
+    duration_seconds: Optional[int] = Field(None, ge=0, example=623)
+    upload_date: Optional[str] = Field(None, example="2024-01-15T00:00:00Z", description="RFC 3339 (UTC)")
+
+class VideoIngestResponse(BaseModel):
+    yt_id: str = Field(..., example="abc123")
+    status: str = Field(..., example="indexed", description="indexed, error ou timeout")
+    topics: List[str] = Field(default_factory=list, example=["technology > hardware > pc building"])
+    taxonomy_ids: List[str] = Field(default_factory=list, example=["technology-hardware"])
+    elapsed: float = Field(..., example=1.8, description="Segundos entre a entrada na fila e o resultado")
+    error: Optional[str] = None
@@ -0,0 +1,153 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from threading import Lock
+from typing import Optional
+
+from app.core import config
+from app.core.metrics import SEARCH_ADMISSION, SEARCH_ADMISSION_QUEUE, SEARCH_ADMISSION_WAIT
+
+
+class AdmissionRejected(Exception):
+    """Requisição recusada pelo controle de admissão; status_code 429 (cliente) ou 503 (worker sem vaga)."""
+    def __init__(self, status_code: int, detail: str, retry_after: float = 1):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Reserva um token e devolve quantos segundos esperar por ele (0 = disponível agora), ou None se a
+        espera passaria de max_wait (nada é reservado). Reservas deixam o saldo negativo: quem chega depois
+        espera atrás delas.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if wait > max_wait:
+            return None
+        self.tokens -= 1
+        return wait
+
+
+class AdmissionController:
+    """
+    Controle de admissão das buscas que dependem da API de embeddings. Cada cliente tem um token bucket
+    (`rate` buscas/s, rajada de `burst`); além disso, no máximo `max_concurrency` buscas semânticas rodam ao
+    mesmo tempo no worker e até `max_queue` esperam vaga. A espera total (token + vaga) é limitada a
+    `queue_timeout` segundos: o que não cabe nesse prazo é recusado na hora, com 429 (cliente acima do seu
+    limite) ou 503 (worker sem vaga). Depois de um erro da API de embeddings, mark_exhausted() faz as novas
+    buscas serem recusadas por `backoff` segundos sem chegar à API.
+    """
+    def __init__(self, rate: float = None, burst: int = None, max_concurrency: int = None, max_queue: int = None,
+                 queue_timeout: float = None, max_clients: int = None, backoff: float = None):
+        self.rate = config.SEARCH_RATE_LIMIT if rate is None else rate
+        self.burst = burst or config.SEARCH_RATE_BURST
+        self.max_concurrency = max_concurrency or config.SEARCH_MAX_CONCURRENCY
+        self.max_queue = config.SEARCH_MAX_QUEUE if max_queue is None else max_queue
+        self.queue_timeout = config.SEARCH_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self.max_clients = max_clients or config.RATE_LIMIT_MAX_CLIENTS
+        self.backoff = config.EMBEDDING_BACKOFF if backoff is None else backoff
+        self._buckets = OrderedDict()
+        self._buckets_lock = Lock()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._waiting = 0
+        self._exhausted_until = 0.0
+
+    def exhausted(self) -> bool:
+        return time.monotonic() < self._exhausted_until
+
+    def mark_exhausted(self):
+        self._exhausted_until = time.monotonic() + self.backoff
+
+    def _reserve(self, client: str, max_wait: float) -> Optional[float]:
+        with self._buckets_lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            return bucket.reserve(max_wait)
+
+    async def acquire_token(self, client: str) -> float:
+        """
+        Token do cliente, esperando por ele até `queue_timeout`; levanta AdmissionRejected(429) se não der.
+        Devolve o prazo (time.monotonic) que sobra para conseguir a vaga global.
+        """
+        deadline = time.monotonic() + self.queue_timeout
+        if self.rate <= 0:
+            return deadline
+        wait = self._reserve(client, self.queue_timeout)
+        if wait is None:
+            SEARCH_ADMISSION.inc(result="rate_limited")
+            raise AdmissionRejected(429, "Too many searches from this client", 1 / self.rate)
+        if wait > 0:
+            with SEARCH_ADMISSION_WAIT.time():
+                await asyncio.sleep(wait)
+        return deadline
+
+    @asynccontextmanager
+    async def slot(self, deadline: float = None):
+        """
+        Vaga global para uma busca semântica, esperando até `deadline` (time.monotonic); levanta
+        AdmissionRejected(503) com a fila cheia, a espera esgotada ou a API de embeddings em backoff.
+        """
+        if self.exhausted():
+            SEARCH_ADMISSION.inc(result="overloaded")
+            raise AdmissionRejected(503, "Embedding service unavailable", self._exhausted_until - time.monotonic())
+        if self._semaphore.locked():
+            if self._waiting >= self.max_queue:
+                SEARCH_ADMISSION.inc(result="overloaded")
+                raise AdmissionRejected(503, "Search queue is full")
+            remaining = (deadline or time.monotonic() + self.queue_timeout) - time.monotonic()
+            self._waiting += 1
+            SEARCH_ADMISSION_QUEUE.inc()
+            try:
+                with SEARCH_ADMISSION_WAIT.time():
+                    await asyncio.wait_for(self._semaphore.acquire(), max(remaining, 0.001))
+            except asyncio.TimeoutError:
+                SEARCH_ADMISSION.inc(result="overloaded")
+                raise AdmissionRejected(503, "Search queue timed out")
+            finally:
+                self._waiting -= 1
+                SEARCH_ADMISSION_QUEUE.dec()
+        else:
+            await self._semaphore.acquire()
+        SEARCH_ADMISSION.inc(result="admitted")
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+_controller = None
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
+
+def client_id(request) -> str:
+    """Identidade do cliente para o limite por cliente (cabeçalho configurado ou IP da conexão)."""
+    if config.RATE_LIMIT_CLIENT_HEADER:
+        value = request.headers.get(config.RATE_LIMIT_CLIENT_HEADER)
+        if value:
+            return value.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
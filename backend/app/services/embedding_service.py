@@ -1,10 +1,24 @@
-from openai import AsyncOpenAI
+import asyncio
 from app.core import config
+from app.core.metrics import EMBEDDING_LATENCY, EMBEDDING_QUERY_BATCH, EMBEDDING_TEXTS
+from app.services.search_cache import SearchResultCache
 
 OPENAI_API_KEY = config.OPENAI_API_KEY
 EMBEDDING_MODEL = getattr(config, "EMBEDDING_MODEL_OPENAI", "text-embedding-3-small")
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+class EmbeddingUnavailable(Exception):
+    """A API de embeddings falhou (limite de taxa, erro ou timeout) para uma consulta de busca."""
+
+
+_client = None
+
+def get_client():
+    """Cliente da OpenAI criado no primeiro uso (o pacote openai é pesado de importar)."""
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+        _client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _client
 
 async def get_openai_embeddings(texts: list[str]) -> list[list[float]]:
     results = []
@@ -12,13 +26,98 @@ async def get_openai_embeddings(texts: list[str]) -> list[list[float]]:
     for i in range(0, len(texts), batch_size):
         batch = texts[i:i+batch_size]
         try:
-            response = await client.embeddings.create(
-                input=batch,
-                model=EMBEDDING_MODEL
-            )
+            EMBEDDING_TEXTS.inc(len(batch))
+            with EMBEDDING_LATENCY.time():
+                response = await get_client().embeddings.create(
+                    input=batch,
+                    model=EMBEDDING_MODEL
+                )
             # OpenAI returns embeddings in the same order as input
             results.extend([d.embedding for d in response.data])
         except Exception as e:
             print(f"[embedding_service] OpenAI embedding error: {e}")
             raise
-    return results 
\ No newline at end of file
+    return results
+
+
+class EmbeddingBatcher:
+    """
+    Dispatcher de embeddings de consultas: textos pedidos por requisições concorrentes dentro de uma janela
+    curta (ou até max_batch textos) são enviados numa única chamada e cada requisição recebe o seu vetor.
+    Troca até `window` segundos de latência por muito menos chamadas à API. Textos repetidos no lote são
+    enviados uma vez; requisições canceladas enquanto esperam são descartadas do lote.
+    """
+    def __init__(self, window: float = None, max_batch: int = None):
+        self.window = config.EMBEDDING_BATCH_WINDOW if window is None else window
+        self.max_batch = max_batch or config.EMBEDDING_BATCH_MAX
+        self._pending = []  # [(texto, future)]
+        self._timer = None
+        self._tasks = set()
+
+    async def embed(self, text: str) -> list[float]:
+        if self.window <= 0 or self.max_batch <= 1:
+            return (await get_openai_embeddings([text]))[0]
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: list):
+        waiting = [(text, future) for text, future in batch if not future.done()]
+        texts = list(dict.fromkeys(text for text, _ in waiting))
+        if not texts:
+            return
+        EMBEDDING_QUERY_BATCH.observe(len(texts))
+        try:
+            vectors = dict(zip(texts, await get_openai_embeddings(texts)))
+        except Exception as e:
+            for _, future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for text, future in waiting:
+            if not future.done():
+                future.set_result(vectors[text])
+
+
+_batcher = None
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher()
+    return _batcher
+
+query_embedding_cache = SearchResultCache(maxsize=config.EMBEDDING_CACHE_SIZE, ttl=config.EMBEDDING_CACHE_TTL, name="embedding")
+
+async def embed_query(text: str) -> list[float]:
+    """Embedding de uma consulta de busca: do cache ou agrupado com as consultas concorrentes (ver EmbeddingBatcher)."""
+    vector = query_embedding_cache.get(text)
+    if vector is None:
+        try:
+            vector = await get_embedding_batcher().embed(text)
+        except Exception as e:
+            raise EmbeddingUnavailable(str(e)) from e
+        query_embedding_cache.set(text, vector)
+    return vector
+
+async def prefetch_query_embeddings(texts: list[str]):
+    """Preenche o cache de embeddings de consultas com as que ainda faltam (chamadas em lotes de até 1000)."""
+    missing = [text for text in dict.fromkeys(texts) if query_embedding_cache.get(text) is None]
+    if missing:
+        for text, vector in zip(missing, await get_openai_embeddings(missing)):
+            query_embedding_cache.set(text, vector)
@@ -0,0 +1,168 @@
+import base64
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+# Exportação dos pontos indexados (/export): os lotes vêm do scroll paginado do backend vetorial (iter_points)
+# e cada um é convertido e enviado antes do próximo ser buscado, então a memória não cresce com a coleção.
+
+Batch = List[Tuple[object, dict, Optional[np.ndarray]]]
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    """Vetor como base64 dos bytes float32 little-endian (np.frombuffer(base64.b64decode(s), "<f4"))."""
+    return base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+
+
+def _row(point_id, payload: dict, fields: Optional[List[str]]) -> dict:
+    row = {"id": str(point_id)}
+    if fields is None:
+        row.update(payload)
+    else:
+        row.update({name: payload.get(name) for name in fields})
+    return row
+
+
+def export_ndjson(batches: Iterable[Batch], fields: List[str] = None) -> Iterator[bytes]:
+    """Uma linha JSON por ponto: id, campos do payload e, se pedido, "vector" em base64 (float32)."""
+    for batch in batches:
+        lines = []
+        for point_id, payload, vector in batch:
+            row = _row(point_id, payload, fields)
+            if vector is not None:
+                row["vector"] = encode_vector(vector)
+            lines.append(orjson.dumps(row))
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+
+
+class _ChunkSink:
+    """Destino do ParquetWriter que acumula os bytes escritos para serem enviados (e descartados) a cada lote."""
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+# Tipos das colunas do Parquet para os campos de payload gravados pelo pipeline (scripts/indexer.py) e pela
+# ingestão online (build_video_payload). O schema é fixo: não depende do que aparece no primeiro lote.
+PARQUET_FIELD_TYPES = {
+    "yt_id": "string",
+    "title": "string",
+    "description_llm": "string",
+    "channel_id": "string",
+    "intention": "string",
+    "named_entities": "list",
+    "hierarchical_topics": "list",
+    "taxonomy_ids": "list",
+    "taxonomy_ancestor_ids": "list",
+    "view_count": "int",
+    "view_sort_key": "int",
+    "duration_seconds": "int",
+    "upload_date": "string",
+}
+EXTRA_COLUMN = "extra"  # Sem `fields`: demais campos do payload, como um objeto JSON
+
+
+def _to_json(value) -> Optional[str]:
+    return None if value is None else orjson.dumps(value).decode("utf-8")
+
+
+def _to_string(value) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return _to_json(value) if isinstance(value, (dict, list, tuple)) else str(value)
+
+
+def _to_int(value) -> Optional[int]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _to_list(value) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    return [_to_string(item) for item in value if item is not None]
+
+
+_CONVERTERS = {"string": _to_string, "int": _to_int, "list": _to_list, "json": _to_json}
+
+
+def parquet_columns(fields: Optional[List[str]]) -> List[Tuple[str, str]]:
+    """(coluna, tipo) do payload: os campos pedidos (desconhecidos viram JSON) ou os conhecidos + "extra"."""
+    if fields is None:
+        return list(PARQUET_FIELD_TYPES.items()) + [(EXTRA_COLUMN, "json")]
+    return [(name, PARQUET_FIELD_TYPES.get(name, "json")) for name in fields]
+
+
+def export_parquet(batches: Iterable[Batch], fields: List[str] = None, with_vectors: bool = False) -> Iterator[bytes]:
+    """
+    Arquivo Parquet gerado em streaming: um row group por lote. O schema é declarado antes do primeiro lote
+    (parquet_columns): valores de tipo inesperado viram nulos em vez de interromper um download já começado,
+    e campos fora do schema vão como texto JSON. Os vetores, se pedidos, vão numa coluna binária com os
+    bytes float32 little-endian.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {"string": pa.string(), "int": pa.int64(), "list": pa.list_(pa.string()), "json": pa.string()}
+    columns = parquet_columns(fields)
+    schema = pa.schema([("id", pa.string())] + [(name, arrow_types[kind]) for name, kind in columns]
+                       + ([("vector", pa.binary())] if with_vectors else []))
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    try:
+        for batch in batches:
+            if not batch:
+                continue
+            arrays = [pa.array([str(point_id) for point_id, _, _ in batch], type=pa.string())]
+            for name, kind in columns:
+                convert = _CONVERTERS[kind]
+                if name == EXTRA_COLUMN and fields is None:
+                    values = [{k: v for k, v in payload.items() if k not in PARQUET_FIELD_TYPES} or None
+                              for _, payload, _ in batch]
+                else:
+                    values = [payload.get(name) for _, payload, _ in batch]
+                arrays.append(pa.array([convert(v) for v in values], type=arrow_types[kind]))
+            if with_vectors:
+                arrays.append(pa.array([None if vector is None else np.asarray(vector, dtype="<f4").tobytes()
+                                        for _, _, vector in batch], type=pa.binary()))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,29 @@
+from app.services import taxonomy_service
+
+FACET_LEVELS = {0: "top_level", 1: "second_level"}
+
+
+def compute_topic_facets(results: list) -> dict:
+    """
+    Contagens por tópico de primeiro e segundo nível sobre uma lista de resultados já obtida
+    (cada vídeo conta uma vez por nó), usando o índice de ancestrais da taxonomia em memória
+    em vez de uma consulta count ao Qdrant por tópico.
+    """
+    node_index = taxonomy_service.get_node_index()
+    counts = {}
+    for result in results:
+        nodes = set()
+        for taxonomy_id in result.topics_path or []:
+            node = node_index.get(taxonomy_id)
+            if node is None:
+                continue
+            nodes.update(node["ancestors"][:len(FACET_LEVELS)])
+        for node_id in nodes:
+            counts[node_id] = counts.get(node_id, 0) + 1
+    facets = {name: [] for name in FACET_LEVELS.values()}
+    for node_id, count in counts.items():
+        node = node_index[node_id]
+        facets[FACET_LEVELS[node["level"]]].append({"id": node_id, "name": node["name"], "count": count})
+    for items in facets.values():
+        items.sort(key=lambda item: (-item["count"], item["name"]))
+    return facets
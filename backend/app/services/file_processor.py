@@ -1,13 +1,92 @@
-import pandas as pd
-import io
+import ast
+import math
 
+# pandas é importado sob demanda (dentro das funções): só o processamento de CSV precisa dele,
+# e importá-lo no carregamento do módulo atrasaria a inicialização da API.
 
-def process_csv_file(file_bytes: bytes):
+
+def read_csv_columns(path: str) -> list:
+    """Lê apenas o cabeçalho do CSV (validação rápida antes de enfileirar o job)."""
+    import pandas as pd
     try:
-        df = pd.read_csv(io.StringIO(file_bytes.decode('utf-8')))
-        return {
-            "rows": len(df),
-            "columns": list(df.columns)
-        }
+        return list(pd.read_csv(path, nrows=0).columns)
     except Exception as e:
-        raise ValueError(f"Error processing CSV: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Error processing CSV: {str(e)}")
+
+
+def iter_csv_chunks(path: str, chunksize: int):
+    """Lê o CSV em blocos de `chunksize` linhas, sem carregar o arquivo inteiro."""
+    import pandas as pd
+    return pd.read_csv(path, chunksize=chunksize)
+
+
+def _transcript_from_subtitles(value) -> str:
+    # Mesmo formato do dataset usado pelo pipeline (scripts/data_handler.py)
+    try:
+        data = ast.literal_eval(value)
+        return ' '.join(item['t'] for item in data.get('transcript', {}).get('text', []))
+    except (ValueError, SyntaxError, KeyError, AttributeError, TypeError):
+        return ""
+
+
+def _duration_seconds(value):
+    import pandas as pd
+    if value is None or pd.isna(value):
+        return None
+    text = str(value).strip()
+    try:
+        # Segundos, inclusive "623.0" (coluna numérica com células vazias é lida como float)
+        seconds = float(text)
+        return int(seconds) if math.isfinite(seconds) and seconds >= 0 else None
+    except ValueError:
+        pass
+    if ':' in text:
+        try:
+            seconds = 0
+            for part in text.split(':'):
+                seconds = seconds * 60 + int(part)
+            return seconds
+        except ValueError:
+            return None
+    parsed = pd.to_timedelta(text, errors='coerce')
+    return None if pd.isna(parsed) else int(parsed.total_seconds())
+
+
+def _upload_date(value):
+    import pandas as pd
+    if value is None or pd.isna(value):
+        return None
+    parsed = pd.to_datetime(value, utc=True, errors='coerce')
+    return None if pd.isna(parsed) else parsed.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def row_yt_id(row: dict):
+    """yt_id da linha como texto (None se ausente), para relatórios de erro."""
+    import pandas as pd
+    value = row.get('yt_id')
+    return None if value is None or pd.isna(value) else str(value)
+
+
+def row_to_video(row: dict) -> dict:
+    """
+    Converte uma linha do CSV no formato de vídeo da ingestão (ver models/video.VideoIngestRequest).
+    Aceita a transcrição pronta (coluna transcript) ou as legendas brutas do dataset (coluna subtitles).
+    """
+    import pandas as pd
+    def text(key):
+        value = row.get(key)
+        return "" if value is None or pd.isna(value) else str(value)
+
+    if not text('yt_id') or not text('title'):
+        raise ValueError("Linha sem yt_id ou title")
+    view_count = row.get('view_count')
+    return {
+        "yt_id": text('yt_id'),
+        "title": text('title'),
+        "description": text('description'),
+        "transcript": text('transcript') or _transcript_from_subtitles(row.get('subtitles')),
+        "channel_id": text('channel_id') or None,
+        "view_count": int(view_count) if view_count is not None and not pd.isna(view_count) else None,
+        "duration_seconds": _duration_seconds(row.get('duration')),
+        "upload_date": _upload_date(row.get('upload_date'))
+    }
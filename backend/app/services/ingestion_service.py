@@ -0,0 +1,201 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List, Tuple
+
+from app.core import config
+from app.services import taxonomy_service
+from app.services.embedding_service import get_openai_embeddings
+from app.services.taxonomy_builder import get_taxonomy_builder
+from app.services.topic_generator import TopicGenerator
+from app.services.vector_store import get_vector_service
+from app.utils.helpers import build_video_payload
+
+# Micro-lotes em processamento ao mesmo tempo: o próximo lote chama o LLM enquanto o anterior faz embedding/upsert
+MAX_INFLIGHT_BATCHES = 2
+# Fração do orçamento de latência disponível para o LLM; o restante fica para embedding + upsert do lote,
+# de modo que um vídeo lento não faça os demais do lote estourarem o prazo
+LLM_BUDGET_SHARE = 0.8
+
+class IngestionQueueFull(Exception):
+    """Fila de ingestão cheia: o cliente deve tentar novamente mais tarde."""
+
+def point_id_for_video(yt_id: str) -> str:
+    """Mesmo id de ponto do pipeline (scripts/indexer.uuid_from_ytid), então reindexar um vídeo o substitui."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, yt_id))
+
+def indexed_point_ids(vector_service, point_ids: List[str]) -> set:
+    """Ids (str) dos pontos que já existem no backend vetorial; consultar antes do upsert do lote."""
+    return {str(point["id"]) for point in vector_service.retrieve(point_ids)}
+
+def prepare_indexed_video(video: Dict[str, Any], topics: List[str]) -> Tuple[dict, List[str]]:
+    """
+    Mapeia os tópicos gerados para nós canônicos e monta o payload. Retorna (payload, caminhos canônicos),
+    os caminhos no formato "A > b" usado pelo TaxonomyBuilder.
+    """
+    mapped = taxonomy_service.map_topic_paths(topics)
+    taxonomy_ids = [node_id for node_id, _, _ in mapped]
+    ancestor_ids = sorted({a for _, _, ancestors in mapped for a in ancestors})
+    payload = build_video_payload({**video, "hierarchical_topics": topics}, taxonomy_ids, ancestor_ids)
+    return payload, [" > ".join(parts) for _, parts, _ in mapped]
+
+def embedding_text(video: Dict[str, Any]) -> str:
+    return f"{video.get('title') or ''} {video.get('description') or ''}".strip()
+
+class IngestionQueue:
+    """
+    Fila assíncrona de classificação + indexação de novos vídeos. Agrupa as requisições em micro-lotes
+    (até batch_size vídeos ou batch_wait segundos), chama o LLM com concorrência limitada, gera os
+    embeddings do lote em uma única chamada e faz um único upsert. Cada vídeo tem um orçamento de
+    latência; com a fila cheia, novos vídeos são recusados (IngestionQueueFull).
+    """
+    def __init__(self, maxsize: int = None, batch_size: int = None, batch_wait: float = None,
+                 llm_concurrency: int = None, latency_budget: float = None, topic_generator: TopicGenerator = None):
+        self.maxsize = maxsize or config.INGEST_QUEUE_SIZE
+        self.batch_size = batch_size or config.INGEST_BATCH_SIZE
+        self.batch_wait = config.INGEST_BATCH_WAIT if batch_wait is None else batch_wait
+        self.llm_concurrency = llm_concurrency or config.INGEST_LLM_CONCURRENCY
+        self.latency_budget = latency_budget or config.INGEST_LATENCY_BUDGET
+        self.topic_generator = topic_generator or TopicGenerator()
+        self.stats = {"accepted": 0, "rejected": 0, "indexed": 0, "failed": 0, "timeouts": 0, "batches": 0}
+        self._queue = None
+        self._worker = None
+        self._llm_semaphore = None
+        self._inflight = None
+        self._tasks = set()
+
+    def _ensure_started(self):
+        # Criados sob demanda para ficarem no event loop da aplicação
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._llm_semaphore = asyncio.Semaphore(self.llm_concurrency)
+            self._inflight = asyncio.Semaphore(MAX_INFLIGHT_BATCHES)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, video: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Enfileira um vídeo e aguarda o resultado (status "indexed", "error" ou "timeout").
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        enqueued_at = time.monotonic()
+        try:
+            self._queue.put_nowait((video, future, enqueued_at, enqueued_at + self.latency_budget))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise IngestionQueueFull(f"Fila de ingestão cheia ({self.maxsize} vídeos)")
+        self.stats["accepted"] += 1
+        try:
+            return await asyncio.wait_for(future, timeout=self.latency_budget)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return {"yt_id": video["yt_id"], "status": "timeout", "elapsed": time.monotonic() - enqueued_at}
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        flush_at = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = flush_at - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            await self._inflight.acquire()
+            task = asyncio.get_running_loop().create_task(self._process_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task):
+        self._tasks.discard(task)
+        self._inflight.release()
+
+    def _finish(self, item, result: Dict[str, Any]):
+        video, future, enqueued_at, _ = item
+        if not future.done():
+            future.set_result({"yt_id": video["yt_id"], **result, "elapsed": time.monotonic() - enqueued_at})
+
+    async def _classify(self, item) -> List[str]:
+        video, _, enqueued_at, deadline = item
+        llm_deadline = enqueued_at + (deadline - enqueued_at) * LLM_BUDGET_SHARE
+        async with self._llm_semaphore:
+            remaining = llm_deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            return await asyncio.wait_for(
+                self.topic_generator.agenerate_topics(video.get("title", ""), video.get("description", ""), video.get("transcript", "")),
+                timeout=remaining
+            )
+
+    async def _process_batch(self, batch: list):
+        self.stats["batches"] += 1
+        # Vídeos cujo cliente já desistiu (timeout) não são processados
+        live = [item for item in batch if not item[1].done() and item[3] > time.monotonic()]
+        results = await asyncio.gather(*(self._classify(item) for item in live), return_exceptions=True)
+        classified = []
+        for item, topics in zip(live, results):
+            if isinstance(topics, asyncio.TimeoutError):
+                self.stats["timeouts"] += 1
+                self._finish(item, {"status": "timeout"})
+            elif isinstance(topics, Exception):
+                self.stats["failed"] += 1
+                self._finish(item, {"status": "error", "error": str(topics)})
+            else:
+                classified.append((item, topics))
+        if not classified:
+            return
+        try:
+            vectors = await get_openai_embeddings([embedding_text(item[0]) for item, _ in classified])
+            points, canonical = [], []
+            for (item, topics), vector in zip(classified, vectors):
+                payload, paths = prepare_indexed_video(item[0], topics)
+                points.append((point_id_for_video(item[0]["yt_id"]), vector, payload))
+                canonical.append(paths)
+            vector_service = get_vector_service()
+            existing = await asyncio.to_thread(indexed_point_ids, vector_service, [point[0] for point in points])
+            await asyncio.to_thread(vector_service.upsert, points)
+        except Exception as e:
+            print(f"[ingestion_service] Failed to index batch: {e}")
+            self.stats["failed"] += len(classified)
+            for item, _ in classified:
+                self._finish(item, {"status": "error", "error": str(e)})
+            return
+        builder = get_taxonomy_builder()
+        for (item, topics), (point_id, _, payload), paths in zip(classified, points, canonical):
+            builder.add_video_topics(paths, item[0]["yt_id"], already_indexed=point_id in existing)
+            self.stats["indexed"] += 1
+            self._finish(item, {"status": "indexed", "topics": topics, "taxonomy_ids": payload["taxonomy_ids"]})
+
+    async def stop(self):
+        """
+        Encerra o worker e aguarda os lotes em andamento (usar no shutdown da aplicação).
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+_queue = None
+
+def get_ingestion_queue() -> IngestionQueue:
+    global _queue
+    if _queue is None:
+        _queue = IngestionQueue()
+    return _queue
+
+async def stop_ingestion_queue():
+    if _queue is not None:
+        await _queue.stop()
@@ -0,0 +1,247 @@
+import asyncio
+import os
+import shutil
+import time
+import uuid
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from app.core import config
+from app.services.embedding_service import get_openai_embeddings
+from app.services.file_processor import iter_csv_chunks, row_to_video, row_yt_id
+from app.services.ingestion_service import embedding_text, indexed_point_ids, point_id_for_video, prepare_indexed_video
+from app.services.taxonomy_builder import get_taxonomy_builder
+from app.services.topic_generator import TopicGenerator
+from app.services.vector_store import get_vector_service
+
+MAX_JOB_ERRORS = 50  # Erros guardados por job (os demais só são contados)
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+class JobCancelled(Exception):
+    """Job cancelado pelo usuário entre dois blocos."""
+
+class Job:
+    """
+    Estado de um job de ingestão de CSV: parse -> extract (LLM) -> embed -> index, em blocos de linhas.
+    """
+    def __init__(self, job_id: str, filename: str, spool_path: str):
+        self.id = job_id
+        self.filename = filename
+        self.spool_path = spool_path
+        self.status = "queued"
+        self.stage = None
+        self.rows_processed = 0
+        self.rows_indexed = 0
+        self.rows_failed = 0
+        self.chunks_done = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.error_count = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+
+    def add_error(self, message: str, yt_id: str = None, chunk: int = None):
+        self.error_count += 1
+        if len(self.errors) < MAX_JOB_ERRORS:
+            self.errors.append({"chunk": chunk, "yt_id": yt_id, "error": message})
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "rows_processed": self.rows_processed,
+            "rows_indexed": self.rows_indexed,
+            "rows_failed": self.rows_failed,
+            "chunks_done": self.chunks_done,
+            "elapsed": elapsed,
+            "rows_per_sec": self.rows_processed / elapsed if elapsed > 0 else 0.0,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class JobService:
+    """
+    Fila de jobs de ingestão: o upload é gravado em disco e um pool de workers (tarefas asyncio) processa
+    os arquivos em blocos de `chunk_size` linhas. O cancelamento é verificado entre blocos.
+    """
+    def __init__(self, jobs_dir: str = None, workers: int = None, chunk_size: int = None,
+                 llm_concurrency: int = None, topic_generator: TopicGenerator = None):
+        self.jobs_dir = jobs_dir or config.JOBS_DIR
+        self.workers = workers or config.JOB_WORKERS
+        self.chunk_size = chunk_size or config.JOB_CHUNK_SIZE
+        self.llm_concurrency = llm_concurrency or config.INGEST_LLM_CONCURRENCY
+        self.topic_generator = topic_generator or TopicGenerator()
+        self._jobs: Dict[str, Job] = {}
+        self._lock = Lock()
+        self._queue = None
+        self._llm_semaphore = None
+        self._worker_tasks = []
+
+    def _ensure_started(self):
+        # Criados sob demanda para ficarem no event loop da aplicação
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._llm_semaphore = asyncio.Semaphore(self.llm_concurrency)
+        self._worker_tasks = [t for t in self._worker_tasks if not t.done()]
+        loop = asyncio.get_running_loop()
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(loop.create_task(self._worker()))
+
+    def new_spool_path(self, filename: str) -> tuple:
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        return job_id, os.path.join(job_dir, "upload.csv")
+
+    def discard_spool(self, spool_path: str):
+        """Remove o upload gravado quando ele é rejeitado antes de virar job."""
+        shutil.rmtree(os.path.dirname(spool_path), ignore_errors=True)
+
+    async def submit(self, job_id: str, filename: str, spool_path: str) -> Job:
+        """Registra um upload já gravado em disco e o coloca na fila."""
+        self._ensure_started()
+        job = Job(job_id, filename, spool_path)
+        with self._lock:
+            self._jobs[job_id] = job
+        await self._queue.put(job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+        job.cancel_requested = True
+        if job.status == "queued":
+            self._finish(job, "cancelled")
+        return job
+
+    def _finish(self, job: Job, status: str):
+        job.status = status
+        job.stage = None
+        job.finished_at = time.time()
+        shutil.rmtree(os.path.dirname(job.spool_path), ignore_errors=True)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self.get(job_id)
+            if job is None or job.status != "queued":
+                continue
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                await self._run_job(job)
+                self._finish(job, "completed")
+            except JobCancelled:
+                self._finish(job, "cancelled")
+            except asyncio.CancelledError:
+                self._finish(job, "cancelled")
+                raise
+            except Exception as e:
+                print(f"[job_service] Job {job.id} failed: {e}")
+                job.add_error(str(e))
+                self._finish(job, "failed")
+
+    async def _run_job(self, job: Job):
+        job.stage = "parse"
+        reader = await asyncio.to_thread(iter_csv_chunks, job.spool_path, self.chunk_size)
+        chunk_number = 0
+        try:
+            while True:
+                if job.cancel_requested:
+                    raise JobCancelled()
+                job.stage = "parse"
+                chunk = await asyncio.to_thread(next, reader, None)
+                if chunk is None:
+                    break
+                await self._process_chunk(job, chunk, chunk_number)
+                chunk_number += 1
+                job.chunks_done = chunk_number
+        finally:
+            reader.close()
+
+    async def _classify(self, video: Dict[str, Any]) -> List[str]:
+        async with self._llm_semaphore:
+            return await self.topic_generator.agenerate_topics(video["title"], video["description"], video["transcript"])
+
+    async def _process_chunk(self, job: Job, chunk, chunk_number: int):
+        videos = []
+        for row in chunk.to_dict(orient="records"):
+            try:
+                videos.append(row_to_video(row))
+            except ValueError as e:
+                job.rows_failed += 1
+                job.add_error(str(e), yt_id=row_yt_id(row), chunk=chunk_number)
+        job.rows_processed += len(chunk)
+
+        job.stage = "extract"
+        results = await asyncio.gather(*(self._classify(v) for v in videos), return_exceptions=True)
+        classified = []
+        for video, topics in zip(videos, results):
+            if isinstance(topics, Exception):
+                job.rows_failed += 1
+                job.add_error(str(topics), yt_id=video["yt_id"], chunk=chunk_number)
+            else:
+                classified.append((video, topics))
+        if not classified:
+            return
+
+        try:
+            job.stage = "embed"
+            vectors = await get_openai_embeddings([embedding_text(v) for v, _ in classified])
+            job.stage = "index"
+            points, canonical = [], []
+            for (video, topics), vector in zip(classified, vectors):
+                payload, paths = prepare_indexed_video(video, topics)
+                points.append((point_id_for_video(video["yt_id"]), vector, payload))
+                canonical.append(paths)
+            vector_service = get_vector_service()
+            existing = await asyncio.to_thread(indexed_point_ids, vector_service, [point[0] for point in points])
+            await asyncio.to_thread(vector_service.upsert, points)
+        except Exception as e:
+            job.rows_failed += len(classified)
+            job.add_error(f"{job.stage}: {e}", chunk=chunk_number)
+            return
+        builder = get_taxonomy_builder()
+        for (video, _), (point_id, _, _), paths in zip(classified, points, canonical):
+            builder.add_video_topics(paths, video["yt_id"], already_indexed=point_id in existing)
+        job.rows_indexed += len(classified)
+
+    async def stop(self):
+        """
+        Cancela os workers (os jobs em andamento ficam como "cancelled"); usar no shutdown da aplicação.
+        """
+        for task in self._worker_tasks:
+            task.cancel()
+        if self._worker_tasks:
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+
+_service = None
+
+def get_job_service() -> JobService:
+    global _service
+    if _service is None:
+        _service = JobService()
+    return _service
+
+async def stop_job_service():
+    if _service is not None:
+        await _service.stop()
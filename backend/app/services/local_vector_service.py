@@ -0,0 +1,449 @@
+import asyncio
+import json
+import os
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.metrics import VECTOR_LATENCY
+from app.services.embedding_service import embed_query
+from app.utils.helpers import lexical_score, lexical_terms, point_to_result, payload_to_video
+
+# Campos de payload (keyword, multivalorados) que ganham um bitmap por valor
+TOPIC_FILTER_FIELD = "taxonomy_ancestor_ids"
+BITMAP_FIELDS = ("taxonomy_ids", TOPIC_FILTER_FIELD)
+MIN_CAPACITY = 1024
+# O log de payloads é compactado no snapshot quando passa de max(LOG_COMPACT_MIN, nº de pontos) entradas:
+# cada upsert grava só o seu lote e o custo da reescrita completa fica amortizado em O(1) por ponto
+LOG_COMPACT_MIN = 10_000
+
+
+class LocalVectorService:
+    """
+    Engine de busca vetorial em processo (NumPy), alternativa ao QdrantService para dev/testes locais
+    e baseline de busca exata para benchmarks.
+
+    - Vetores: matriz float32 normalizada em memory-map (`vectors.f32`), similaridade de cosseno via produto interno.
+    - Payloads: armazenamento colunar (uma lista por campo) persistido em `payloads.json` (snapshot) mais
+      `payloads.log` (JSON lines com os upserts desde o snapshot), compactado periodicamente.
+    - Filtros de tópico: bitmaps pré-computados por valor de `taxonomy_ids`/`taxonomy_ancestor_ids`.
+    - Busca: top-k exato por multiplicação de matrizes em blocos.
+    """
+    def __init__(self, data_dir: str = "app/data/local_index", collection_name: str = "videos_viewstats",
+                 dim: int = 1536, block_size: int = 16384):
+        self.collection_name = collection_name
+        self.dim = dim
+        self.block_size = block_size
+        self.data_dir = os.path.join(data_dir, collection_name)
+        self._vectors_path = os.path.join(self.data_dir, "vectors.f32")
+        self._payloads_path = os.path.join(self.data_dir, "payloads.json")
+        self._log_path = os.path.join(self.data_dir, "payloads.log")
+        self._log_entries = 0
+        self._meta_path = os.path.join(self.data_dir, "meta.json")
+        self._lock = Lock()
+        self._count = 0
+        self._capacity = 0
+        self._ids: List[str] = []
+        self._row_by_id: Dict[str, int] = {}
+        self._columns: Dict[str, List[Any]] = {}
+        self._bitmaps: Dict[str, Dict[str, np.ndarray]] = {field: {} for field in BITMAP_FIELDS}
+        self._vectors: Optional[np.memmap] = None
+        self._version = 0
+        self._range_columns: Dict[str, Tuple[int, np.ndarray]] = {}
+        self._term_index: Tuple[int, Dict[str, np.ndarray]] = (-1, {})
+        self._load()
+
+    async def ensure_ready(self):
+        """Mesma interface do QdrantService; o índice local já é carregado no construtor."""
+
+    async def ping(self) -> bool:
+        return self._vectors is not None
+
+    # --- Persistência ---
+    def _load(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("dim") != self.dim:
+                raise ValueError(f"Dimensão do índice local ({meta.get('dim')}) difere da configurada ({self.dim})")
+            self._count = meta["count"]
+            self._capacity = meta["capacity"]
+        if os.path.exists(self._payloads_path):
+            with open(self._payloads_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            self._ids = stored.get("ids", [])[:self._count]
+            self._columns = {name: col[:self._count] for name, col in stored.get("columns", {}).items()}
+            self._row_by_id = {pid: row for row, pid in enumerate(self._ids)}
+        self._count = len(self._ids)
+        self._replay_log()
+        capacity = max(self._capacity, MIN_CAPACITY)
+        while capacity < self._count:
+            capacity *= 2
+        self._resize(capacity)
+        self._rebuild_bitmaps()
+
+    def _replay_log(self):
+        """Reaplica os upserts gravados no log depois do snapshot (uma linha parcial no fim é ignorada)."""
+        if not os.path.exists(self._log_path):
+            return
+        with open(self._log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # Escrita interrompida: o vetor dessa linha também pode não ter sido persistido
+                row = self._row_by_id.get(entry["id"])
+                if row is None:
+                    self._append_row(entry["id"], entry["payload"])
+                else:
+                    self._set_payload(row, entry["payload"])
+                self._log_entries += 1
+
+    def _resize(self, capacity: int):
+        """
+        (Re)abre o memory-map com a capacidade pedida, crescendo o arquivo se necessário. O novo mapa substitui
+        o anterior numa única atribuição: leituras sem lock em andamento (search_by_vector, iter_points)
+        continuam no mapa antigo, que segue válido porque o arquivo só cresce.
+        """
+        if self._vectors is not None:
+            self._vectors.flush()
+        nbytes = capacity * self.dim * np.dtype(np.float32).itemsize
+        mode = "r+b" if os.path.exists(self._vectors_path) else "w+b"
+        with open(self._vectors_path, mode) as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < nbytes:
+                f.truncate(nbytes)
+        vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        for values in self._bitmaps.values():
+            for value, bitmap in values.items():
+                grown = np.zeros(capacity, dtype=bool)
+                grown[:len(bitmap)] = bitmap[:capacity]
+                values[value] = grown
+        self._capacity = capacity
+        self._vectors = vectors
+
+    def _rebuild_bitmaps(self):
+        self._bitmaps = {field: {} for field in BITMAP_FIELDS}
+        for field in BITMAP_FIELDS:
+            for row, values in enumerate(self._columns.get(field, [])):
+                self._set_bits(field, row, values)
+
+    def _set_bits(self, field: str, row: int, values):
+        if not values:
+            return
+        if not isinstance(values, list):
+            values = [values]
+        bitmaps = self._bitmaps[field]
+        for value in values:
+            bitmap = bitmaps.get(value)
+            if bitmap is None:
+                bitmap = bitmaps[value] = np.zeros(self._capacity, dtype=bool)
+            bitmap[row] = True
+
+    def _clear_bits(self, field: str, row: int):
+        for bitmap in self._bitmaps[field].values():
+            bitmap[row] = False
+
+    def flush(self):
+        """Persiste vetores e compacta os payloads num novo snapshot (escrita atômica via arquivo temporário + rename)."""
+        with self._lock:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        self._vectors.flush()
+        self._write_json(self._payloads_path, {"ids": self._ids, "columns": self._columns})
+        self._write_json(self._meta_path, {"dim": self.dim, "count": self._count, "capacity": self._capacity})
+        # Depois do snapshot gravado: uma queda entre os dois passos só reaplica upserts idempotentes
+        open(self._log_path, "w").close()
+        self._log_entries = 0
+
+    def _append_log_locked(self, entries: List[dict]):
+        """Vetores primeiro, depois as linhas do lote no log; compacta quando o log fica grande."""
+        self._vectors.flush()
+        with open(self._log_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+        self._log_entries += len(entries)
+        if self._log_entries > max(LOG_COMPACT_MIN, self._count):
+            self._compact_locked()
+
+    @staticmethod
+    def _write_json(path: str, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    # --- Escrita ---
+    def upsert(self, points: Iterable[Tuple[Any, List[float], Optional[dict]]]) -> int:
+        """
+        Insere/atualiza pontos (id, vetor, payload) e persiste uma única vez ao final do lote, anexando só
+        os pontos do lote ao log de payloads.
+        """
+        entries = []
+        with self._lock:
+            for point_id, vector, payload in points:
+                entries.append(self._upsert_one(str(point_id), vector, payload or {}))
+            self._version += 1
+            if entries:
+                self._append_log_locked(entries)
+        return len(entries)
+
+    def _upsert_one(self, point_id: str, vector: List[float], payload: dict) -> dict:
+        vec = np.asarray(vector, dtype=np.float32)
+        if vec.shape != (self.dim,):
+            raise ValueError(f"Vetor com dimensão {vec.shape} inválida (esperado {self.dim})")
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+        row = self._row_by_id.get(point_id)
+        if row is None:
+            if self._count == self._capacity:
+                self._resize(self._capacity * 2)
+            self._vectors[self._count] = vec  # Antes de publicar a linha: leitores só veem linhas < _count
+            row = self._append_row(point_id, payload)
+        else:
+            for field in BITMAP_FIELDS:
+                self._clear_bits(field, row)
+            self._vectors[row] = vec
+            self._set_payload(row, payload)
+        for field in BITMAP_FIELDS:
+            self._set_bits(field, row, payload.get(field))
+        return {"id": point_id, "payload": payload}
+
+    def _append_row(self, point_id: str, payload: dict) -> int:
+        """Nova linha com id e payload já preenchidos; só então _count a torna visível para as leituras."""
+        row = self._count
+        for name, col in self._columns.items():
+            col.append(payload.get(name))
+        for name, value in payload.items():
+            if name not in self._columns:
+                self._columns[name] = [None] * row + [value]
+        self._ids.append(point_id)
+        self._row_by_id[point_id] = row
+        self._count += 1
+        return row
+
+    def _set_payload(self, row: int, payload: dict):
+        for name in self._columns:
+            self._columns[name][row] = payload.get(name)
+        for name, value in payload.items():
+            if name not in self._columns:
+                col = [None] * self._count
+                col[row] = value
+                self._columns[name] = col
+
+    def insert_vector(self, id: int, vector: list[float], payload: dict = None):
+        self.upsert([(id, vector, payload)])
+        return {"status": "ok", "id": id}
+
+    # --- Leitura ---
+    def _payload(self, row: int) -> dict:
+        return {name: col[row] for name, col in self._columns.items() if col[row] is not None}
+
+    def retrieve(self, ids: list) -> list[dict]:
+        """
+        Recupera payloads por id de ponto. Retorna uma lista de {"id", "payload"} na ordem encontrada.
+        """
+        results = []
+        for point_id in ids:
+            row = self._row_by_id.get(str(point_id))
+            if row is not None:
+                results.append({"id": point_id, "payload": self._payload(row)})
+        return results
+
+    def _range_column(self, name: str, textual: bool) -> np.ndarray:
+        """Coluna de payload como array NumPy (numérica, ou texto para datas RFC 3339), recalculada só após escritas."""
+        cache_key = f"{name}:{'str' if textual else 'num'}"
+        cached = self._range_columns.get(cache_key)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        col = self._columns.get(name, [None] * self._count)
+        if textual:
+            array = np.array([v or "" for v in col], dtype=str) if col else np.empty(0, dtype=str)
+        else:
+            array = np.array([np.nan if v is None else v for v in col], dtype=np.float64)
+        self._range_columns[cache_key] = (self._version, array)
+        return array
+
+    def _title_term_index(self) -> Dict[str, np.ndarray]:
+        """Índice invertido termo -> linhas dos títulos (busca lexical), reconstruído só após escritas."""
+        version, index = self._term_index
+        if version == self._version:
+            return index
+        postings: Dict[str, List[int]] = {}
+        for row, title in enumerate(self._columns.get("title", [])):
+            for term in lexical_terms(title):
+                postings.setdefault(term, []).append(row)
+        index = {term: np.array(rows, dtype=np.int64) for term, rows in postings.items()}
+        self._term_index = (self._version, index)
+        return index
+
+    def _condition_mask(self, condition: dict) -> np.ndarray:
+        bounds = condition["range"]
+        textual = any(isinstance(v, str) for v in bounds.values())
+        values = self._range_column(condition["key"], textual)
+        mask = values != "" if textual else ~np.isnan(values)
+        for op, bound in bounds.items():
+            if op == "gte":
+                mask &= values >= bound
+            elif op == "gt":
+                mask &= values > bound
+            elif op == "lte":
+                mask &= values <= bound
+            elif op == "lt":
+                mask &= values < bound
+        return mask
+
+    def _filter_mask(self, topic_filter: Optional[str], conditions: list[dict] = None, n: int = None) -> Optional[np.ndarray]:
+        """Máscara das `n` primeiras linhas (padrão: todas); colunas em cache mais curtas completam com False."""
+        n = self._count if n is None else n
+        mask = None
+        if topic_filter:
+            bitmap = self._bitmaps[TOPIC_FILTER_FIELD].get(topic_filter)
+            mask = bitmap[:n].copy() if bitmap is not None else np.zeros(n, dtype=bool)
+        for condition in conditions or []:
+            condition_mask = self._condition_mask(condition)[:n]
+            if len(condition_mask) < n:
+                condition_mask = np.concatenate([condition_mask, np.zeros(n - len(condition_mask), dtype=bool)])
+            mask = condition_mask if mask is None else mask & condition_mask
+        return mask
+
+    def search_by_vector(self, vector: List[float], topic_filter: str = None, top_k: int = 10, conditions: list[dict] = None) -> list[dict]:
+        """
+        Top-k exato por cosseno: produto matriz-vetor em blocos de `block_size` linhas,
+        mantendo apenas os k melhores candidatos entre blocos.
+        """
+        # Contagem antes do mapa: uma linha só é contada depois de escrita, e o mapa lido depois já a contém
+        n = self._count
+        vectors = self._vectors
+        if n == 0 or top_k <= 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        mask = self._filter_mask(topic_filter, conditions, n)
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, n, self.block_size):
+            stop = min(n, start + self.block_size)
+            if mask is not None:
+                block_mask = mask[start:stop]
+                if not block_mask.any():
+                    continue
+            scores = vectors[start:stop] @ query
+            if mask is not None:
+                scores = np.where(block_mask, scores, -np.inf)
+            k = min(top_k, stop - start)
+            part = np.argpartition(-scores, k - 1)[:k]
+            best_scores = np.concatenate([best_scores, scores[part]])
+            best_rows = np.concatenate([best_rows, part + start])
+            if len(best_scores) > top_k:
+                keep = np.argpartition(-best_scores, top_k - 1)[:top_k]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+        order = np.argsort(-best_scores, kind="stable")
+        return [
+            point_to_result(self._ids[row], self._payload(row), float(score))
+            for score, row in zip(best_scores[order], best_rows[order])
+            if np.isfinite(score)
+        ]
+
+    def lexical_search(self, query: str, topic_filter: str = None, top_k: int = 10, conditions: list[dict] = None) -> list[dict]:
+        """
+        Busca por termos no título (modo degradado, sem embedding): mais termos encontrados primeiro e, no
+        empate, mais views. Score = fração dos termos da consulta presentes no título.
+        """
+        with VECTOR_LATENCY.time(backend="local", operation="lexical"):
+            return self._lexical_search(lexical_terms(query), topic_filter, top_k, conditions)
+
+    def _lexical_search(self, terms: list, topic_filter: str, top_k: int, conditions: list[dict]) -> list[dict]:
+        index = self._title_term_index()
+        postings = [index[term] for term in terms if term in index]
+        if not postings or top_k <= 0:
+            return []
+        n = self._count
+        hits = np.bincount(np.concatenate(postings), minlength=n)[:n]
+        mask = self._filter_mask(topic_filter, conditions, n)
+        if mask is not None:
+            hits = np.where(mask, hits, 0)
+        rows = np.flatnonzero(hits)
+        views = self._columns.get("view_sort_key") or [0] * n
+        keys = np.array([views[row] or 0 for row in rows], dtype=np.int64)
+        rows = rows[np.lexsort((-keys, -hits[rows]))][:top_k]
+        results = []
+        for row in rows:
+            payload = self._payload(row)
+            results.append(point_to_result(self._ids[row], payload, lexical_score(terms, payload.get("title", ""))))
+        return results
+
+    def scroll(self, topic_filter: str = None, limit: int = 10, conditions: list[dict] = None) -> list[dict]:
+        mask = self._filter_mask(topic_filter, conditions)
+        rows = np.flatnonzero(mask)[:limit] if mask is not None else range(min(limit, self._count))
+        return [point_to_result(self._ids[row], self._payload(row), 1.0) for row in rows]
+
+    def iter_points(self, topic_filter: str = None, fields: List[str] = None, with_vectors: bool = False,
+                    batch_size: int = 1000) -> Iterable[List[Tuple[str, dict, Optional[np.ndarray]]]]:
+        """
+        Mesma interface do QdrantService.iter_points: todos os pontos (ou os de um nó da taxonomia) em lotes
+        de (id, payload, vetor float32 ou None), só com os campos pedidos do payload.
+        """
+        n = self._count
+        vectors = self._vectors
+        mask = self._filter_mask(topic_filter, n=n)
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(n)
+        for start in range(0, len(rows), batch_size):
+            with VECTOR_LATENCY.time(backend="local", operation="export"):
+                batch = []
+                for row in rows[start:start + batch_size]:
+                    payload = self._payload(row)
+                    if fields is not None:
+                        payload = {name: payload[name] for name in fields if name in payload}
+                    vector = np.array(vectors[row], dtype=np.float32) if with_vectors else None
+                    batch.append((self._ids[row], payload, vector))
+            yield batch
+
+    @staticmethod
+    def parse_cursor(cursor: str, sort: str) -> int:
+        """Cursor de browse_by_topic: posição (inteiro >= 0) na lista filtrada. ValueError se inválido."""
+        position = int(cursor)
+        if position < 0:
+            raise ValueError(f"negative cursor: {cursor}")
+        return position
+
+    def browse_by_topic(self, topic_id: str, limit: int = 12, cursor: str = None, sort: str = None, skip: int = 0) -> dict:
+        """
+        Mesma interface do QdrantService.browse_by_topic; aqui o cursor é a posição na lista filtrada
+        (ordenada por view_sort_key quando sort="views", com ordenação estável nos empates).
+        """
+        with VECTOR_LATENCY.time(backend="local", operation="browse"):
+            return self._browse_by_topic(topic_id, limit, cursor, sort, skip)
+
+    def _browse_by_topic(self, topic_id: str, limit: int, cursor: str, sort: str, skip: int) -> dict:
+        rows = np.flatnonzero(self._filter_mask(topic_id))
+        if sort == "views":
+            keys = np.array([self._columns.get("view_sort_key", [None] * self._count)[row] or 0 for row in rows], dtype=np.int64)
+            rows = rows[np.argsort(-keys, kind="stable")]
+        start = (self.parse_cursor(cursor, sort) if cursor else 0) + skip
+        page = rows[start:start + limit]
+        next_start = start + len(page)
+        return {
+            "videos": [payload_to_video(self._ids[row], self._payload(row)) for row in page],
+            "next_cursor": str(next_start) if next_start < len(rows) else None
+        }
+
+    def count_by_topic(self, topic_id: str) -> int:
+        with VECTOR_LATENCY.time(backend="local", operation="count"):
+            return int(self._filter_mask(topic_id).sum())
+
+    async def search_vectors(self, query: str = None, topic_filter: str = None, top_k: int = 10, conditions: list[dict] = None):
+        """
+        Mesma interface do QdrantService: se query, faz busca vetorial; se não, faz scroll.
+        """
+        if query and query.strip():
+            query_vec = await embed_query(query)
+            with VECTOR_LATENCY.time(backend="local", operation="search"):
+                return await asyncio.to_thread(self.search_by_vector, query_vec, topic_filter, top_k, conditions)
+        with VECTOR_LATENCY.time(backend="local", operation="scroll"):
+            return self.scroll(topic_filter=topic_filter, limit=top_k, conditions=conditions)
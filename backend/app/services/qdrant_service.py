@@ -1,84 +1,332 @@
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import PointStruct
+from qdrant_client.http import models as qmodels
+from qdrant_client.http.models import PointStruct, PayloadSchemaType
 import numpy as np
 from app.services.topic_generator import TopicGenerator
-from app.services.embedding_service import get_openai_embeddings
+from app.services.embedding_service import embed_query
+from app.services.ingestion_service import prepare_indexed_video
+from app.services.taxonomy_builder import get_taxonomy_builder
+from app.utils.helpers import lexical_score, lexical_terms, point_to_result, payload_to_video
+from app.core.metrics import VECTOR_LATENCY
 import asyncio
+import uuid
+from threading import Lock
+
+# taxonomy_ancestor_ids contém todos os ancestrais de cada nó atribuído ao vídeo,
+# então um único match filtra a sub-árvore inteira de um tópico
+TOPIC_FILTER_FIELD = "taxonomy_ancestor_ids"
+KEYWORD_INDEX_FIELDS = ("taxonomy_ids", TOPIC_FILTER_FIELD)
+# Chave inteira ordenada por view_count, com desempate por hash do yt_id (pré-computada pelo indexer)
+VIEW_SORT_FIELD = "view_sort_key"
+INTEGER_INDEX_FIELDS = ("view_count", VIEW_SORT_FIELD, "duration_seconds")
+DATETIME_INDEX_FIELDS = ("upload_date",)
+TEXT_INDEX_FIELDS = ("title",)  # Busca lexical do modo degradado (MatchText)
+SEEK_BATCH_SIZE = 1000
 
 class QdrantService:
+    """
+    Construir o serviço não acessa a rede: o cliente é criado no primeiro uso e a coleção/índices são
+    verificados uma única vez por ensure_ready() (chamado na inicialização, ver services/readiness.py).
+    """
     def __init__(self, host: str = 'qdrant', port: int = 6333, collection_name: str = 'videos_viewstats'):
-        self.client = QdrantClient(host=host, port=port)
+        self.host = host
+        self.port = port
         self.collection_name = collection_name
-        self._ensure_collection()
+        self._client = None
+        self._client_lock = Lock()
+        self._ready = False
+        self._ready_lock = asyncio.Lock()
 
-    def _ensure_collection(self):
+    @property
+    def client(self) -> QdrantClient:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = QdrantClient(host=self.host, port=self.port)
+        return self._client
+
+    async def ensure_ready(self):
+        """Verifica (e cria, se preciso) a coleção e os índices de payload, fora do event loop e uma só vez."""
+        if self._ready:
+            return
+        async with self._ready_lock:
+            if not self._ready:
+                await asyncio.to_thread(self._ensure_collection)
+                self._ready = True
+
+    async def ping(self) -> bool:
+        """Qdrant acessível e coleção existente (usado por /readyz)."""
         try:
-            if self.collection_name not in [c.name for c in self.client.get_collections().collections]:
-                self.client.recreate_collection(
+            await asyncio.to_thread(self.client.get_collection, self.collection_name)
+            return True
+        except Exception:
+            return False
+
+    def _ensure_collection(self):
+        # Falha de conexão aqui propaga: a inicialização tenta de novo e o worker não fica pronto
+        if self.collection_name not in [c.name for c in self.client.get_collections().collections]:
+            self.client.recreate_collection(
+                collection_name=self.collection_name,
+                vectors_config={"size": 1536, "distance": "Cosine"}  # 1536 para text-embedding-3-small
+            )
+        # Um try por índice: a falha de um (ex.: tipo já existente com outro schema) não impede os demais
+        indexes = [(field, PayloadSchemaType.KEYWORD) for field in KEYWORD_INDEX_FIELDS]
+        indexes += [(field, PayloadSchemaType.INTEGER) for field in INTEGER_INDEX_FIELDS]
+        indexes += [(field, PayloadSchemaType.DATETIME) for field in DATETIME_INDEX_FIELDS]
+        indexes += [(field, PayloadSchemaType.TEXT) for field in TEXT_INDEX_FIELDS]
+        for field, schema in indexes:
+            try:
+                self.client.create_payload_index(
                     collection_name=self.collection_name,
-                    vectors_config={"size": 1536, "distance": "Cosine"}  # 1536 para text-embedding-3-small
+                    field_name=field,
+                    field_schema=schema
                 )
-        except Exception:
-            pass
+            except Exception as e:
+                print(f"[qdrant_service] Failed to create payload index on {field}: {e}")
 
     def insert_vector(self, id: int, vector: list[float], payload: dict = None):
         point = PointStruct(id=id, vector=vector, payload=payload or {})
         self.client.upsert(collection_name=self.collection_name, points=[point])
         return {"status": "ok", "id": id}
 
+    def upsert(self, points) -> int:
+        """
+        Insere/atualiza pontos (id, vetor, payload) em uma única chamada.
+        """
+        structs = [PointStruct(id=point_id, vector=vector, payload=payload or {}) for point_id, vector, payload in points]
+        if structs:
+            self.client.upsert(collection_name=self.collection_name, points=structs)
+        return len(structs)
+
+    def retrieve(self, ids: list) -> list[dict]:
+        """
+        Recupera payloads por id de ponto. Retorna uma lista de {"id", "payload"} na ordem encontrada.
+        """
+        points = self.client.retrieve(collection_name=self.collection_name, ids=ids, with_payload=True)
+        return [{"id": point.id, "payload": point.payload or {}} for point in points]
+
+    @staticmethod
+    def parse_cursor(cursor: str, sort: str):
+        """
+        Cursor de browse_by_topic: "view_sort_key:id do último ponto" ordenando por views (só a chave, formato
+        antigo, continua aceito) e o id do ponto (inteiro ou UUID) na ordem do índice. ValueError se inválido.
+        """
+        if sort == "views":
+            key, _, last_id = cursor.partition(":")
+            return int(key), last_id or None
+        return int(cursor) if cursor.isdigit() else str(uuid.UUID(cursor))
+
+    @staticmethod
+    def _format_cursor(cursor):
+        if cursor is None:
+            return None
+        return f"{cursor[0]}:{cursor[1]}" if isinstance(cursor, tuple) else str(cursor)
+
+    def _key_group(self, must: list, key: int, with_payload=True) -> list:
+        """Pontos com exatamente esta view_sort_key (colisões do hash de desempate), ordenados pelo id."""
+        points, _ = self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=qmodels.Filter(must=must + [
+                qmodels.FieldCondition(key=VIEW_SORT_FIELD, range=qmodels.Range(gte=key, lte=key))
+            ]),
+            limit=SEEK_BATCH_SIZE,
+            with_payload=with_payload,
+            with_vectors=False
+        )
+        return sorted(points, key=lambda point: str(point.id))
+
+    def _scroll_topic_page(self, topic_id: str, limit: int, cursor, sort: str, with_payload=True):
+        """
+        Uma página da navegação por tópico. Sem ordenação, usa o cursor nativo do scroll (next_page_offset).
+        Ordenando por views, usa order_by + range (view_sort_key < chave do cursor), servidos pelos índices de
+        payload. A chave desempata por um hash de 20 bits, então vídeos com o mesmo número de views podem
+        colidir; os pontos de uma mesma chave são paginados pelo id (cursor "chave:id"), buscando o grupo da
+        chave na fronteira da página.
+        """
+        topic = [qmodels.FieldCondition(key=TOPIC_FILTER_FIELD, match=qmodels.MatchValue(value=topic_id))]
+        if sort == "views":
+            key, last_id = cursor if cursor is not None else (None, None)
+            points = []
+            if last_id is not None:
+                # Restante do grupo da chave do cursor, depois do último id já entregue
+                points = [p for p in self._key_group(topic, key, with_payload) if str(p.id) > last_id][:limit]
+            if len(points) < limit:
+                must = list(topic)
+                if key is not None:
+                    must.append(qmodels.FieldCondition(key=VIEW_SORT_FIELD, range=qmodels.Range(lt=key)))
+                page, _ = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=qmodels.Filter(must=must),
+                    limit=limit - len(points),
+                    order_by=qmodels.OrderBy(key=VIEW_SORT_FIELD, direction=qmodels.Direction.DESC),
+                    with_payload=with_payload,
+                    with_vectors=False
+                )
+                if page and len(points) + len(page) == limit:
+                    # A página pode ter cortado o grupo da última chave: fica com os menores ids do grupo
+                    last_key = page[-1].payload[VIEW_SORT_FIELD]
+                    tail = sum(1 for p in page if p.payload[VIEW_SORT_FIELD] == last_key)
+                    page = page[:-tail] + self._key_group(topic, last_key, with_payload)[:tail]
+                points += page
+            if len(points) < limit:
+                return points, None
+            return points, (points[-1].payload[VIEW_SORT_FIELD], str(points[-1].id))
+        return self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=qmodels.Filter(must=topic),
+            limit=limit,
+            offset=cursor,
+            with_payload=with_payload,
+            with_vectors=False
+        )
+
+    def iter_points(self, topic_filter: str = None, fields: list[str] = None, with_vectors: bool = False,
+                    batch_size: int = 1000):
+        """
+        Percorre a coleção inteira (ou o nó da taxonomia `topic_filter` e descendentes) com scroll paginado,
+        um lote de (id, payload, vetor float32 ou None) por página: memória constante, independente do tamanho.
+        `fields` limita os campos do payload trazidos do Qdrant.
+        """
+        scroll_filter = None
+        if topic_filter:
+            scroll_filter = qmodels.Filter(must=[
+                qmodels.FieldCondition(key=TOPIC_FILTER_FIELD, match=qmodels.MatchValue(value=topic_filter))
+            ])
+        offset = None
+        while True:
+            with VECTOR_LATENCY.time(backend="qdrant", operation="export"):
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=scroll_filter,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=list(fields) if fields is not None else True,
+                    with_vectors=with_vectors
+                )
+            yield [
+                (point.id, point.payload or {}, np.asarray(point.vector, dtype=np.float32) if with_vectors else None)
+                for point in points
+            ]
+            if offset is None:
+                break
+
+    def browse_by_topic(self, topic_id: str, limit: int = 12, cursor: str = None, sort: str = None, skip: int = 0) -> dict:
+        """
+        Pagina os vídeos de um nó da taxonomia (incluindo descendentes) por cursor, com custo constante por página.
+        `skip` (compatibilidade com paginação por número de página) avança o cursor buscando apenas a chave de paginação.
+        """
+        with VECTOR_LATENCY.time(backend="qdrant", operation="browse"):
+            return self._browse_by_topic(topic_id, limit, cursor, sort, skip)
+
+    def _browse_by_topic(self, topic_id: str, limit: int, cursor: str, sort: str, skip: int) -> dict:
+        cursor = self.parse_cursor(cursor, sort) if cursor else None
+        while skip > 0:
+            batch = min(skip, SEEK_BATCH_SIZE)
+            points, cursor = self._scroll_topic_page(
+                topic_id, batch, cursor, sort,
+                with_payload=[VIEW_SORT_FIELD] if sort == "views" else False
+            )
+            skip -= batch
+            if cursor is None or len(points) < batch:
+                return {"videos": [], "next_cursor": None}
+        points, next_cursor = self._scroll_topic_page(topic_id, limit, cursor, sort)
+        return {
+            "videos": [payload_to_video(point.id, point.payload) for point in points],
+            "next_cursor": self._format_cursor(next_cursor)
+        }
+
+    def count_by_topic(self, topic_id: str) -> int:
+        with VECTOR_LATENCY.time(backend="qdrant", operation="count"):
+            result = self.client.count(
+                collection_name=self.collection_name,
+                count_filter=qmodels.Filter(must=[
+                    qmodels.FieldCondition(key=TOPIC_FILTER_FIELD, match=qmodels.MatchValue(value=topic_id))
+                ]),
+                exact=True
+            )
+        return result.count
+
     def index_video_with_topics(self, id: int, vector: list[float], title: str, description: str, transcript: str, channel_id: str = None):
         """
         Pipeline: gera tópicos com LLM, monta payload e insere no Qdrant.
+        Caminho síncrono de um vídeo; para ingestão em volume use a fila de ingestion_service.
         """
-        # TODO: Chamar TopicGenerator e montar payload
-        raise NotImplementedError("Pipeline de indexação com tópicos não implementado.")
+        topics = TopicGenerator().generate_topics(title, description, transcript)
+        video = {"yt_id": str(id), "title": title, "description": description, "channel_id": channel_id}
+        payload, canonical_paths = prepare_indexed_video(video, topics)
+        already_indexed = bool(self.retrieve([id]))
+        self.insert_vector(id, vector, payload)
+        get_taxonomy_builder().add_video_topics(canonical_paths, str(id), already_indexed=already_indexed)
+        return {"status": "ok", "id": id, "topics": topics, "taxonomy_ids": payload["taxonomy_ids"]}
 
-    async def search_vectors(self, query: str = None, topic_filter: str = None, top_k: int = 10):
+    async def search_vectors(self, query: str = None, topic_filter: str = None, top_k: int = 10, conditions: list[dict] = None):
         """
-        Busca real: se query, faz busca vetorial; se não, faz scroll. Sempre aplica filtro por tópico se fornecido.
+        Busca real: se query, faz busca vetorial; se não, faz scroll. Sempre aplica filtro por tópico se fornecido
+        (o tópico e todos os seus descendentes) e as condições de range de metadados (ver search_filters),
+        resolvidos pelos índices de payload durante a busca, sem pós-filtragem.
         """
-        filter_ = None
+        must = list(conditions or [])
         if topic_filter:
-            filter_ = {
-                "must": [
-                    {"key": "taxonomy_ids", "match": {"value": topic_filter}}
-                ]
-            }
+            must.insert(0, {"key": TOPIC_FILTER_FIELD, "match": {"value": topic_filter}})
+        filter_ = qmodels.Filter(must=must) if must else None
         if query and query.strip():
             # Busca vetorial real com OpenAI
-            query_vec = (await get_openai_embeddings([query]))[0]
-            hits = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=query_vec,
-                limit=top_k,
-                query_filter=filter_
-            )
-            results = []
-            for point in hits:
-                payload = point.payload or {}
-                results.append({
-                    "id": payload.get("yt_id", str(point.id)),
-                    "score": point.score,
-                    "title": payload.get("title", ""),
-                    "description": payload.get("description_llm", ""),
-                    "topics_path": payload.get("taxonomy_ids", [])
-                })
-            return results
+            query_vec = await embed_query(query)
+            # Chamada de rede síncrona do cliente: fora do event loop, para que as vagas do controle de
+            # admissão, o single-flight e o micro-batch de embeddings continuem andando durante a busca
+            with VECTOR_LATENCY.time(backend="qdrant", operation="search"):
+                hits = await asyncio.to_thread(
+                    self.client.search,
+                    collection_name=self.collection_name,
+                    query_vector=query_vec,
+                    limit=top_k,
+                    query_filter=filter_
+                )
+            return [point_to_result(point.id, point.payload, point.score) for point in hits]
         else:
             # Scroll (sem query)
-            hits = self.client.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=filter_,
-                limit=top_k
-            )[0]
-            results = []
-            for point in hits:
-                payload = point.payload or {}
-                results.append({
-                    "id": payload.get("yt_id", str(point.id)),
-                    "score": 1.0,
-                    "title": payload.get("title", ""),
-                    "description": payload.get("description_llm", ""),
-                    "topics_path": payload.get("taxonomy_ids", [])
-                })
-            return results 
\ No newline at end of file
+            with VECTOR_LATENCY.time(backend="qdrant", operation="scroll"):
+                hits, _ = await asyncio.to_thread(
+                    self.client.scroll,
+                    collection_name=self.collection_name,
+                    scroll_filter=filter_,
+                    limit=top_k
+                )
+            return [point_to_result(point.id, point.payload, 1.0) for point in hits]
+
+    def lexical_search(self, query: str, topic_filter: str = None, top_k: int = 10, conditions: list[dict] = None):
+        """
+        Busca por termos no título (modo degradado, sem embedding), pelo índice de texto do título, com a mesma
+        ordem do backend local: mais termos encontrados primeiro e, no empate, mais views. Os vídeos com todos
+        os termos vêm de uma consulta própria; os com só parte deles, dos mais vistos entre os que têm algum.
+        Score = fração dos termos presentes no título.
+        """
+        terms = lexical_terms(query)
+        if not terms or top_k <= 0:
+            return []
+        must = list(conditions or [])
+        if topic_filter:
+            must.insert(0, {"key": TOPIC_FILTER_FIELD, "match": {"value": topic_filter}})
+        matches = [{"key": "title", "match": {"text": term}} for term in terms]
+        with VECTOR_LATENCY.time(backend="qdrant", operation="lexical"):
+            points = self._scroll_by_views(qmodels.Filter(must=must + matches), top_k) if len(terms) > 1 else []
+            if len(points) < top_k:
+                seen = {point.id for point in points}
+                points += [point for point in self._scroll_by_views(qmodels.Filter(must=must or None, should=matches), top_k)
+                           if point.id not in seen]
+        ranked = sorted(
+            ((lexical_score(terms, (point.payload or {}).get("title", "")), point) for point in points),
+            key=lambda item: (-item[0], -((item[1].payload or {}).get(VIEW_SORT_FIELD) or 0))
+        )
+        return [point_to_result(point.id, point.payload, score) for score, point in ranked[:top_k]]
+
+    def _scroll_by_views(self, scroll_filter: qmodels.Filter, limit: int) -> list:
+        points, _ = self.client.scroll(
+            collection_name=self.collection_name,
+            scroll_filter=scroll_filter,
+            limit=limit,
+            order_by=qmodels.OrderBy(key=VIEW_SORT_FIELD, direction=qmodels.Direction.DESC),
+            with_payload=True,
+            with_vectors=False
+        )
+        return points
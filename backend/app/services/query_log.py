@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from threading import Lock, Timer
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from app.core import config
+from app.core.metrics import CACHE_WARMUP
+
+
+class QueryLog:
+    """
+    Registro das buscas mais frequentes (query, topic_filter, frequência), usado para aquecer os caches
+    depois de um deploy. As contagens decaem pela metade a cada `half_life` segundos (janela móvel), a
+    tabela em memória é podada para as `size` mais frequentes e o top-N é gravado em disco periodicamente
+    (escrita atômica). Com vários workers, cada um grava a sua visão (o último a gravar prevalece), o que
+    basta para saber quais buscas são populares.
+    """
+    def __init__(self, path: str = None, size: int = None, flush_interval: float = None, half_life: float = None):
+        self.path = path or config.QUERY_LOG_PATH
+        self.size = size or config.QUERY_LOG_SIZE
+        self.flush_interval = config.QUERY_LOG_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.half_life = half_life or config.QUERY_LOG_HALF_LIFE
+        self._lock = Lock()
+        self._entries = {}  # (query normalizada, topic_filter) -> [contagem, query como foi digitada]
+        self._decayed_at = time.time()
+        self._timer = None
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def make_key(query: str, topic_filter: str = None) -> tuple:
+        return ((query or "").strip().lower(), topic_filter or None)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"[query_log] Failed to load query log: {e}")
+            return
+        # Contagens do arquivo envelhecidas pelo tempo desde a gravação
+        factor = self._decay_factor(time.time() - data.get("saved_at", time.time()))
+        for item in data.get("entries", []):
+            key = self.make_key(item["query"], item.get("topic_filter"))
+            self._entries[key] = [item["count"] * factor, item["query"]]
+
+    def _decay_factor(self, elapsed: float) -> float:
+        return 0.5 ** (max(elapsed, 0.0) / self.half_life)
+
+    def record(self, query: str, topic_filter: str = None):
+        """Conta uma busca (O(1) no caminho da requisição; poda e gravação ficam para depois)."""
+        key = self.make_key(query, topic_filter)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = [1.0, query.strip()]
+            else:
+                entry[0] += 1
+                entry[1] = query.strip()
+            if len(self._entries) > 2 * self.size:
+                self._prune()
+            self._dirty = True
+            if self._timer is None and self.flush_interval > 0:
+                self._timer = Timer(self.flush_interval, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _prune(self):
+        keep = sorted(self._entries.items(), key=lambda item: item[1][0], reverse=True)[:self.size]
+        self._entries = dict(keep)
+
+    def top(self, n: int = None) -> List[Tuple[str, Optional[str], float]]:
+        """As n buscas mais frequentes: (query como foi digitada, topic_filter, contagem)."""
+        with self._lock:
+            ranked = sorted(self._entries.items(), key=lambda item: item[1][0], reverse=True)[:n or self.size]
+        return [(text, key[1], count) for key, (count, text) in ranked]
+
+    def save(self):
+        """Aplica o decaimento e grava o top-N (arquivo temporário no mesmo diretório + rename atômico)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            now = time.time()
+            factor = self._decay_factor(now - self._decayed_at)
+            self._decayed_at = now
+            for entry in self._entries.values():
+                entry[0] *= factor
+            self._prune()
+            self._dirty = False
+            data = {
+                "saved_at": now,
+                "entries": [{"query": text, "topic_filter": key[1], "count": round(count, 3)}
+                            for key, (count, text) in self._entries.items()],
+            }
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".query_log-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _flush_in_background(self):
+        try:
+            self.save()
+        except Exception as e:
+            print(f"[query_log] Failed to save query log: {e}")
+
+    def close(self):
+        """Grava as contagens pendentes (usar no shutdown da aplicação)."""
+        with self._lock:
+            dirty = self._dirty
+        if dirty:
+            self._flush_in_background()
+
+
+async def warm_up(query_log: QueryLog, search: Callable[[str, Optional[str]], Awaitable[bool]],
+                  top: int = None, budget: float = None, concurrency: int = None) -> dict:
+    """
+    Aquece os caches com as buscas mais frequentes do log: embeddings de todas as consultas numa única
+    chamada em lote e depois a primeira página de cada busca (`search(query, topic_filter)` retorna False
+    se ela já estava em cache), com no máximo `concurrency` buscas simultâneas. Para quando o orçamento de
+    `budget` segundos acaba; falhas são contadas e nunca interrompem a inicialização.
+    """
+    from app.services.embedding_service import prefetch_query_embeddings
+    top = config.QUERY_WARMUP_TOP if top is None else top
+    budget = config.QUERY_WARMUP_BUDGET if budget is None else budget
+    concurrency = concurrency or config.QUERY_WARMUP_CONCURRENCY
+    entries = query_log.top(top) if top > 0 else []
+    stats = {"queries": len(entries), "warmed": 0, "cached": 0, "failed": 0, "skipped": 0}
+    if not entries or budget <= 0:
+        return stats
+    deadline = time.monotonic() + budget
+
+    async def embed_all():
+        await prefetch_query_embeddings([text for text, _, _ in entries if text])
+
+    try:
+        await asyncio.wait_for(embed_all(), budget)
+    except Exception as e:
+        # Sem embeddings em lote (ex.: timeout ou API fora do ar) as buscas ainda tentam um a um
+        print(f"[query_log] Embedding warm-up failed: {e!r}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(text: str, topic_filter: Optional[str]):
+        async with semaphore:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                stats["skipped"] += 1
+                return
+            try:
+                warmed = await asyncio.wait_for(search(text, topic_filter), remaining)
+                stats["warmed" if warmed else "cached"] += 1
+            except asyncio.TimeoutError:
+                stats["skipped"] += 1
+            except Exception:
+                stats["failed"] += 1
+
+    await asyncio.gather(*(warm(text, topic_filter) for text, topic_filter, _ in entries))
+    for result in ("warmed", "cached", "failed", "skipped"):
+        CACHE_WARMUP.inc(stats[result], result=result)
+    return stats
+
+
+_query_log = None
+_query_log_lock = Lock()
+
+def get_query_log() -> QueryLog:
+    global _query_log
+    with _query_log_lock:
+        if _query_log is None:
+            _query_log = QueryLog()
+        return _query_log
+
+def flush_query_log():
+    """Persiste o log, se ele chegou a ser criado."""
+    if _query_log is not None:
+        _query_log.close()
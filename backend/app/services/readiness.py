@@ -0,0 +1,117 @@
+import asyncio
+import time
+from typing import Any, Dict, Tuple
+
+from app.core import config
+from app.core.metrics import STARTUP_DURATION
+from app.services import taxonomy_service
+from app.services.vector_store import get_vector_service
+
+STARTUP_STEPS = ("taxonomy", "vector_store", "warmup", "query_cache")
+
+
+class Readiness:
+    """
+    Inicialização do worker em segundo plano e estado de prontidão. O servidor aceita conexões logo após o
+    import (/healthz responde), enquanto /readyz fica 503 até a taxonomia estar carregada, o backend vetorial
+    verificado e os caches aquecidos. Uma etapa que falha (ex.: Qdrant fora do ar) é repetida até dar certo.
+    """
+    def __init__(self):
+        self.checks = {step: False for step in STARTUP_STEPS}
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.started_at = None
+        self.ready_after = None
+        self._task = None
+
+    @property
+    def ready(self) -> bool:
+        return all(self.checks.values())
+
+    def start(self, started_at: float = None):
+        """Dispara a inicialização; started_at (perf_counter) é o início do import da aplicação."""
+        self.started_at = started_at or time.perf_counter()
+        self._record("import", time.perf_counter() - self.started_at)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        await self._step("taxonomy", self._load_taxonomy)
+        await self._step("vector_store", self._connect_vector_store)
+        await self._step("warmup", self._warmup)
+        await self._step("query_cache", self._warm_queries)
+        self.ready_after = round(time.perf_counter() - self.started_at, 3)
+        STARTUP_DURATION.set(self.ready_after, phase="ready")
+        print(f"[readiness] Worker ready in {self.ready_after:.2f}s ({self.timings})")
+
+    async def _step(self, name: str, func):
+        start = time.perf_counter()
+        while True:
+            try:
+                await func()
+                break
+            except Exception as e:
+                self.errors[name] = str(e)
+                print(f"[readiness] {name} failed: {e}; retrying in {config.STARTUP_RETRY_INTERVAL}s")
+                await asyncio.sleep(config.STARTUP_RETRY_INTERVAL)
+        self.errors.pop(name, None)
+        self.checks[name] = True
+        self._record(name, time.perf_counter() - start)
+
+    def _record(self, phase: str, seconds: float):
+        self.timings[phase] = round(seconds, 3)
+        STARTUP_DURATION.set(seconds, phase=phase)
+
+    async def _load_taxonomy(self):
+        await asyncio.to_thread(taxonomy_service.load_taxonomy)
+        taxonomy_service.start_taxonomy_watcher()
+
+    async def _connect_vector_store(self):
+        # O backend local lê o índice do disco no construtor: fora do event loop
+        service = await asyncio.to_thread(get_vector_service)
+        await service.ensure_ready()
+
+    async def _warmup(self):
+        from app.services.embedding_service import get_client
+        # JSON servido em /taxonomy e cliente de embeddings (import do pacote openai) prontos antes do tráfego
+        await asyncio.to_thread(taxonomy_service.get_snapshot().to_json)
+        await asyncio.to_thread(get_client)
+
+    async def _warm_queries(self):
+        from app.api.search import warm_search
+        from app.services.query_log import get_query_log, warm_up
+        # Buscas mais frequentes antes do deploy: limitado por QUERY_WARMUP_BUDGET para não atrasar o /readyz
+        query_log = await asyncio.to_thread(get_query_log)
+        stats = await warm_up(query_log, warm_search)
+        if stats["queries"]:
+            print(f"[readiness] Query cache warm-up: {stats}")
+
+    async def probe(self) -> Tuple[bool, Dict[str, Any]]:
+        """Estado para /readyz; depois de pronto, também confirma que o backend vetorial continua acessível."""
+        checks = dict(self.checks)
+        if self.ready:
+            try:
+                checks["vector_store"] = await asyncio.wait_for(get_vector_service().ping(), config.READY_CHECK_TIMEOUT)
+            except asyncio.TimeoutError:
+                checks["vector_store"] = False
+        ready = all(checks.values())
+        return ready, {
+            "status": "ready" if ready else "starting" if not self.ready else "degraded",
+            "checks": checks,
+            "errors": self.errors,
+            "startup": {**self.timings, "ready_after": self.ready_after},
+            "taxonomy_version": taxonomy_service.get_snapshot().version if self.checks["taxonomy"] else None,
+        }
+
+
+_readiness = None
+
+def get_readiness() -> Readiness:
+    global _readiness
+    if _readiness is None:
+        _readiness = Readiness()
+    return _readiness
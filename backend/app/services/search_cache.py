@@ -0,0 +1,54 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from app.core import config
+from app.core.metrics import CACHE_REQUESTS
+
+
+class SearchResultCache:
+    """
+    Cache LRU com TTL das listas completas de resultados de busca, chaveado por (query, topic_filter, filtros).
+    Permite paginar e calcular facetas sobre a mesma lista sem repetir embedding + busca.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 300, name: str = "search"):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def make_key(query: str, topic_filter: str = None, *filters) -> tuple:
+        return ((query or "").strip().lower(), topic_filter or None, *filters)
+
+    def get(self, key):
+        with self._lock:
+            value = self._get_locked(key)
+        CACHE_REQUESTS.inc(cache=self.name, result="miss" if value is None else "hit")
+        return value
+
+    def _get_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+search_cache = SearchResultCache(maxsize=config.SEARCH_CACHE_SIZE, ttl=config.SEARCH_CACHE_TTL)
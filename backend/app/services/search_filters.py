@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta, timezone
+
+# Faixas de duração (segundos) do filtro da UI: < 4 min, 4-20 min, > 20 min
+DURATION_BUCKETS = {
+    "short": (None, 240),
+    "medium": (240, 1200),
+    "long": (1200, None),
+}
+UPLOAD_DATE_WINDOWS = {
+    "day": timedelta(days=1),
+    "week": timedelta(days=7),
+    "month": timedelta(days=30),
+    "year": timedelta(days=365),
+}
+
+
+def metadata_conditions(duration: str = None, upload_date: str = None, min_views: int = None, now: datetime = None) -> list[dict]:
+    """
+    Traduz os filtros estruturados da busca em condições de range sobre os campos de payload indexados
+    (duration_seconds, upload_date, view_count), no formato de filtro do Qdrant. Valores "any"/desconhecidos são ignorados.
+    """
+    conditions = []
+    if duration in DURATION_BUCKETS:
+        low, high = DURATION_BUCKETS[duration]
+        bounds = {}
+        if low is not None:
+            bounds["gte"] = low
+        if high is not None:
+            bounds["lt"] = high
+        conditions.append({"key": "duration_seconds", "range": bounds})
+    if upload_date in UPLOAD_DATE_WINDOWS:
+        since = (now or datetime.now(timezone.utc)) - UPLOAD_DATE_WINDOWS[upload_date]
+        conditions.append({"key": "upload_date", "range": {"gte": since.strftime("%Y-%m-%dT%H:%M:%SZ")}})
+    if min_views:
+        conditions.append({"key": "view_count", "range": {"gte": min_views}})
+    return conditions
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.core.metrics import SINGLE_FLIGHT_REQUESTS, SINGLE_FLIGHT_TIMEOUTS
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes com a mesma chave: a primeira dispara o trabalho numa tarefa própria e as
+    demais aguardam o mesmo resultado (ou a mesma exceção). Cada chamador tem seu próprio timeout; a tarefa
+    só é cancelada quando ninguém mais espera por ela, então a desconexão de um cliente não derruba os outros.
+    A chave sai do mapa assim que a tarefa termina ou é abandonada (não é um cache).
+    """
+    def __init__(self, name: str, timeout: float = None):
+        self.name = name
+        self.timeout = timeout
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def inflight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]], timeout: float = None) -> Any:
+        """
+        Executa func() (uma única vez por chave em andamento) e devolve o resultado.
+        Levanta asyncio.TimeoutError se ele não ficar pronto em `timeout` segundos.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            SINGLE_FLIGHT_REQUESTS.inc(name=self.name, role="leader")
+        else:
+            SINGLE_FLIGHT_REQUESTS.inc(name=self.name, role="coalesced")
+        call.waiters += 1
+        try:
+            # shield: o cancelamento/timeout deste chamador não se propaga para a tarefa compartilhada
+            return await asyncio.wait_for(asyncio.shield(call.task), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            SINGLE_FLIGHT_TIMEOUTS.inc(name=self.name)
+            raise
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Sai do mapa antes do cancelamento: quem chegar com a mesma chave começa uma tarefa nova em
+                # vez de aguardar esta, já cancelada (o done callback só roda numa iteração seguinte do loop)
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
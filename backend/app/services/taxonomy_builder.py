@@ -1,30 +1,194 @@
+import json
+from collections import OrderedDict
+from threading import Lock, RLock, Timer
 from typing import List, Dict, Any
 
+from app.core import config
+from app.services import taxonomy_service
+
+COUNT_KEY = "__count__"
+
 class TaxonomyBuilder:
     """
     Serviço para construir e atualizar a árvore de taxonomia a partir dos topics_path dos vídeos.
+    A árvore de trabalho fica em memória (com contagem de vídeos por nó); a persistência é feita em
+    segundo plano, agrupando várias atualizações em uma única escrita atômica. Quando a taxonomia é trocada
+    por outra fonte (upload ou outro worker), a árvore é reconstruída a partir dela e as contagens ainda
+    não persistidas são reaplicadas (ver rebase).
     """
-    def __init__(self, taxonomy_path: str = "backend/app/data/taxonomy.json"):
-        self.taxonomy_path = taxonomy_path
+    def __init__(self, taxonomy_path: str = None, flush_interval: float = None, flush_max_pending: int = None,
+                 seen_videos: int = None):
+        self.taxonomy_path = taxonomy_path or taxonomy_service.TAXONOMY_FILE_PATH
+        self.flush_interval = config.TAXONOMY_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.flush_max_pending = flush_max_pending or config.TAXONOMY_FLUSH_MAX_PENDING
+        self.seen_videos = seen_videos or config.TAXONOMY_SEEN_VIDEOS
+        self._lock = Lock()
+        self._flush_lock = RLock()
+        self._timer = None
+        self._pending = 0
+        self._unflushed = []  # Nós incrementados desde o último flush, por vídeo (reaplicados no rebase)
+        self._seen_videos = OrderedDict()  # LRU dos vídeos contados por este processo (repetições próximas)
+        self._base_version = None  # Versão do taxonomy_service sobre a qual a árvore foi construída
         self.taxonomy = self.load_taxonomy()
 
+    @staticmethod
+    def to_tree(node) -> Dict[str, Any]:
+        """Taxonomia servida (folhas null ou {"__count__": n}) -> árvore de trabalho."""
+        tree = {}
+        for key, value in (node or {}).items():
+            if key == COUNT_KEY:
+                tree[COUNT_KEY] = value
+            elif not key.startswith("__"):
+                tree[key] = TaxonomyBuilder.to_tree(value) if isinstance(value, dict) else {}
+        return tree
+
     def load_taxonomy(self) -> Dict[str, Any]:
         """
-        Carrega a taxonomia do arquivo JSON.
+        Carrega a taxonomia do arquivo JSON (folhas null ou {"__count__": n}) como árvore de trabalho.
+        """
+        try:
+            with open(self.taxonomy_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except Exception as e:
+            print(f"[taxonomy_builder] Failed to load taxonomy: {e}")
+            data = {}
+        return self.to_tree(data)
+
+    @staticmethod
+    def _increment(tree: Dict[str, Any], touched) -> None:
+        for parts in touched:
+            node = tree
+            for part in parts:
+                node = node.setdefault(part, {})
+            node[COUNT_KEY] = node.get(COUNT_KEY, 0) + 1
+
+    def rebase(self, snapshot):
+        """
+        Adota uma taxonomia publicada por outra fonte e reaplica as contagens ainda não gravadas, para que o
+        próximo flush não sobrescreva a atualização. Registrado como listener do taxonomy_service.
+        """
+        with self._flush_lock:
+            # Notificações atrasadas de versões já incorporadas são ignoradas
+            if self._base_version is not None and snapshot.version <= self._base_version:
+                return
+            tree = self.to_tree(snapshot.taxonomy)
+            with self._lock:
+                for touched in self._unflushed:
+                    self._increment(tree, touched)
+                self.taxonomy = tree
+                self._base_version = snapshot.version
+
+    def _export(self) -> Dict[str, Any]:
+        def export(node):
+            out = {}
+            for key, value in node.items():
+                if key == COUNT_KEY:
+                    out[key] = value
+                else:
+                    child = export(value)
+                    out[key] = child or None
+            return out
+        return export(self.taxonomy)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Cópia da árvore no formato servido: folhas sem contagem viram null.
         """
-        # TODO: Implementar leitura do arquivo taxonomy.json
-        raise NotImplementedError("Leitura da taxonomia não implementada.")
+        with self._lock:
+            return self._export()
 
     def save_taxonomy(self):
         """
-        Salva a taxonomia atual no arquivo JSON.
+        Salva a taxonomia atual no arquivo JSON (arquivo temporário + rename atômico) e publica o
+        mesmo snapshot no taxonomy_service, para que os leitores nunca vejam uma árvore pela metade.
+        Antes de gravar, adota qualquer versão mais nova (upload ou outro worker) em vez de sobrescrevê-la;
+        verificação e gravação ficam sob o lock de arquivo, exclusivo também entre processos.
         """
-        # TODO: Implementar escrita no arquivo taxonomy.json
-        raise NotImplementedError("Salvamento da taxonomia não implementado.")
+        shared = self.taxonomy_path == taxonomy_service.TAXONOMY_FILE_PATH
+        with self._flush_lock, taxonomy_service.file_write_lock(self.taxonomy_path):
+            if shared:
+                taxonomy_service.check_for_update()
+                self.rebase(taxonomy_service.get_snapshot())
+            with self._lock:
+                self._pending = 0
+                self._unflushed = []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                data = self._export()
+            file_key = taxonomy_service.write_taxonomy_file(data, self.taxonomy_path)
+            if shared:
+                self._base_version = taxonomy_service.set_taxonomy_snapshot(data, file_key).version
+
+    def _flush_in_background(self):
+        try:
+            self.save_taxonomy()
+        except Exception as e:
+            print(f"[taxonomy_builder] Failed to save taxonomy: {e}")
 
-    def add_video_topics(self, topics_path_list: List[str], video_id: str):
+    def add_video_topics(self, topics_path_list: List[str], video_id: str, already_indexed: bool = False):
         """
         Adiciona os caminhos de tópicos de um vídeo à árvore de taxonomia.
+        Cada nó citado pelo vídeo tem a contagem incrementada uma única vez. Vídeos que já estavam no backend
+        vetorial antes deste upsert (`already_indexed`, verificado por quem indexa, ver
+        ingestion_service.indexed_point_ids) não são contados de novo, inclusive depois de um restart; o LRU
+        em memória só cobre o mesmo vídeo repetido antes de chegar ao backend (ex.: duas vezes no mesmo lote).
+        A escrita é adiada (flush_interval) ou antecipada quando há flush_max_pending vídeos pendentes.
         """
-        # TODO: Implementar lógica de atualização incremental da árvore
-        raise NotImplementedError("Atualização incremental da taxonomia não implementada.") 
\ No newline at end of file
+        flush_now = False
+        with self._lock:
+            if already_indexed or video_id in self._seen_videos:
+                return
+            self._seen_videos[video_id] = True
+            if len(self._seen_videos) > self.seen_videos:
+                self._seen_videos.popitem(last=False)
+            touched = set()
+            for topic_path in topics_path_list or []:
+                parts = [p.strip() for p in topic_path.split(">") if p.strip()]
+                touched.update(tuple(parts[:depth + 1]) for depth in range(len(parts)))
+            if not touched:
+                return
+            self._increment(self.taxonomy, touched)
+            self._unflushed.append(touched)
+            self._pending += 1
+            if self._pending >= self.flush_max_pending:
+                flush_now = True
+            elif self._timer is None:
+                self._timer = Timer(self.flush_interval, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self._flush_in_background()
+
+    def close(self):
+        """
+        Persiste atualizações pendentes (usar no shutdown da aplicação).
+        """
+        with self._lock:
+            pending = self._pending
+        if pending:
+            self.save_taxonomy()
+
+
+_builder = None
+_builder_lock = Lock()
+
+def get_taxonomy_builder() -> TaxonomyBuilder:
+    """
+    Instância compartilhada: todos os produtores atualizam a mesma árvore de trabalho.
+    """
+    global _builder
+    with _builder_lock:
+        if _builder is None:
+            _builder = TaxonomyBuilder()
+            taxonomy_service.add_reload_listener(_builder.rebase)
+        return _builder
+
+def flush_taxonomy_builder():
+    """
+    Persiste as atualizações pendentes, se o builder chegou a ser criado.
+    """
+    if _builder is not None:
+        _builder.close()
@@ -1,32 +1,289 @@
 import json
 import os
-from threading import Lock
+import orjson
+import tempfile
+import time
+from contextlib import contextmanager
+from threading import Event, Lock, RLock, Thread
+
+from app.core import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock do processo
+    fcntl = None
 
 TAXONOMY_FILE_PATH = os.environ.get("TAXONOMY_FILE_PATH", "app/data/canonical_taxonomy.json")
-_taxonomy_cache = None
-_taxonomy_lock = Lock()
+_snapshot = None  # TaxonomySnapshot atual; trocado por referência, nunca alterado
+_version = 0
+_publish_lock = Lock()
+_load_lock = Lock()
+# Serializa gravação do arquivo + publicação (upload, watcher, flush do TaxonomyBuilder). Os listeners
+# são chamados depois de liberá-lo, então podem tomar seus próprios locks sem risco de deadlock.
+write_lock = RLock()
+_file_locks = {}  # caminho -> [fd do arquivo .lock, profundidade]; só acessado com write_lock
+_reload_listeners = []
+_failed_key = None  # Arquivo inválido já reportado; o watcher só tenta de novo quando ele mudar
+
+def node_id_for_path(path: list) -> str:
+    """Mesmo esquema de IDs do pipeline (scripts/taxonomy_mapper.add_ids_to_taxonomy)."""
+    return '-'.join([p.lower().replace(' ', '_') for p in path])
+
+def resolve_node_id(topic: str) -> str:
+    """Aceita tanto o ID do nó quanto o caminho de nomes ("Entertainment > reality tv")."""
+    if ' > ' in topic:
+        return node_id_for_path([p.strip() for p in topic.split('>')])
+    return topic
+
+def map_topic_paths(topic_paths: list) -> list:
+    """
+    Mapeia caminhos gerados pelo LLM para nós canônicos com uma única regra: cada caminho é truncado no nó
+    mais profundo da taxonomia que é seu prefixo, e caminhos sem nenhum prefixo conhecido (nem a raiz)
+    são descartados. A ingestão online nunca cria nós: eles vêm do pipeline (refinamento da taxonomia), e
+    os caminhos originais continuam no payload (hierarchical_topics). Retorna [(node_id, partes do caminho
+    canônico, ids dos ancestrais incl. o nó)] sem repetições.
+    """
+    index = get_node_index()
+    mapped, seen = [], set()
+    for topic_path in topic_paths or []:
+        parts = [p.strip() for p in topic_path.split('>') if p.strip()]
+        depth = len(parts)
+        while depth > 0 and node_id_for_path(parts[:depth]) not in index:
+            depth -= 1
+        if not depth:
+            continue
+        node = index[node_id_for_path(parts[:depth])]
+        node_id = node["ancestors"][-1]
+        if node_id in seen:
+            continue
+        seen.add(node_id)
+        canonical = [index[a]["name"] for a in node["ancestors"]]
+        mapped.append((node_id, canonical, list(node["ancestors"])))
+    return mapped
+
+def build_node_index(taxonomy: dict, path: list = None, index: dict = None) -> dict:
+    """
+    Índice id -> {name, level, ancestors, count} (ancestors inclui o próprio nó; count vem de '__count__'
+    quando a taxonomia foi gerada com contagens), ignorando as chaves de metadados como filhos.
+    """
+    if path is None:
+        path = []
+    if index is None:
+        index = {}
+    for key, value in (taxonomy or {}).items():
+        if key.startswith('__'):
+            continue
+        current_path = path + [key]
+        node_id = node_id_for_path(current_path)
+        parent = index[node_id_for_path(path)]["ancestors"] if path else []
+        index[node_id] = {
+            "name": key,
+            "level": len(path),
+            "ancestors": parent + [node_id],
+            "count": value.get("__count__") if isinstance(value, dict) else None
+        }
+        if isinstance(value, dict):
+            build_node_index(value, current_path, index)
+    return index
+
+class TaxonomySnapshot:
+    """
+    Versão da taxonomia servida com o índice de nós pré-computado. Nunca é alterada depois de publicada:
+    uma atualização cria outro snapshot e troca a referência global, então os leitores usam a versão que
+    pegaram sem precisar de lock. file_key identifica o arquivo de origem (ver _file_key).
+    """
+    __slots__ = ("taxonomy", "node_index", "version", "file_key", "loaded_at", "_json")
+
+    def __init__(self, taxonomy: dict, node_index: dict, version: int, file_key):
+        self.taxonomy = taxonomy
+        self.node_index = node_index
+        self.version = version
+        self.file_key = file_key
+        self.loaded_at = time.time()
+        self._json = None
 
-def load_taxonomy():
-    global _taxonomy_cache
-    with _taxonomy_lock:
+    def to_json(self) -> bytes:
+        """Taxonomia serializada, calculada uma vez por snapshot (GET /taxonomy serve os mesmos bytes)."""
+        if self._json is None:
+            self._json = orjson.dumps(self.taxonomy)
+        return self._json
+
+def _file_key(path: str = None):
+    """(inode, tamanho, mtime) do arquivo: muda a cada rename atômico, inclusive de outro processo."""
+    try:
+        st = os.stat(path or TAXONOMY_FILE_PATH)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def _publish(taxonomy: dict, file_key) -> TaxonomySnapshot:
+    global _snapshot, _version
+    node_index = build_node_index(taxonomy)
+    with _publish_lock:
+        _version += 1
+        snapshot = TaxonomySnapshot(taxonomy, node_index, _version, file_key)
+        _snapshot = snapshot
+    return snapshot
+
+def _notify(snapshot: TaxonomySnapshot):
+    for listener in list(_reload_listeners):
         try:
-            with open(TAXONOMY_FILE_PATH, "r", encoding="utf-8") as f:
-                _taxonomy_cache = json.load(f)
-        except FileNotFoundError:
-            _taxonomy_cache = {}
+            listener(snapshot)
         except Exception as e:
-            _taxonomy_cache = {}
-            print(f"[taxonomy_service] Failed to load taxonomy: {e}")
+            print(f"[taxonomy_service] Reload listener failed: {e}")
+
+def add_reload_listener(listener):
+    """listener(snapshot), chamado quando a taxonomia é trocada por outra fonte (upload, outro worker)."""
+    _reload_listeners.append(listener)
+
+def load_taxonomy() -> TaxonomySnapshot:
+    global _failed_key
+    file_key = _file_key()
+    try:
+        with open(TAXONOMY_FILE_PATH, "r", encoding="utf-8") as f:
+            taxonomy = json.load(f)
+    except FileNotFoundError:
+        taxonomy = {}
+    except Exception as e:
+        # Mantém a versão atual se já houver uma (ex.: upload manual de um arquivo inválido)
+        print(f"[taxonomy_service] Failed to load taxonomy: {e}")
+        _failed_key = file_key
+        if _snapshot is not None:
+            return _snapshot
+        taxonomy = {}
+    return _publish(taxonomy, file_key)
+
+def get_snapshot() -> TaxonomySnapshot:
+    snapshot = _snapshot
+    if snapshot is None:
+        with _load_lock:
+            snapshot = _snapshot or load_taxonomy()
+    return snapshot
 
 def get_taxonomy():
-    global _taxonomy_cache
-    if _taxonomy_cache is None:
-        load_taxonomy()
-    return _taxonomy_cache
+    return get_snapshot().taxonomy
+
+def get_node_index() -> dict:
+    return get_snapshot().node_index
+
+def write_taxonomy_file(data: dict, path: str = None):
+    """
+    Escrita atômica (arquivo temporário no mesmo diretório + fsync + rename): leitores e outros workers
+    nunca veem um arquivo pela metade. Retorna o file_key do arquivo gravado.
+    """
+    path = path or TAXONOMY_FILE_PATH
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".taxonomy-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return _file_key(path)
+
+@contextmanager
+def file_write_lock(path: str = None):
+    """
+    write_lock mais um flock exclusivo em `<arquivo>.lock`, para serializar ler-atualizar-gravar entre
+    workers (processos) e não só entre threads: sem ele, dois workers podiam verificar o arquivo ao mesmo
+    tempo e o rename do segundo descartava as contagens gravadas pelo primeiro. Reentrante na mesma thread.
+    """
+    path = path or TAXONOMY_FILE_PATH
+    with write_lock:
+        held = _file_locks.get(path)
+        if held is not None:
+            held[1] += 1
+        elif fcntl is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except BaseException:
+                os.close(fd)
+                raise
+            held = _file_locks[path] = [fd, 1]
+        try:
+            yield
+        finally:
+            if held is not None:
+                held[1] -= 1
+                if held[1] == 0:
+                    del _file_locks[path]
+                    fcntl.flock(held[0], fcntl.LOCK_UN)
+                    os.close(held[0])
+
+def set_taxonomy_snapshot(new_taxonomy_data: dict, file_key=None) -> TaxonomySnapshot:
+    """Troca a taxonomia servida por um novo snapshot (já persistido por quem chama; sem listeners)."""
+    return _publish(new_taxonomy_data, file_key or _file_key())
 
 def update_taxonomy(new_taxonomy_data: dict):
-    global _taxonomy_cache
-    with _taxonomy_lock:
-        with open(TAXONOMY_FILE_PATH, "w", encoding="utf-8") as f:
-            json.dump(new_taxonomy_data, f, ensure_ascii=False, indent=2)
-        _taxonomy_cache = new_taxonomy_data 
\ No newline at end of file
+    with file_write_lock():
+        file_key = write_taxonomy_file(new_taxonomy_data)
+        snapshot = _publish(new_taxonomy_data, file_key)
+    _notify(snapshot)
+
+def check_for_update() -> bool:
+    """Recarrega a taxonomia se o arquivo foi trocado por outro processo. Retorna True se recarregou."""
+    snapshot = _snapshot
+    file_key = _file_key()
+    if snapshot is None or file_key is None or file_key in (snapshot.file_key, _failed_key):
+        return False
+    with write_lock:
+        if _file_key() in (_snapshot.file_key, _failed_key):
+            return False
+        reloaded = load_taxonomy()
+        if reloaded is snapshot:
+            return False
+    print(f"[taxonomy_service] Taxonomy reloaded from {TAXONOMY_FILE_PATH} (version {reloaded.version})")
+    _notify(reloaded)
+    return True
+
+
+class TaxonomyWatcher:
+    """
+    Thread que verifica o arquivo da taxonomia a cada `interval` segundos (um os.stat) e troca o snapshot
+    quando outro worker o atualiza; o JSON é lido e indexado fora do caminho das requisições.
+    """
+    def __init__(self, interval: float = None):
+        self.interval = interval or config.TAXONOMY_WATCH_INTERVAL
+        self._stop = Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name="taxonomy-watcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                check_for_update()
+            except Exception as e:
+                print(f"[taxonomy_service] Watcher failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_watcher = None
+
+def start_taxonomy_watcher():
+    global _watcher
+    if _watcher is None:
+        _watcher = TaxonomyWatcher()
+        _watcher.start()
+
+def stop_taxonomy_watcher():
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
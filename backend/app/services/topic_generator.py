@@ -1,12 +1,59 @@
+import json
+import re
 from typing import List, Dict, Optional
 
+from app.core import config
+from app.services import taxonomy_service
+
+MAX_TOPIC_PATHS = 3
+MAX_HINT_CATEGORIES = 100
+
 class TopicGenerator:
     """
     Serviço para geração de tópicos hierárquicos usando LLM (OpenAI, Gemini, etc).
     """
-    def __init__(self, provider: str = "openai", api_key: Optional[str] = None):
-        self.provider = provider
+    def __init__(self, provider: str = None, api_key: Optional[str] = None, model: Optional[str] = None):
+        self.provider = provider or config.TOPIC_PROVIDER
         self.api_key = api_key
+        self.model = model or (config.TOPIC_MODEL_GEMINI if self.provider == "gemini" else config.TOPIC_MODEL_OPENAI)
+        self._clients: Dict[str, object] = {}
+
+    def build_prompt(self, title: str, description: str, transcript: str) -> str:
+        """
+        Prompt de classificação; as categorias de 1º nível da taxonomia atual são sugeridas para que os
+        caminhos gerados caiam em nós canônicos sempre que possível.
+        """
+        categories = [k for k in (taxonomy_service.get_taxonomy() or {}) if not k.startswith("__")]
+        hint = ""
+        if categories:
+            hint = "Prefer these existing top-level categories when they fit: " + ", ".join(categories[:MAX_HINT_CATEGORIES]) + "\n"
+        return (
+            "Classify the video below. Return ONLY a JSON object with the key 'hierarchical_topics': "
+            f"an array with up to {MAX_TOPIC_PATHS} paths, each from a broad category to a specific subtopic, "
+            "using ' > ' as separator, all in lower case. Topics must be general, reusable categories.\n"
+            f"{hint}\n"
+            f"Video Title: {title or ''}\n"
+            f"Video Description: {description or ''}\n"
+            f"Video Transcript: {(transcript or '')[:config.TOPIC_TRANSCRIPT_MAX_CHARS]}\n"
+        )
+
+    @staticmethod
+    def parse_topics(text: str) -> List[str]:
+        """
+        Extrai os caminhos da resposta (objeto com 'hierarchical_topics' ou array direto).
+        """
+        data = json.loads(re.sub(r"```json|```", "", text or "").strip())
+        if isinstance(data, dict):
+            data = data.get("hierarchical_topics", [])
+        if not isinstance(data, list):
+            raise ValueError("Resposta do LLM sem 'hierarchical_topics'")
+        topics = []
+        for path in data:
+            if isinstance(path, str):
+                parts = [p.strip().lower() for p in path.split(">") if p.strip()]
+                if parts and " > ".join(parts) not in topics:
+                    topics.append(" > ".join(parts))
+        return topics[:MAX_TOPIC_PATHS]
 
     def generate_topics(self, title: str, description: str, transcript: str) -> List[str]:
         """
@@ -20,16 +67,64 @@ class TopicGenerator:
         else:
             raise ValueError(f"Provider não suportado: {self.provider}")
 
+    async def agenerate_topics(self, title: str, description: str, transcript: str) -> List[str]:
+        """
+        Versão assíncrona de generate_topics, usada pela fila de ingestão.
+        """
+        prompt = self.build_prompt(title, description, transcript)
+        if self.provider == "openai":
+            response = await self._client("openai_async").chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"},
+                temperature=0
+            )
+            return self.parse_topics(response.choices[0].message.content)
+        elif self.provider == "gemini":
+            response = await self._client("gemini").generate_content_async(
+                prompt, generation_config={"response_mime_type": "application/json"}
+            )
+            return self.parse_topics(response.text)
+        else:
+            raise ValueError(f"Provider não suportado: {self.provider}")
+
+    def _client(self, kind: str):
+        """
+        Clientes criados sob demanda (o SDK do Gemini é opcional e só é importado quando usado).
+        """
+        client = self._clients.get(kind)
+        if client is None:
+            if kind == "openai":
+                from openai import OpenAI
+                client = OpenAI(api_key=self.api_key or config.OPENAI_API_KEY)
+            elif kind == "openai_async":
+                from openai import AsyncOpenAI
+                client = AsyncOpenAI(api_key=self.api_key or config.OPENAI_API_KEY)
+            else:
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key or config.GOOGLE_API_KEY)
+                client = genai.GenerativeModel(self.model)
+            self._clients[kind] = client
+        return client
+
     def _generate_with_openai(self, title: str, description: str, transcript: str) -> List[str]:
         """
         Implementação da chamada à API OpenAI para geração de tópicos.
         """
-        # TODO: Implementar integração com OpenAI
-        raise NotImplementedError("Integração com OpenAI não implementada.")
+        response = self._client("openai").chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": self.build_prompt(title, description, transcript)}],
+            response_format={"type": "json_object"},
+            temperature=0
+        )
+        return self.parse_topics(response.choices[0].message.content)
 
     def _generate_with_gemini(self, title: str, description: str, transcript: str) -> List[str]:
         """
         Implementação da chamada à API Google Gemini para geração de tópicos.
         """
-        # TODO: Implementar integração com Google Gemini
-        raise NotImplementedError("Integração com Google Gemini não implementada.") 
\ No newline at end of file
+        response = self._client("gemini").generate_content(
+            self.build_prompt(title, description, transcript),
+            generation_config={"response_mime_type": "application/json"}
+        )
+        return self.parse_topics(response.text)
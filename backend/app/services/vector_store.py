@@ -0,0 +1,41 @@
+from threading import Lock
+
+from app.core import config
+
+_services = {}
+_services_lock = Lock()
+
+
+def get_vector_service(collection_name: str = None):
+    """
+    Retorna (e memoiza por coleção) o backend de busca vetorial configurado em VECTOR_BACKEND
+    ("qdrant" ou "local"). Ambos expõem search_vectors/insert_vector/retrieve e ensure_ready/ping.
+    """
+    collection_name = collection_name or config.QDRANT_COLLECTION_NAME
+    service = _services.get(collection_name)
+    if service is None:
+        # Criação sob lock: a inicialização (em thread) e a primeira requisição podem chegar juntas
+        with _services_lock:
+            service = _services.get(collection_name)
+            if service is None:
+                service = _services[collection_name] = _create_vector_service(collection_name)
+    return service
+
+
+def _create_vector_service(collection_name: str):
+    if config.VECTOR_BACKEND == "local":
+        from app.services.local_vector_service import LocalVectorService
+        return LocalVectorService(
+            data_dir=config.LOCAL_VECTOR_DIR,
+            collection_name=collection_name,
+            dim=config.EMBEDDING_DIM,
+            block_size=config.LOCAL_VECTOR_BLOCK_SIZE
+        )
+    if config.VECTOR_BACKEND != "qdrant":
+        raise ValueError(f"VECTOR_BACKEND não suportado: {config.VECTOR_BACKEND}")
+    from app.services.qdrant_service import QdrantService
+    return QdrantService(
+        host=config.QDRANT_HOST,
+        port=config.QDRANT_PORT,
+        collection_name=collection_name
+    )
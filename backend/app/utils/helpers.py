@@ -1 +1,85 @@
- 
\ No newline at end of file
+import re
+import zlib
+from dataclasses import dataclass
+
+_TERM_RE = re.compile(r"\w+")
+
+
+@dataclass(slots=True)
+class SearchHit:
+    """
+    Resultado de busca interno (mesmos campos de SearchResultItem). Sem __dict__, ocupa bem menos memória que
+    um dict nas listas de até 1000 resultados guardadas no cache de busca, e o orjson o serializa nativamente.
+    """
+    id: str
+    score: float
+    title: str
+    description: str
+    topics_path: list
+
+
+def point_to_result(point_id, payload: dict, score: float) -> SearchHit:
+    """Converte um ponto (id + payload) no formato de resultado usado pela API de busca."""
+    payload = payload or {}
+    return SearchHit(
+        id=payload.get("yt_id", str(point_id)),
+        score=score,
+        title=payload.get("title", ""),
+        description=payload.get("description_llm", ""),
+        topics_path=payload.get("taxonomy_ids", [])
+    )
+
+
+def lexical_terms(text: str) -> list:
+    """Termos (palavras em minúsculas, sem repetição) usados pela busca lexical do modo degradado."""
+    return list(dict.fromkeys(_TERM_RE.findall((text or "").lower())))
+
+
+def lexical_score(terms: list, title: str) -> float:
+    """Fração dos termos da consulta presentes no título."""
+    if not terms:
+        return 0.0
+    words = set(lexical_terms(title))
+    return sum(1 for term in terms if term in words) / len(terms)
+
+
+def payload_to_video(point_id, payload: dict) -> dict:
+    """Converte um ponto no formato de vídeo usado pela navegação por tópico (/videos_by_topic)."""
+    payload = payload or {}
+    return {
+        "yt_id": payload.get("yt_id", str(point_id)),
+        "title": payload.get("title", ""),
+        "description": payload.get("description_llm", ""),
+        "topics": payload.get("taxonomy_ids", []),
+        "view_count": payload.get("view_count")
+    }
+
+
+def view_sort_key(yt_id: str, view_count) -> int:
+    """
+    Mesma chave de ordenação por views do pipeline (scripts/indexer.view_sort_key). Não é única: o desempate
+    é um hash de 20 bits, então o cursor de browse_by_topic leva também o id do ponto.
+    """
+    try:
+        views = max(int(view_count), 0)
+    except (TypeError, ValueError):
+        views = 0
+    return (views << 20) | (zlib.crc32(yt_id.encode('utf-8')) & 0xFFFFF)
+
+
+def build_video_payload(video: dict, taxonomy_ids: list, ancestor_ids: list) -> dict:
+    """Payload de um vídeo indexado online, com os mesmos campos gravados pelo pipeline (scripts/indexer.py)."""
+    view_count = video.get("view_count") or 0
+    return {
+        "yt_id": video["yt_id"],
+        "title": video.get("title", ""),
+        "description_llm": video.get("description", ""),
+        "channel_id": video.get("channel_id"),
+        "hierarchical_topics": video.get("hierarchical_topics", []),
+        "taxonomy_ids": taxonomy_ids,
+        "taxonomy_ancestor_ids": ancestor_ids,
+        "view_count": view_count,
+        "view_sort_key": view_sort_key(video["yt_id"], view_count),
+        "duration_seconds": video.get("duration_seconds"),
+        "upload_date": video.get("upload_date")
+    }
@@ -0,0 +1,146 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from common import (BACKEND_DIR, DEFAULT_RESULTS_DIR, DEFAULT_WORKDIR, compare_results, percentile, print_table,
+                    save_results)
+from corpus import seed_local_index
+from fake_embedding_server import start_server
+from load_test import backend_env, stop_backend
+
+# Tempo de cold start do backend: import de app.main num processo novo e, com o uvicorn, o tempo até o
+# processo responder /healthz (liveness) e /readyz (taxonomia, backend vetorial e caches prontos).
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+POLL_INTERVAL = 0.02  # s
+READY_TIMEOUT = 180  # s
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    values = sorted(values)
+    return {
+        "runs": len(values),
+        "min_ms": round(values[0] * 1000, 1),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1),
+    }
+
+
+def measure_import(env: Dict[str, str], runs: int) -> Dict[str, Dict[str, Any]]:
+    """Import de app.main (medido dentro do processo) e tempo total do processo, incluindo o interpretador."""
+    imports, processes = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env={**os.environ, **env},
+                                capture_output=True, text=True, check=True).stdout
+        processes.append(time.perf_counter() - start)
+        imports.append(float(output.strip().splitlines()[-1]))
+    return {"import_app_main": summarize(imports), "process_import": summarize(processes)}
+
+
+def top_imports(env: Dict[str, str], limit: int) -> List[str]:
+    """Pacotes mais caros no import de app.main segundo `python -X importtime` (tempo cumulativo por pacote)."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=BACKEND_DIR,
+                            env={**os.environ, **env}, capture_output=True, text=True, check=True).stderr
+    packages: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if match and not match.group(2).startswith(("app.", "_")) and match.group(2) != "app":
+            package = match.group(2).split(".")[0]
+            # A primeira importação de um pacote inclui seus submódulos: o maior cumulativo é o custo do pacote
+            packages[package] = max(packages.get(package, 0), int(match.group(1)))
+    rows = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [f"{name}: {us / 1000:.0f} ms" for name, us in rows]
+
+
+def wait_for(url: str, process: subprocess.Popen, deadline: float) -> float:
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn terminou durante a inicialização (código {process.returncode})")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter()
+        except httpx.HTTPError:
+            pass
+        time.sleep(POLL_INTERVAL)
+    raise RuntimeError(f"{url} não respondeu 200 em {READY_TIMEOUT}s")
+
+
+def measure_server(env: Dict[str, str], runs: int, port: int) -> Dict[str, Dict[str, Any]]:
+    """Sobe o uvicorn `runs` vezes e mede o tempo até /healthz e /readyz responderem 200."""
+    live, ready, phases = [], [], {}
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(runs):
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+                   "--log-level", "warning"]
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **env})
+        try:
+            deadline = time.monotonic() + READY_TIMEOUT
+            live.append(wait_for(f"{base_url}/healthz", process, deadline) - start)
+            ready.append(wait_for(f"{base_url}/readyz", process, deadline) - start)
+            # Tempos de cada etapa medidos pelo próprio worker (services/readiness.py)
+            for phase, seconds in httpx.get(f"{base_url}/readyz", timeout=5).json()["startup"].items():
+                phases.setdefault(phase, []).append(seconds)
+        finally:
+            stop_backend(process)
+    results = {"healthz": summarize(live), "readyz": summarize(ready)}
+    for phase, values in phases.items():
+        results[f"phase/{phase}"] = summarize(values)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de cold start do backend (import, /healthz e /readyz).")
+    parser.add_argument("--runs", type=int, default=5, help="Processos iniciados por medida")
+    parser.add_argument("--videos", type=int, default=20_000, help="Tamanho do corpus no índice local")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--import-only", action="store_true", help="Medir só o import (sem subir o uvicorn)")
+    parser.add_argument("--top-imports", type=int, default=10, help="Pacotes mais caros listados (0 = não listar)")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR)
+    parser.add_argument("--output-dir", default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--compare", help="Arquivo de resultados anterior para comparação")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Variação (%%) considerada regressão")
+    args = parser.parse_args(argv)
+    args.workdir = os.path.abspath(args.workdir)
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    workdir = os.path.join(args.workdir, "cold_start")
+    os.makedirs(workdir, exist_ok=True)
+    embedding_server = start_server(dim=args.dim)
+    env = backend_env(workdir, embedding_server.base_url, args.dim)
+    os.environ.update(env)
+    try:
+        if args.top_imports:
+            print("[COLD] Imports mais caros de app.main:")
+            for row in top_imports(env, args.top_imports):
+                print(f"  {row}")
+        results = measure_import(env, args.runs)
+        if not args.import_only:
+            seed_local_index(env["LOCAL_VECTOR_DIR"], args.videos, args.dim, args.seed)
+            results.update(measure_server(env, args.runs, args.port))
+    finally:
+        embedding_server.shutdown()
+
+    print_table(results, ["runs", "min_ms", "p50_ms", "p95_ms", "max_ms"])
+    params = {k: v for k, v in vars(args).items() if k not in ("workdir", "output_dir", "compare")}
+    save_results("cold_start", params, results, args.output_dir)
+    if args.compare:
+        return 1 if compare_results(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+SCRIPTS_DIR = os.path.join(ROOT_DIR, "scripts")
+BENCH_DIR = os.path.join(ROOT_DIR, "benchmarks")
+DEFAULT_WORKDIR = os.path.join(BENCH_DIR, ".work")
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+CANONICAL_TAXONOMY_PATH = os.path.join(BACKEND_DIR, "app", "data", "canonical_taxonomy.json")
+
+# Métricas comparadas com o baseline: (nome, maior é melhor)
+COMPARED_METRICS = (("p50_ms", False), ("p95_ms", False), ("p99_ms", False), ("rps", True), ("items_per_sec", True))
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil por interpolação linear (mesmo método padrão do NumPy) sobre uma lista já ordenada."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def latency_summary(latencies: List[float], elapsed: float, errors: int = 0) -> Dict[str, Any]:
+    """Resumo de latências (segundos) em ms: p50/p95/p99, média, máximo e vazão."""
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(values) / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def timed_runs(func, repeat: int, items: int) -> Dict[str, Any]:
+    """Executa func() `repeat` vezes; reporta o melhor tempo, a mediana e a vazão (itens/s) do melhor."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+    best = durations[0]
+    return {
+        "items": items,
+        "repeat": repeat,
+        "best_s": round(best, 4),
+        "median_s": round(percentile(durations, 50), 4),
+        "items_per_sec": round(items / best, 1) if best > 0 else 0.0,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def save_results(suite: str, params: Dict[str, Any], results: Dict[str, Dict[str, Any]], output_dir: str = None) -> str:
+    """Grava os resultados em <output_dir>/<suite>-<timestamp>.json e devolve o caminho."""
+    output_dir = output_dir or DEFAULT_RESULTS_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(output_dir, f"{suite}-{timestamp}.json")
+    document = {
+        "suite": suite,
+        "timestamp": timestamp,
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    print(f"[BENCH] Resultados salvos em {path}")
+    return path
+
+
+def compare_results(results: Dict[str, Dict[str, Any]], baseline_path: str, threshold: float) -> int:
+    """
+    Compara com um arquivo de resultados anterior e imprime a variação de cada métrica.
+    Retorna o número de regressões acima de `threshold` (%).
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f).get("results", {})
+    regressions = 0
+    print(f"\n[BENCH] Comparação com {baseline_path} (limite {threshold:.0f}%)")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"  {name}: sem baseline")
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            if metric not in current or not previous.get(metric):
+                continue
+            change = (current[metric] - previous[metric]) / previous[metric] * 100
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > threshold:
+                flag = "  <-- REGRESSÃO"
+                regressions += 1
+            print(f"  {name:<32} {metric:<14} {previous[metric]:>12} -> {current[metric]:>12} ({change:+.1f}%){flag}")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Any]], columns: List[str]):
+    print(f"\n{'cenário':<32}" + "".join(f"{c:>14}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:<32}" + "".join(f"{row.get(c, ''):>14}" for c in columns))
+
+
+def add_import_path(path: str):
+    if path not in sys.path:
+        sys.path.insert(0, path)
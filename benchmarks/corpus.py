@@ -0,0 +1,135 @@
+import json
+import os
+import random
+import shutil
+import time
+import uuid
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+from common import BACKEND_DIR, CANONICAL_TAXONOMY_PATH, add_import_path
+
+# Corpus sintético com o mesmo formato dos dados reais: tópicos hierárquicos tirados da taxonomia canônica,
+# views com cauda longa, duração e data de envio variadas. Determinístico para uma dada semente.
+
+WORDS = (
+    "how to make best guide review reaction tutorial live highlights news explained history top "
+    "music game football cooking travel vlog challenge interview podcast episode trailer analysis "
+    "science space money crypto stocks fitness workout diet beauty makeup fashion car build "
+    "minecraft fortnite anime movie series comedy prank family kids animals nature ocean city "
+    "food recipe street budget luxury world record first last ultimate easy fast secret truth"
+).split()
+
+SEED_BATCH_SIZE = 20_000  # Pontos por upsert (cada upsert persiste os payloads do índice local)
+
+
+def load_canonical_taxonomy(path: str = CANONICAL_TAXONOMY_PATH) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def taxonomy_paths(taxonomy: Dict[str, Any], path: List[str] = None) -> List[List[str]]:
+    """Todos os caminhos raiz -> nó (não só folhas): vídeos reais também param em nós intermediários."""
+    path = path or []
+    paths = []
+    for name, children in taxonomy.items():
+        if name.startswith("__"):
+            continue
+        current = path + [name]
+        paths.append(current)
+        if isinstance(children, dict):
+            paths.extend(taxonomy_paths(children, current))
+    return paths
+
+
+def _sentence(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def iter_videos(n: int, taxonomy: Dict[str, Any], seed: int = 42) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    paths = taxonomy_paths(taxonomy)
+    for i in range(n):
+        topics = [" > ".join(rng.choice(paths)) for _ in range(rng.randint(1, 3))]
+        duration = rng.randint(15, 5400)
+        yield {
+            "yt_id": f"bench{i:07d}",
+            "title": _sentence(rng, 4, 10).capitalize(),
+            "description": _sentence(rng, 20, 60),
+            "description_llm": _sentence(rng, 15, 40),
+            "hierarchical_topics": topics,
+            "view_count": int(rng.lognormvariate(9, 2.5)),
+            "duration": f"PT{duration // 60}M{duration % 60}S",
+            "duration_seconds": duration,
+            "upload_date": f"{rng.randint(2012, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "intention": rng.choice(["entertain", "educate", "inform", "sell"]),
+            "named_entities": [{"name": rng.choice(WORDS).title(), "type": "ORG"}],
+        }
+
+
+def generate_videos(n: int, taxonomy: Dict[str, Any] = None, seed: int = 42) -> List[Dict[str, Any]]:
+    return list(iter_videos(n, taxonomy or load_canonical_taxonomy(), seed))
+
+
+def random_vectors(n: int, dim: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, dim), dtype=np.float32)
+
+
+def seed_local_index(index_dir: str, n: int, dim: int, seed: int = 42, collection_name: str = None) -> Dict[str, Any]:
+    """
+    Popula o índice local (LocalVectorService) com n vídeos sintéticos e devolve o manifesto
+    ({n, dim, seed, topic_ids, sample_ids}). Reaproveita o índice existente se o manifesto bater.
+    Requer as variáveis de ambiente do backend (VECTOR_BACKEND, EMBEDDING_DIM...) já definidas.
+    """
+    manifest_path = os.path.join(index_dir, "corpus.json")
+    expected = {"n": n, "dim": dim, "seed": seed}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if all(manifest.get(k) == v for k, v in expected.items()):
+            print(f"[CORPUS] Reaproveitando índice com {n} vídeos em {index_dir}")
+            return manifest
+    shutil.rmtree(index_dir, ignore_errors=True)
+
+    add_import_path(BACKEND_DIR)
+    from app.core import config
+    from app.services.local_vector_service import LocalVectorService
+    from app.services.taxonomy_service import node_id_for_path
+    from app.utils.helpers import build_video_payload
+
+    start = time.perf_counter()
+    service = LocalVectorService(data_dir=index_dir, collection_name=collection_name or config.QDRANT_COLLECTION_NAME,
+                                 dim=dim, block_size=config.LOCAL_VECTOR_BLOCK_SIZE)
+    topic_ids, sample_ids = set(), []
+    batch = []
+    for i, video in enumerate(iter_videos(n, load_canonical_taxonomy(), seed)):
+        paths = [[p.strip() for p in t.split(">")] for t in video["hierarchical_topics"]]
+        taxonomy_ids = sorted({node_id_for_path(p) for p in paths})
+        ancestor_ids = sorted({node_id_for_path(p[:d + 1]) for p in paths for d in range(len(p))})
+        topic_ids.update(ancestor_ids)
+        # Payload no formato do pipeline (descrição do LLM, data em RFC 3339)
+        video = {**video, "description": video["description_llm"], "upload_date": f"{video['upload_date']}T00:00:00Z"}
+        batch.append((video["yt_id"], build_video_payload(video, taxonomy_ids, ancestor_ids)))
+        if i % 1000 == 0:
+            sample_ids.append(video["yt_id"])
+        if len(batch) == SEED_BATCH_SIZE:
+            _upsert_batch(service, batch, dim, seed + i)
+            print(f"[CORPUS] {i + 1}/{n} vídeos indexados...")
+            batch = []
+    if batch:
+        _upsert_batch(service, batch, dim, seed + n)
+    manifest = {**expected, "topic_ids": sorted(topic_ids), "sample_ids": sample_ids}
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    print(f"[CORPUS] {n} vídeos indexados em {time.perf_counter() - start:.1f}s ({index_dir})")
+    return manifest
+
+
+def _upsert_batch(service, batch, dim: int, seed: int):
+    vectors = random_vectors(len(batch), dim, seed)
+    # Mesmo id de ponto do pipeline e da ingestão online (uuid5 do yt_id)
+    service.upsert(
+        (str(uuid.uuid5(uuid.NAMESPACE_URL, yt_id)), vec, payload)
+        for (yt_id, payload), vec in zip(batch, vectors)
+    )
@@ -0,0 +1,127 @@
+import argparse
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Stand-in local da API de embeddings da OpenAI (POST /v1/embeddings). Os clientes do backend e do pipeline
+# usam o SDK oficial, então basta apontar OPENAI_BASE_URL para este servidor. O vetor de cada texto é
+# determinístico (semente = hash do texto), normalizado, e a latência da API pode ser simulada.
+
+
+def fake_embedding(text: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+class FakeEmbeddingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, dim: int, latency_ms: float = 0.0, per_text_ms: float = 0.0):
+        super().__init__(address, _Handler)
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.per_text_ms = per_text_ms
+        self.stats = {"requests": 0, "texts": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record(self, texts: int):
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["texts"] += texts
+
+    def snapshot_stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self.stats)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeEmbeddingServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.snapshot_stats())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/embeddings"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        texts = body.get("input")
+        if isinstance(texts, str):
+            texts = [texts]
+        if not isinstance(texts, list) or not texts:
+            self._send_json(400, {"error": {"message": "input must be a non-empty string or list"}})
+            return
+        dim = int(body.get("dimensions") or self.server.dim)
+        delay = (self.server.latency_ms + self.server.per_text_ms * len(texts)) / 1000
+        if delay > 0:
+            time.sleep(delay)
+        # O SDK pede encoding_format="base64" por padrão (float32 little-endian)
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(texts):
+            vec = fake_embedding(str(text), dim)
+            embedding = base64.b64encode(vec.astype("<f4").tobytes()).decode("ascii") if as_base64 else vec.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(str(t).split()) for t in texts)
+        self.server.record(len(texts))
+        self._send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, dim: int = 1536, latency_ms: float = 0.0,
+                 per_text_ms: float = 0.0) -> FakeEmbeddingServer:
+    """Sobe o servidor numa thread daemon (port=0 escolhe uma porta livre) e o devolve."""
+    server = FakeEmbeddingServer((host, port), dim, latency_ms, per_text_ms)
+    threading.Thread(target=server.serve_forever, name="fake-embeddings", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor falso de embeddings compatível com a API da OpenAI.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latência fixa por requisição")
+    parser.add_argument("--per-text-ms", type=float, default=0.0, help="Latência adicional por texto do lote")
+    args = parser.parse_args()
+    server = FakeEmbeddingServer((args.host, args.port), args.dim, args.latency_ms, args.per_text_ms)
+    print(f"[FAKE-EMBEDDINGS] Ouvindo em {server.base_url} (dim={args.dim})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+
+from common import (BACKEND_DIR, CANONICAL_TAXONOMY_PATH, DEFAULT_RESULTS_DIR, DEFAULT_WORKDIR, add_import_path,
+                    compare_results, latency_summary, print_table, save_results)
+from corpus import WORDS, seed_local_index
+from fake_embedding_server import start_server
+
+# Teste de carga da API: sobe o backend (uvicorn) com o índice vetorial local populado por um corpus sintético
+# e embeddings servidos pelo servidor falso, e dispara cada cenário com a concorrência pedida.
+
+SCENARIOS = ("search", "search_topic", "search_facets", "browse", "taxonomy", "video")
+SERVER_START_TIMEOUT = 180  # s (o primeiro carregamento do índice local lê os payloads do disco)
+
+RequestFactory = Callable[[random.Random], Tuple[str, str, Dict[str, Any]]]
+
+
+def build_scenarios(manifest: Dict[str, Any], query_pool: int, seed: int) -> Dict[str, RequestFactory]:
+    """Cenário -> função que sorteia (método, caminho, kwargs do httpx) para cada requisição."""
+    rng = random.Random(seed)
+    queries = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))) for _ in range(query_pool)]
+    topic_ids = manifest["topic_ids"]
+    top_topics = [t for t in topic_ids if "-" not in t] or topic_ids
+    sample_ids = manifest["sample_ids"]
+    return {
+        "search": lambda r: ("POST", "/search", {"params": {"page": 1, "limit": 12},
+                                                 "json": {"query": r.choice(queries)}}),
+        "search_topic": lambda r: ("POST", "/search", {"params": {"page": 1, "limit": 12},
+                                                       "json": {"query": r.choice(queries), "topic_filter": r.choice(topic_ids)}}),
+        "search_facets": lambda r: ("POST", "/search", {"params": {"page": r.randint(1, 3), "limit": 12},
+                                                        "json": {"query": r.choice(queries), "facets": True}}),
+        "browse": lambda r: ("GET", "/videos_by_topic", {"params": {"topic_id": r.choice(top_topics), "limit": 12, "sort": "views"}}),
+        "taxonomy": lambda r: ("GET", "/taxonomy", {}),
+        "video": lambda r: ("GET", f"/video/{r.choice(sample_ids)}", {}),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, factory: RequestFactory, concurrency: int, duration: float,
+                       max_requests: int, warmup: int, seed: int) -> Dict[str, Any]:
+    """
+    `concurrency` clientes em laço fechado (cada um espera a resposta antes da próxima requisição) até
+    `duration` segundos ou `max_requests` requisições. Respostas != 2xx contam como erro.
+    """
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        method, path, kwargs = factory(rng)
+        await client.request(method, path, **kwargs)
+    latencies: List[float] = []
+    errors = {"count": 0, "statuses": {}}
+    issued = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_rng: random.Random):
+        nonlocal issued
+        while time.perf_counter() < deadline and (not max_requests or issued < max_requests):
+            issued += 1
+            method, path, kwargs = factory(worker_rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            if isinstance(status, int) and status < 400:
+                latencies.append(elapsed)
+            else:
+                errors["count"] += 1
+                errors["statuses"][str(status)] = errors["statuses"].get(str(status), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(rng.random())) for _ in range(concurrency)))
+    summary = latency_summary(latencies, time.perf_counter() - start, errors["count"])
+    summary["concurrency"] = concurrency
+    if errors["statuses"]:
+        summary["error_statuses"] = errors["statuses"]
+    return summary
+
+
+def backend_env(workdir: str, embedding_url: str, dim: int) -> Dict[str, str]:
+    """Variáveis do backend apontando para os stand-ins locais (nada toca a OpenAI nem o Qdrant)."""
+    taxonomy_path = os.path.join(workdir, "canonical_taxonomy.json")
+    shutil.copyfile(CANONICAL_TAXONOMY_PATH, taxonomy_path)
+    return {
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": embedding_url,
+        "VECTOR_BACKEND": "local",
+        "LOCAL_VECTOR_DIR": os.path.join(workdir, "index"),
+        "EMBEDDING_DIM": str(dim),
+        "TAXONOMY_FILE_PATH": taxonomy_path,
+        "JOBS_DIR": os.path.join(workdir, "jobs"),
+        # Sem aquecimento pelo log de buscas de execuções anteriores: cada execução parte dos caches vazios
+        "QUERY_LOG_PATH": os.path.join(workdir, "query_log.json"),
+        "QUERY_WARMUP_TOP": "0",
+        # Todas as requisições vêm de um único cliente: sem limite por cliente (o limite global continua valendo)
+        "SEARCH_RATE_LIMIT": "0",
+    }
+
+
+def start_backend(env: Dict[str, str], port: int, workers: int) -> subprocess.Popen:
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **env})
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn terminou durante a inicialização (código {process.returncode})")
+        try:
+            # /readyz só responde 200 com a taxonomia carregada e o índice local aberto
+            if httpx.get(f"http://127.0.0.1:{port}/readyz", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"uvicorn não respondeu em {SERVER_START_TIMEOUT}s")
+
+
+def stop_backend(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def drive(client: httpx.AsyncClient, args, manifest: Dict[str, Any], embedding_server) -> Dict[str, Dict[str, Any]]:
+    scenarios = build_scenarios(manifest, args.query_pool, args.seed)
+    results = {}
+    for name in args.scenarios:
+        for concurrency in args.concurrency:
+            before = embedding_server.snapshot_stats()
+            summary = await run_scenario(client, scenarios[name], concurrency, args.duration, args.requests,
+                                         args.warmup, args.seed)
+            after = embedding_server.snapshot_stats()
+            summary["embedding_requests"] = after["requests"] - before["requests"]
+            key = f"{name}@c{concurrency}"
+            results[key] = summary
+            print(f"[LOAD] {key}: {summary['requests']} req, {summary['rps']} req/s, p50 {summary['p50_ms']} ms, "
+                  f"p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms, erros {summary['errors']}")
+    return results
+
+
+async def run_in_process(args, manifest, embedding_server) -> Dict[str, Dict[str, Any]]:
+    """Chama o app ASGI no mesmo processo (sem rede nem uvicorn): isola o custo da aplicação."""
+    add_import_path(BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from app.main import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await drive(client, args, manifest, embedding_server)
+
+
+async def run_against_server(args, base_url: str, manifest, embedding_server) -> Dict[str, Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        return await drive(client, args, manifest, embedding_server)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da API com stand-ins locais (embeddings falsos + índice local).")
+    parser.add_argument("--videos", type=int, default=124_000, help="Tamanho do corpus sintético")
+    parser.add_argument("--dim", type=int, default=1536, help="Dimensão dos vetores (1536 = text-embedding-3-small)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Lista separada por vírgula ({', '.join(SCENARIOS)})")
+    parser.add_argument("--concurrency", default="1,8,32", help="Níveis de concorrência, ex.: 1,8,32")
+    parser.add_argument("--duration", type=float, default=15.0, help="Segundos por cenário/concorrência")
+    parser.add_argument("--requests", type=int, default=0, help="Limite de requisições por cenário (0 = só a duração)")
+    parser.add_argument("--warmup", type=int, default=5, help="Requisições de aquecimento (não medidas)")
+    parser.add_argument("--query-pool", type=int, default=1000, help="Consultas distintas (menos consultas = mais acertos no cache)")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0, help="Latência simulada da API de embeddings")
+    parser.add_argument("--url", help="Usar um backend já em execução (o corpus e os embeddings são de responsabilidade de quem o iniciou)")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn")
+    parser.add_argument("--in-process", action="store_true", help="Chamar o app ASGI no mesmo processo em vez de subir o uvicorn")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR)
+    parser.add_argument("--output-dir", default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--compare", help="Arquivo de resultados anterior para comparação")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Variação (%%) considerada regressão")
+    args = parser.parse_args(argv)
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(unknown))}")
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    # Caminhos absolutos: o modo --in-process muda o diretório atual para backend/
+    args.workdir = os.path.abspath(args.workdir)
+    args.output_dir = os.path.abspath(args.output_dir)
+    if args.compare:
+        args.compare = os.path.abspath(args.compare)
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    os.makedirs(args.workdir, exist_ok=True)
+    embedding_server = start_server(dim=args.dim, latency_ms=args.embedding_latency_ms)
+    env = backend_env(args.workdir, embedding_server.base_url, args.dim)
+    # O corpus é gerado neste processo com as mesmas variáveis que o backend vai usar
+    os.environ.update(env)
+    manifest = seed_local_index(env["LOCAL_VECTOR_DIR"], args.videos, args.dim, args.seed)
+
+    process = None
+    try:
+        if args.in_process:
+            results = asyncio.run(run_in_process(args, manifest, embedding_server))
+        else:
+            base_url = args.url
+            if not base_url:
+                print(f"[LOAD] Iniciando uvicorn ({args.workers} worker(s)) na porta {args.port}...")
+                process = start_backend(env, args.port, args.workers)
+                base_url = f"http://127.0.0.1:{args.port}"
+            results = asyncio.run(run_against_server(args, base_url, manifest, embedding_server))
+    finally:
+        if process is not None:
+            stop_backend(process)
+        embedding_server.shutdown()
+
+    print_table(results, ["requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms"])
+    params = {k: v for k, v in vars(args).items() if k not in ("workdir", "output_dir", "compare")}
+    save_results("load", params, results, args.output_dir)
+    if args.compare:
+        return 1 if compare_results(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
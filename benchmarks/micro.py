@@ -0,0 +1,169 @@
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+from typing import Any, Dict
+
+import pandas as pd
+
+from common import (CANONICAL_TAXONOMY_PATH, DEFAULT_RESULTS_DIR, DEFAULT_WORKDIR, SCRIPTS_DIR, add_import_path,
+                    compare_results, print_table, save_results, timed_runs)
+from corpus import WORDS, generate_videos, load_canonical_taxonomy
+from fake_embedding_server import start_server
+
+# Micro-benchmarks das etapas do pipeline (scripts/): mapeamento para a taxonomia, preparação do CSV e
+# indexação. Rodam num diretório de trabalho próprio (os scripts usam caminhos relativos a data/), com
+# embeddings do servidor falso e o Qdrant em modo local (":memory:").
+
+BENCHMARKS = ("taxonomy_ids", "map_videos", "node_counts", "prepare_data", "prepare_dataframe",
+              "embeddings_cold", "embeddings_warm", "index")
+INDEX_DIM = 1536  # indexer.ensure_collection cria a coleção com 1536 dimensões
+
+
+def synthetic_subtitles(rng: random.Random, segments: int) -> str:
+    """Coluna `subtitles` no formato do CSV original (repr de dict, lido com ast.literal_eval)."""
+    text = [{"t": " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))), "s": i * 3.0} for i in range(segments)]
+    return repr({"transcript": {"text": text}})
+
+
+def synthetic_csv_frame(rows: int, segments: int, seed: int) -> pd.DataFrame:
+    rng = random.Random(seed)
+    videos = generate_videos(rows, seed=seed)
+    return pd.DataFrame({
+        "yt_id": [v["yt_id"] for v in videos],
+        "title": [v["title"] for v in videos],
+        "description": [v["description"] for v in videos],
+        "view_count": [v["view_count"] for v in videos],
+        "subtitles": [synthetic_subtitles(rng, rng.randint(0, segments)) for _ in videos],
+    })
+
+
+def run_benchmarks(args, embedding_server) -> Dict[str, Dict[str, Any]]:
+    import taxonomy_mapper
+    import indexer
+    from data_handler import DataHandler
+    from qdrant_client import QdrantClient
+
+    selected = set(args.benchmarks)
+    results = {}
+
+    def record(name: str, func, items: int, repeat: int = None):
+        if name not in selected:
+            return
+        before = embedding_server.snapshot_stats()
+        results[name] = timed_runs(func, repeat or args.repeat, items)
+        calls = embedding_server.snapshot_stats()["requests"] - before["requests"]
+        if calls:
+            results[name]["embedding_requests"] = calls
+        row = results[name]
+        print(f"[MICRO] {name}: {row['items']} itens, melhor {row['best_s']}s, {row['items_per_sec']} itens/s")
+
+    taxonomy = load_canonical_taxonomy()
+    videos = generate_videos(args.videos, taxonomy, args.seed)
+    taxonomy_with_ids = taxonomy_mapper.add_ids_to_taxonomy(taxonomy)
+    path_to_id = taxonomy_mapper.build_path_to_id_map(taxonomy_with_ids)
+    id_to_ancestors = taxonomy_mapper.build_id_to_ancestors_map(taxonomy_with_ids)
+
+    # --- taxonomy_mapper ---
+    record("taxonomy_ids", lambda: taxonomy_mapper.build_path_to_id_map(taxonomy_mapper.add_ids_to_taxonomy(taxonomy)),
+           items=len(path_to_id))
+    map_path = os.path.join("data", "bench_taxonomy_map.parquet")
+
+    def map_videos():
+        # Sem checkpoint anterior: mede o mapeamento completo (incluindo as gravações periódicas)
+        if os.path.exists(map_path):
+            os.remove(map_path)
+        return taxonomy_mapper.map_videos_to_taxonomy(videos, path_to_id, checkpoint_path=map_path)
+    record("map_videos", map_videos, items=len(videos))
+    video_map = map_videos()
+    record("node_counts", lambda: taxonomy_mapper.compute_node_counts(video_map, id_to_ancestors), items=len(video_map))
+
+    # --- DataHandler.prepare_data (a função altera o DataFrame, então cada execução recebe uma cópia) ---
+    if "prepare_data" in selected:
+        frame = synthetic_csv_frame(args.csv_rows, args.segments, args.seed)
+        record("prepare_data", lambda: DataHandler.prepare_data(frame.copy(), 30), items=len(frame))
+
+    # --- indexer ---
+    videos_frame = pd.DataFrame(videos)
+    record("prepare_dataframe", lambda: indexer.prepare_dataframe(videos_frame.copy(), video_map, id_to_ancestors),
+           items=len(videos_frame))
+    index_videos = videos[:args.index_videos]
+    yt_ids = [v["yt_id"] for v in index_videos]
+    texts = [f"{v['title']} {v['description_llm']}" for v in index_videos]
+    embeddings_path = os.path.join("data", "bench_embeddings.parquet")
+
+    def embeddings_cold():
+        if os.path.exists(embeddings_path):
+            os.remove(embeddings_path)
+        return asyncio.run(indexer.embeddings_with_artifact(yt_ids, texts, embeddings_path))
+    record("embeddings_cold", embeddings_cold, items=len(texts))
+    if "embeddings_warm" in selected:
+        embeddings_cold()
+        record("embeddings_warm", lambda: asyncio.run(indexer.embeddings_with_artifact(yt_ids, texts, embeddings_path)),
+               items=len(texts))
+
+    if "index" in selected:
+        # Embeddings já no artefato padrão: mede montagem dos payloads + upserts em lotes + checkpoint
+        index_frame = indexer.prepare_dataframe(pd.DataFrame(index_videos), video_map, id_to_ancestors)
+        asyncio.run(indexer.embeddings_with_artifact(yt_ids, texts))
+
+        def index():
+            client = QdrantClient(":memory:")
+            asyncio.run(indexer.index_to_qdrant_async(index_frame, client, "bench", skip_indexed=False))
+        record("index", index, items=len(index_frame), repeat=1)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks do pipeline (taxonomy_mapper, DataHandler, indexer).")
+    parser.add_argument("--videos", type=int, default=124_000, help="Vídeos sintéticos para mapeamento/preparação")
+    parser.add_argument("--csv-rows", type=int, default=10_000, help="Linhas do CSV sintético em prepare_data")
+    parser.add_argument("--segments", type=int, default=200, help="Máximo de segmentos de legenda por linha do CSV")
+    parser.add_argument("--index-videos", type=int, default=5_000, help="Vídeos em embeddings_* e index")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help=f"Lista separada por vírgula ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0, help="Latência simulada da API de embeddings")
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR)
+    parser.add_argument("--output-dir", default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--compare", help="Arquivo de resultados anterior para comparação")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Variação (%%) considerada regressão")
+    args = parser.parse_args(argv)
+    args.benchmarks = [b.strip() for b in args.benchmarks.split(",") if b.strip()]
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"benchmarks desconhecidos: {', '.join(sorted(unknown))}")
+    args.output_dir = os.path.abspath(args.output_dir)
+    if args.compare:
+        args.compare = os.path.abspath(args.compare)
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    embedding_server = start_server(dim=INDEX_DIM, latency_ms=args.embedding_latency_ms)
+    # Antes de importar os scripts: o cliente da OpenAI lê a URL e a chave ao ser criado
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_BASE_URL"] = embedding_server.base_url
+    workdir = os.path.join(os.path.abspath(args.workdir), "micro")
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    shutil.copyfile(CANONICAL_TAXONOMY_PATH, os.path.join(workdir, "data", "canonical_taxonomy.json"))
+    add_import_path(SCRIPTS_DIR)
+    os.chdir(workdir)
+    try:
+        results = run_benchmarks(args, embedding_server)
+    finally:
+        embedding_server.shutdown()
+
+    print_table(results, ["items", "best_s", "median_s", "items_per_sec"])
+    params = {k: v for k, v in vars(args).items() if k not in ("workdir", "output_dir", "compare")}
+    save_results("micro", params, results, args.output_dir)
+    if args.compare:
+        return 1 if compare_results(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
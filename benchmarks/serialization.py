@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import random
+import sys
+from typing import Any, Dict
+
+from common import (BACKEND_DIR, DEFAULT_RESULTS_DIR, DEFAULT_WORKDIR, add_import_path, compare_results, print_table,
+                    save_results, timed_runs)
+from corpus import WORDS, load_canonical_taxonomy, taxonomy_paths
+
+# Custo de serialização das respostas de /search e /taxonomy por tamanho de resposta, comparando o caminho
+# padrão do FastAPI (validação pelo response_model + serialização pelo Pydantic), json da stdlib e orjson.
+
+RESULT_SIZES = (12, 100, 1000)
+
+
+def synthetic_hits(n: int, seed: int):
+    from app.utils.helpers import SearchHit
+    rng = random.Random(seed)
+    node_ids = ["-".join(p.lower().replace(" ", "_") for p in path) for path in taxonomy_paths(load_canonical_taxonomy())]
+    return [
+        SearchHit(
+            id=f"bench{i:07d}",
+            score=rng.random(),
+            title=" ".join(rng.choice(WORDS) for _ in range(8)),
+            description=" ".join(rng.choice(WORDS) for _ in range(30)),
+            topics_path=rng.sample(node_ids, rng.randint(1, 3)),
+        )
+        for i in range(n)
+    ]
+
+
+def run_benchmarks(args) -> Dict[str, Dict[str, Any]]:
+    import orjson
+    from dataclasses import asdict
+    from app.api.search import SearchResponse
+    from app.core.responses import FastJSONResponse
+    from app.services import taxonomy_service
+    from app.services.facet_service import compute_topic_facets
+
+    results = {}
+
+    def record(name: str, func, loops: int):
+        body = func()
+        row = timed_runs(lambda: [func() for _ in range(loops)], args.repeat, loops)
+        row["bytes"] = len(body)
+        row["us_per_op"] = round(row["best_s"] / loops * 1e6, 2)
+        results[name] = row
+        print(f"[SERIALIZE] {name}: {row['bytes']} bytes, {row['us_per_op']} µs/resposta")
+
+    for size in args.sizes:
+        hits = synthetic_hits(size, args.seed)
+        dicts = [asdict(h) for h in hits]
+        facets = compute_topic_facets(hits)
+        content = {"results": hits, "total": size, "facets": facets}
+        dict_content = {"results": dicts, "total": size, "facets": facets}
+        loops = max(1, args.loops // size)
+        # Caminho anterior: dicts validados pelo response_model e serializados pelo Pydantic
+        record(f"search_{size}/pydantic_validate", lambda: SearchResponse.model_validate(dict_content).model_dump_json().encode(), loops)
+        record(f"search_{size}/stdlib_json", lambda: json.dumps(dict_content, ensure_ascii=False).encode(), loops)
+        record(f"search_{size}/orjson_dicts", lambda: orjson.dumps(dict_content), loops)
+        # Caminho atual (trusted_response): SearchHit com slots serializado direto pelo orjson
+        record(f"search_{size}/orjson_hits", lambda: FastJSONResponse(content).body, loops)
+
+    snapshot = taxonomy_service.set_taxonomy_snapshot(load_canonical_taxonomy())
+    taxonomy = snapshot.taxonomy
+    loops = max(1, args.loops // 1000)
+    record("taxonomy/stdlib_json", lambda: json.dumps(taxonomy, ensure_ascii=False).encode(), loops)
+    record("taxonomy/orjson", lambda: orjson.dumps(taxonomy), loops)
+    snapshot.to_json()
+    record("taxonomy/snapshot_cached", lambda: FastJSONResponse(snapshot.to_json()).body, loops * 100)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Custo de serialização das respostas de /search e /taxonomy.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in RESULT_SIZES), help="Resultados por resposta de /search")
+    parser.add_argument("--loops", type=int, default=20_000, help="Resultados serializados por amostra (divididos pelo tamanho)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR)
+    parser.add_argument("--output-dir", default=DEFAULT_RESULTS_DIR)
+    parser.add_argument("--compare", help="Arquivo de resultados anterior para comparação")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Variação (%%) considerada regressão")
+    args = parser.parse_args(argv)
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Backend local, sem servidor, caso algo chegue a criar o serviço vetorial
+    os.environ.setdefault("VECTOR_BACKEND", "local")
+    os.environ.setdefault("LOCAL_VECTOR_DIR", os.path.join(os.path.abspath(args.workdir), "serialization_index"))
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    add_import_path(BACKEND_DIR)
+    results = run_benchmarks(args)
+    print_table(results, ["bytes", "us_per_op", "items_per_sec"])
+    params = {k: v for k, v in vars(args).items() if k not in ("workdir", "output_dir", "compare")}
+    save_results("serialization", params, results, args.output_dir)
+    if args.compare:
+        return 1 if compare_results(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
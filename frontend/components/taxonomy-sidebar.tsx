@@ -30,6 +30,9 @@ const TopicItem = ({ topic, level }: { topic: Topic; level: number }) => {
         >
           {topic.name}
         </span>
+        {topic.videoCount !== undefined && (
+          <span className="ml-2 text-xs text-muted-foreground">{topic.videoCount.toLocaleString()}</span>
+        )}
         {hasChildren && level < 2 && (
           <div className="ml-2 cursor-pointer" onClick={e => { e.stopPropagation(); setIsOpen(!isOpen); }}>
             {isOpen ? <ChevronDown size={16} /> : <ChevronRight size={16} />}
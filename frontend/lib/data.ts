@@ -156,7 +156,10 @@ export const fetchVideosBySearch = async (
   const body = {
     query: query || "",
     topic_filter: filters?.topics?.[0] || null,
-    top_k: limit
+    top_k: limit,
+    duration: filters?.duration || null,
+    upload_date: filters?.uploadDate || null,
+    min_views: filters?.minViews || null
   }
   const response = await fetch(`/api/search`, {
     method: "POST",
@@ -190,15 +193,20 @@ export const fetchVideosBySearch = async (
 export const fetchVideosByTopic = async (
   topicId: string,
   page: number = 1,
-  limit: number = 10
-): Promise<{ videos: Video[]; total: number }> => {
+  limit: number = 10,
+  cursor?: string | null,
+  sort: "default" | "views" = "default"
+): Promise<{ videos: Video[]; total: number; nextCursor: string | null }> => {
   // Garantir que o topicId está decodificado corretamente
   const decodedTopicId = decodeURIComponent(topicId);
   const params = new URLSearchParams({ 
     topic_id: decodedTopicId,
     page: page.toString(),
     limit: limit.toString(),
+    sort,
   });
+  // Com cursor (next_cursor da página anterior) o backend pagina em custo constante
+  if (cursor) params.set("cursor", cursor);
   const response = await fetch(`${baseUrl}/videos_by_topic?${params.toString()}`);
   if (!response.ok) {
       throw new Error('Failed to fetch videos by topic');
@@ -219,7 +227,7 @@ export const fetchVideosByTopic = async (
       videoUrl: video.videoUrl,
       channel: video.channel
   }));
-  return { videos, total: data.total }
+  return { videos, total: data.total, nextCursor: data.next_cursor ?? null }
 }
 
 export const fetchVideoById = async (id: string): Promise<Video | undefined> => {
@@ -252,14 +260,16 @@ export const fetchTaxonomy = async (): Promise<Topic[]> => {
   const data = await response.json();
 
   const transformTaxonomy = (node: any, path: string[] = []): Topic[] => {
-    return Object.keys(node).map(key => {
+    // Chaves "__*__" são metadados do nó (ex.: "__count__" = vídeos na sub-árvore), não filhos
+    return Object.keys(node).filter(key => !key.startsWith("__")).map(key => {
       const currentPath = [...path, key];
       const children = node[key] ? transformTaxonomy(node[key], currentPath) : [];
       return {
         id: currentPath.join(" > "),
         name: key,
         children: children,
-        level: currentPath.length -1
+        level: currentPath.length -1,
+        videoCount: node[key]?.__count__
       };
     });
   };
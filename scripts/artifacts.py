@@ -0,0 +1,202 @@
+import hashlib
+import math
+import os
+import re
+from typing import Any, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import Config
+
+# Artefatos intermediários do pipeline em Parquet (colunar, comprimido, lido com memory map).
+# Os schemas são fixos: colunas extras são descartadas e as ausentes ficam nulas.
+
+ENTITY_TYPE = pa.struct([('name', pa.string()), ('type', pa.string())])
+
+VIDEOS_SCHEMA = pa.schema([
+    ('yt_id', pa.string()),
+    ('title', pa.string()),
+    ('description', pa.string()),
+    ('view_count', pa.int64()),
+    ('duration_seconds', pa.int64()),
+    ('upload_date', pa.string()),
+    ('description_llm', pa.string()),
+    ('named_entities', pa.list_(ENTITY_TYPE)),
+    ('intention', pa.string()),
+    ('hierarchical_topics', pa.list_(pa.string())),
+    ('input_tokens', pa.int64()),
+    ('output_tokens', pa.int64()),
+    ('total_tokens', pa.int64()),
+    ('llm_cost_usd', pa.float64()),
+    ('error', pa.string()),
+])
+
+TAXONOMY_MAP_SCHEMA = pa.schema([
+    ('yt_id', pa.string()),
+    ('taxonomy_ids', pa.list_(pa.string())),
+])
+
+ROW_GROUP_SIZE = 10_000  # Unidade de leitura paralela (ver taxonomy_draft_builder)
+
+
+def parse_duration_seconds(value):
+    """
+    Aceita segundos (número ou texto, ex.: 623, 623.0 ou "623.0" de uma coluna do CSV lida como float),
+    "HH:MM:SS"/"MM:SS" ou ISO 8601 ("PT10M23S"). Retorna None se inválido.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        seconds = float(text)
+    except ValueError:
+        seconds = None
+    if seconds is not None:
+        return int(seconds) if math.isfinite(seconds) and seconds >= 0 else None
+    if ':' in text:
+        try:
+            seconds = 0
+            for part in text.split(':'):
+                seconds = seconds * 60 + int(part)
+            return seconds
+        except ValueError:
+            return None
+    match = re.fullmatch(r'P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', text)
+    if match and any(match.groups()):
+        days, hours, minutes, seconds = (int(g) if g else 0 for g in match.groups())
+        return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+    return None
+
+# Colunas do artefato normalizadas a partir de uma coluna do CSV: nome -> (coluna de origem, normalização)
+DERIVED_COLUMNS = {
+    'duration_seconds': ('duration', parse_duration_seconds),
+}
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+def _to_str(value):
+    return None if _is_missing(value) else str(value)
+
+def _to_int(value):
+    if _is_missing(value):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value):
+    if _is_missing(value):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_str_list(value) -> List[str]:
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [str(v) for v in value if isinstance(v, str)]
+    return []
+
+def _to_entities(value) -> List[Dict[str, str]]:
+    if not isinstance(value, (list, tuple, np.ndarray)):
+        return []
+    return [
+        {'name': str(e['name']), 'type': _to_str(e.get('type'))}
+        for e in value if isinstance(e, dict) and e.get('name') is not None
+    ]
+
+_CONVERTERS = {
+    pa.string(): _to_str,
+    pa.int64(): _to_int,
+    pa.float64(): _to_float,
+    pa.list_(pa.string()): _to_str_list,
+    pa.list_(ENTITY_TYPE): _to_entities,
+}
+
+
+def _write_table(table: pa.Table, path: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, compression='zstd', row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+def _to_pandas(table: pa.Table) -> pd.DataFrame:
+    """DataFrame com colunas de lista como listas Python (to_pandas devolveria arrays NumPy)."""
+    list_cols = [f.name for f in table.schema if pa.types.is_list(f.type)]
+    df = table.drop_columns(list_cols).to_pandas()
+    for name in list_cols:
+        df[name] = table.column(name).to_pylist()
+    return df[[f.name for f in table.schema]]
+
+
+# --- Vídeos extraídos (saída do LLM + metadados) ---
+def write_videos(df: pd.DataFrame, path: str = None):
+    path = path or Config.PROCESSED_VIDEOS_PARQUET_PATH
+    arrays = []
+    for field in VIDEOS_SCHEMA:
+        convert = _CONVERTERS[field.type]
+        if field.name in df.columns:
+            values = df[field.name].tolist()
+        elif field.name in DERIVED_COLUMNS and DERIVED_COLUMNS[field.name][0] in df.columns:
+            source, normalize = DERIVED_COLUMNS[field.name]
+            values = [normalize(v) for v in df[source].tolist()]
+        else:
+            values = [None] * len(df)
+        arrays.append(pa.array([convert(v) for v in values], type=field.type))
+    _write_table(pa.Table.from_arrays(arrays, schema=VIDEOS_SCHEMA), path)
+    print(f"[ARTIFACTS] {len(df)} vídeos salvos em {path}")
+
+def read_videos(path: str = None, columns: List[str] = None) -> pd.DataFrame:
+    path = path or Config.PROCESSED_VIDEOS_PARQUET_PATH
+    return _to_pandas(pq.read_table(path, columns=columns, memory_map=True))
+
+def read_video_records(path: str = None, columns: List[str] = None) -> List[Dict[str, Any]]:
+    path = path or Config.PROCESSED_VIDEOS_PARQUET_PATH
+    return pq.read_table(path, columns=columns, memory_map=True).to_pylist()
+
+
+# --- Mapa vídeo -> IDs da taxonomia ---
+def write_taxonomy_map(video_map: Dict[str, List[str]], path: str = None):
+    path = path or Config.TAXONOMY_MAP_PARQUET_PATH
+    table = pa.Table.from_arrays(
+        [pa.array(list(video_map.keys()), pa.string()), pa.array(list(video_map.values()), pa.list_(pa.string()))],
+        schema=TAXONOMY_MAP_SCHEMA
+    )
+    _write_table(table, path)
+
+def read_taxonomy_map(path: str = None) -> Dict[str, List[str]]:
+    path = path or Config.TAXONOMY_MAP_PARQUET_PATH
+    table = pq.read_table(path, memory_map=True)
+    return dict(zip(table.column('yt_id').to_pylist(), table.column('taxonomy_ids').to_pylist()))
+
+
+# --- Embeddings (reaproveitados entre execuções quando o texto não mudou) ---
+def embedding_text_hash(text: str, model: str = None) -> str:
+    model = model or Config.EMBEDDING_MODEL_OPENAI
+    return hashlib.sha1(f"{model}\n{text}".encode('utf-8')).hexdigest()
+
+def write_embeddings(yt_ids: List[str], text_hashes: List[str], vectors: np.ndarray, path: str = None):
+    path = path or Config.EMBEDDINGS_PARQUET_PATH
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    dim = vectors.shape[1]
+    schema = pa.schema([
+        ('yt_id', pa.string()),
+        ('text_hash', pa.string()),
+        ('embedding', pa.list_(pa.float32(), dim)),
+    ])
+    embedding = pa.FixedSizeListArray.from_arrays(pa.array(vectors.reshape(-1)), dim)
+    table = pa.Table.from_arrays([pa.array(yt_ids, pa.string()), pa.array(text_hashes, pa.string()), embedding], schema=schema)
+    _write_table(table, path)
+
+def read_embeddings(path: str = None) -> Tuple[List[str], List[str], np.ndarray]:
+    """(yt_ids, text_hashes, matriz float32 n x dim)."""
+    path = path or Config.EMBEDDINGS_PARQUET_PATH
+    table = pq.read_table(path, memory_map=True)
+    column = table.column('embedding').combine_chunks()
+    dim = column.type.list_size
+    matrix = column.values.to_numpy(zero_copy_only=False).reshape(-1, dim)
+    return table.column('yt_id').to_pylist(), table.column('text_hash').to_pylist(), matrix
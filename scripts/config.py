@@ -2,15 +2,36 @@ import os
 
 class Config:
     INPUT_CSV_PATH = 'input/input.csv'
-    OUTPUT_JSON_PATH = 'data/processed_videos.json'
+    OUTPUT_JSON_PATH = 'data/processed_videos.json'  # Checkpoint da extração por LLM (retomada)
+    # Artefatos entre etapas (Parquet, ver artifacts.py)
+    PROCESSED_VIDEOS_PARQUET_PATH = 'data/processed_videos.parquet'
+    TAXONOMY_MAP_PARQUET_PATH = 'data/video_to_taxonomy_map.parquet'
+    EMBEDDINGS_PARQUET_PATH = 'data/embeddings.parquet'
+    TAXONOMY_MAP_CHECKPOINT_EVERY = 5000  # Vídeos mapeados entre gravações do checkpoint do mapeamento
+    PIPELINE_STATE_PATH = 'data/pipeline_state.json'  # Impressões digitais das etapas (ver pipeline_runner.py)
+    PIPELINE_REPORTS_DIR = 'data/pipeline_runs'  # Relatório JSON de cada execução
+    PIPELINE_MAX_PARALLEL_STAGES = 2
     DATA_DIR = 'data'
+    SERVED_TAXONOMY_PATH = 'data/taxonomy_with_counts.json'
     SAMPLE_SIZE = 500
     TRANSCRIPT_MIN_LENGTH = 30
-    TRANSCRIPT_MAX_CHARS = 4000
+    TRANSCRIPT_MAX_CHARS = 4000  # Fallback quando não há transcrição condensada
+    TRANSCRIPT_TOKEN_BUDGET = 1000  # Orçamento (tokens estimados) da transcrição condensada enviada ao LLM
+    TRANSCRIPT_CONDENSE_WORKERS = os.cpu_count() or 1
     API_KEY = os.getenv("GOOGLE_API_KEY")
     LLM_MODEL_VIDEO = "gemini-2.0-flash-lite"
     LLM_MODEL_TAXONOMY = "gemini-2.0-flash-lite"
     CONCURRENCY_LIMIT = 50
+    LLM_BATCH_SIZE = 8  # Vídeos por prompt na extração (1 = um vídeo por chamada)
+    DRAFT_MIN_NODE_COUNT = 2  # Nós do draft citados por menos vídeos são podados antes do refinamento
+    DRAFT_WORKERS = os.cpu_count() or 1
+    TAXONOMY_CONCURRENCY_LIMIT = 8  # Chamadas simultâneas no refinamento de sub-árvores
+    TAXONOMY_CHUNK_MAX_CHARS = 12000  # Sub-árvores maiores são refinadas em pedaços e mescladas
+    LLM_CACHE_ENABLED = True
+    LLM_CACHE_PATH = 'data/llm_cache.sqlite'
+    LLM_CACHE_MAX_ENTRIES = 500_000
+    LLM_CACHE_EVICT_EVERY = 1000  # Inserções entre verificações do limite (o cache pode passar dele por até esse tanto)
+    LLM_CACHE_TOUCH_BATCH = 500  # Hits acumulados em memória antes de gravar last_access em lote
     LLM_VIDEO_INPUT_COST_PER_M = 0.075
     LLM_VIDEO_OUTPUT_COST_PER_M = 0.30
     LLM_TAXONOMY_INPUT_COST_PER_M = 0.075
@@ -13,15 +13,16 @@ class DataHandler:
 
     @staticmethod
     def prepare_data(df: pd.DataFrame, min_transcript_length: int) -> pd.DataFrame:
-        def extract_full_transcript(row: pd.Series) -> str:
+        def extract_transcript_segments(row: pd.Series) -> list:
             try:
                 transcript_data = ast.literal_eval(row['subtitles'])
-                texts = [item['t'] for item in transcript_data.get('transcript', {}).get('text', [])]
-                return ' '.join(texts)
+                return [item['t'] for item in transcript_data.get('transcript', {}).get('text', [])]
             except (ValueError, SyntaxError, KeyError):
-                return ""
+                return []
 
-        df['full_transcript'] = df.apply(extract_full_transcript, axis=1)
+        # Segmentos de legenda ficam disponíveis para a etapa de condensação (transcript_condenser.py)
+        df['transcript_segments'] = df.apply(extract_transcript_segments, axis=1)
+        df['full_transcript'] = df['transcript_segments'].str.join(' ')
         df_clean = df[df['full_transcript'].str.len() > min_transcript_length].copy()
         os.makedirs(Config.DATA_DIR, exist_ok=True)
         return df_clean 
\ No newline at end of file
@@ -0,0 +1,198 @@
+import argparse
+import base64
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tqdm import tqdm
+from config import Config
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+# Exporta os pontos indexados no Qdrant (payload e, opcionalmente, vetores) para NDJSON ou Parquet,
+# página a página via scroll: a memória usada não depende do tamanho da coleção.
+# Mesmo formato do endpoint /export do backend.
+
+SCROLL_BATCH_SIZE = 1000
+TOPIC_FILTER_FIELD = 'taxonomy_ancestor_ids'  # Ancestrais de cada nó: um match filtra a sub-árvore inteira
+
+def iter_points(client: QdrantClient, collection_name: str, topic_id: Optional[str] = None, fields: Optional[List[str]] = None,
+                with_vectors: bool = False, batch_size: int = SCROLL_BATCH_SIZE) -> Iterator[List[Tuple[Any, Dict[str, Any], Any]]]:
+    scroll_filter = None
+    if topic_id:
+        scroll_filter = qmodels.Filter(must=[
+            qmodels.FieldCondition(key=TOPIC_FILTER_FIELD, match=qmodels.MatchValue(value=topic_id))
+        ])
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=batch_size,
+            offset=offset,
+            with_payload=fields if fields is not None else True,
+            with_vectors=with_vectors
+        )
+        yield [(point.id, point.payload or {}, point.vector if with_vectors else None) for point in points]
+        if offset is None:
+            break
+
+def _row(point_id, payload: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    row = {'id': str(point_id)}
+    if fields is None:
+        row.update(payload)
+    else:
+        row.update({name: payload.get(name) for name in fields})
+    return row
+
+def _vector_bytes(vector) -> bytes:
+    return np.asarray(vector, dtype='<f4').tobytes()
+
+def write_ndjson(batches, path: str, fields: Optional[List[str]], progress) -> int:
+    """Uma linha JSON por ponto; vetores em base64 dos bytes float32 little-endian."""
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for batch in batches:
+            for point_id, payload, vector in batch:
+                row = _row(point_id, payload, fields)
+                if vector is not None:
+                    row['vector'] = base64.b64encode(_vector_bytes(vector)).decode('ascii')
+                f.write(json.dumps(row, ensure_ascii=False))
+                f.write('\n')
+            written += len(batch)
+            progress.update(len(batch))
+    return written
+
+# Tipos das colunas do Parquet para os campos de payload gravados pelo indexer (e pela ingestão online do backend).
+# O schema é fixo: não depende do que aparece na primeira página do scroll.
+PARQUET_FIELD_TYPES = {
+    'yt_id': pa.string(),
+    'title': pa.string(),
+    'description_llm': pa.string(),
+    'channel_id': pa.string(),
+    'intention': pa.string(),
+    'named_entities': pa.list_(pa.string()),
+    'hierarchical_topics': pa.list_(pa.string()),
+    'taxonomy_ids': pa.list_(pa.string()),
+    'taxonomy_ancestor_ids': pa.list_(pa.string()),
+    'view_count': pa.int64(),
+    'view_sort_key': pa.int64(),
+    'duration_seconds': pa.int64(),
+    'upload_date': pa.string(),
+}
+EXTRA_COLUMN = 'extra'  # Sem --fields: demais campos do payload, como um objeto JSON
+
+def _to_json(value):
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+def _to_string(value):
+    if value is None or isinstance(value, str):
+        return value
+    return _to_json(value) if isinstance(value, (dict, list, tuple)) else str(value)
+
+def _to_int(value):
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def _to_list(value):
+    if value is None:
+        return None
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    return [_to_string(item) for item in value if item is not None]
+
+_CONVERTERS = {
+    pa.string(): _to_string,
+    pa.int64(): _to_int,
+    pa.list_(pa.string()): _to_list,
+}
+
+def parquet_schema(fields: Optional[List[str]], with_vectors: bool) -> pa.Schema:
+    """Campos pedidos (os desconhecidos como texto JSON) ou todos os conhecidos + "extra"; vetores em binário."""
+    if fields is None:
+        columns = list(PARQUET_FIELD_TYPES.items()) + [(EXTRA_COLUMN, pa.string())]
+    else:
+        columns = [(name, PARQUET_FIELD_TYPES.get(name, pa.string())) for name in fields]
+    return pa.schema([('id', pa.string())] + columns + ([('vector', pa.binary())] if with_vectors else []))
+
+def write_parquet(batches, path: str, fields: Optional[List[str]], progress, with_vectors: bool = False) -> int:
+    """
+    Um row group por página do scroll, com schema fixo (parquet_schema): valores de tipo inesperado viram
+    nulos em vez de abortar a exportação no meio. Vetores numa coluna binária com os bytes float32 little-endian.
+    """
+    schema = parquet_schema(fields, with_vectors)
+    written = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for batch in batches:
+            if not batch:
+                continue
+            arrays = []
+            for field in schema:
+                if field.name == 'id':
+                    values = [str(point_id) for point_id, _, _ in batch]
+                elif field.name == 'vector' and with_vectors:
+                    values = [None if vector is None else _vector_bytes(vector) for _, _, vector in batch]
+                elif field.name == EXTRA_COLUMN and fields is None:
+                    values = [_to_json({k: v for k, v in payload.items() if k not in PARQUET_FIELD_TYPES} or None)
+                              for _, payload, _ in batch]
+                else:
+                    known = fields is None or field.name in PARQUET_FIELD_TYPES
+                    convert = _CONVERTERS[field.type] if known else _to_json
+                    values = [convert(payload.get(field.name)) for _, payload, _ in batch]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            written += len(batch)
+            progress.update(len(batch))
+    return written
+
+def export_points(client: QdrantClient, collection_name: str, output_path: str, fmt: str, topic_id: Optional[str] = None,
+                  fields: Optional[List[str]] = None, with_vectors: bool = False, batch_size: int = SCROLL_BATCH_SIZE) -> int:
+    """Grava a exportação em output_path (arquivo temporário + rename: nunca fica um arquivo pela metade)."""
+    count_filter = None
+    if topic_id:
+        count_filter = qmodels.Filter(must=[
+            qmodels.FieldCondition(key=TOPIC_FILTER_FIELD, match=qmodels.MatchValue(value=topic_id))
+        ])
+    total = client.count(collection_name=collection_name, count_filter=count_filter, exact=False).count
+    batches = iter_points(client, collection_name, topic_id, fields, with_vectors, batch_size)
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{output_path}.tmp'
+    try:
+        with tqdm(total=total, desc='Exportando pontos', unit='pt') as progress:
+            if fmt == 'parquet':
+                written = write_parquet(batches, tmp_path, fields, progress, with_vectors)
+            else:
+                written = write_ndjson(batches, tmp_path, fields, progress)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return written
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Exporta os vídeos indexados no Qdrant para NDJSON ou Parquet')
+    parser.add_argument('output', help='Arquivo de saída (.ndjson/.jsonl ou .parquet)')
+    parser.add_argument('--format', choices=['ndjson', 'parquet'],
+                        help='Formato (padrão: pela extensão do arquivo de saída)')
+    parser.add_argument('--fields', help='Campos do payload separados por vírgula (padrão: todos)')
+    parser.add_argument('--topic', help='ID do nó da taxonomia (ex.: entertainment-reality_tv); inclui os descendentes')
+    parser.add_argument('--vectors', action='store_true', help='Incluir os vetores (float32)')
+    parser.add_argument('--batch-size', type=int, default=SCROLL_BATCH_SIZE, help='Pontos por página do scroll')
+    parser.add_argument('--qdrant-url', default=Config.QDRANT_URL)
+    parser.add_argument('--collection', default=Config.QDRANT_COLLECTION_NAME)
+    args = parser.parse_args()
+    fmt = args.format or ('parquet' if args.output.endswith('.parquet') else 'ndjson')
+    fields = [f.strip() for f in args.fields.split(',') if f.strip()] if args.fields else None
+    print('Conectando ao Qdrant...')
+    client = QdrantClient(url=args.qdrant_url)
+    total = export_points(client, args.collection, args.output, fmt, args.topic, fields, args.vectors, args.batch_size)
+    print(f'[EXPORT] {total} pontos exportados para {args.output} ({fmt}).')
@@ -1,16 +1,28 @@
 import os
 import json
 import uuid
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 from config import Config
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qmodels
 from embedding_service import get_openai_embeddings
+from taxonomy_mapper import add_ids_to_taxonomy, build_id_to_ancestors_map, expand_with_ancestors
+from artifacts import (embedding_text_hash, parse_duration_seconds, read_embeddings, read_taxonomy_map, read_videos,
+                       write_embeddings)
+import argparse
 import asyncio
+import zlib
 
 BATCH_SIZE = 64
+SCROLL_BATCH_SIZE = 256
+# Campos de payload indexados como keyword (filtros por tópico)
+KEYWORD_INDEX_FIELDS = ['taxonomy_ids', 'taxonomy_ancestor_ids']
+# Campos de payload com índice de range (ordenação/paginação da navegação por tópico e filtros da busca)
+INTEGER_INDEX_FIELDS = ['view_count', 'view_sort_key', 'duration_seconds']
+DATETIME_INDEX_FIELDS = ['upload_date']
 
 # --- Utilitário para gerar UUID determinístico a partir do yt_id ---
 def uuid_from_ytid(yt_id: str) -> str:
@@ -31,17 +43,64 @@ def ensure_collection(client: QdrantClient, vector_size: int, collection_name: s
     else:
         print(f"Coleção '{collection_name}' já existe.")
 
+# --- Garantir índices de payload (idempotente) ---
+def ensure_payload_indexes(client: QdrantClient, collection_name: str):
+    for field in KEYWORD_INDEX_FIELDS:
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field,
+            field_schema=qmodels.PayloadSchemaType.KEYWORD
+        )
+    for field in INTEGER_INDEX_FIELDS:
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field,
+            field_schema=qmodels.PayloadSchemaType.INTEGER
+        )
+    for field in DATETIME_INDEX_FIELDS:
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field,
+            field_schema=qmodels.PayloadSchemaType.DATETIME
+        )
+
+# --- Chave de ordenação pré-computada para navegação por tópico ---
+def view_sort_key(yt_id: str, view_count) -> int:
+    """
+    Chave inteira determinística que ordena por view_count; os 20 bits baixos (hash do yt_id) desempatam
+    vídeos com o mesmo número de views. O hash pode colidir, então a chave não é única: o backend pagina
+    com cursor (chave, id do ponto). Não depende dos demais vídeos, então continua válida em indexações incrementais.
+    """
+    try:
+        views = max(int(view_count), 0)
+    except (TypeError, ValueError):
+        views = 0
+    return (views << 20) | (zlib.crc32(yt_id.encode('utf-8')) & 0xFFFFF)
+
+# --- Normalização de metadados filtráveis (data de envio; a duração já vem em segundos do artefato) ---
+def parse_upload_date(value):
+    """Normaliza a data de envio para RFC 3339 em UTC ("2024-01-15T00:00:00Z"), formato do índice datetime."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    parsed = pd.to_datetime(value, utc=True, errors='coerce')
+    if pd.isna(parsed):
+        return None
+    return parsed.strftime('%Y-%m-%dT%H:%M:%SZ')
+
 # --- Carregar e preparar dados ---
 def load_data():
-    with open(os.path.join('data', 'processed_videos.json'), encoding='utf-8') as f:
-        videos = json.load(f)
-    with open(os.path.join('data', 'video_to_taxonomy_map.json'), encoding='utf-8') as f:
-        video_to_tax = json.load(f)
+    videos = read_videos(Config.PROCESSED_VIDEOS_PARQUET_PATH)
+    video_to_tax = read_taxonomy_map(Config.TAXONOMY_MAP_PARQUET_PATH)
     return videos, video_to_tax
 
+def load_id_to_ancestors() -> Dict[str, List[str]]:
+    with open(os.path.join('data', 'canonical_taxonomy.json'), encoding='utf-8') as f:
+        canonical_taxonomy = json.load(f)
+    return build_id_to_ancestors_map(add_ids_to_taxonomy(canonical_taxonomy))
+
 # --- Preparar DataFrame unificado ---
-def prepare_dataframe(videos: List[Dict[str, Any]], video_to_tax: Dict[str, List[str]]) -> pd.DataFrame:
-    df = pd.DataFrame(videos)
+def prepare_dataframe(videos: Union[pd.DataFrame, List[Dict[str, Any]]], video_to_tax: Dict[str, List[str]], id_to_ancestors: Dict[str, List[str]] = None) -> pd.DataFrame:
+    df = videos if isinstance(videos, pd.DataFrame) else pd.DataFrame(videos)
     # Corrigir nomes de colunas essenciais se foram renomeadas por duplicidade
     required_cols = ['yt_id', 'title', 'description_llm', 'intention', 'named_entities', 'hierarchical_topics']
     for col in required_cols:
@@ -53,6 +112,8 @@ def prepare_dataframe(videos: List[Dict[str, Any]], video_to_tax: Dict[str, List
             else:
                 raise ValueError(f"Coluna essencial '{col}' não encontrada no DataFrame para indexação.")
     df['taxonomy_ids'] = df['yt_id'].map(video_to_tax).apply(lambda x: x if isinstance(x, list) else [])
+    # Todos os ancestrais de cada nó atribuído: um único match filtra a sub-árvore inteira
+    df['taxonomy_ancestor_ids'] = df['taxonomy_ids'].apply(lambda ids: expand_with_ancestors(ids, id_to_ancestors or {}))
     # Extrair apenas nomes das entidades
     def extract_names(entities):
         if isinstance(entities, list):
@@ -65,13 +126,56 @@ def prepare_dataframe(videos: List[Dict[str, Any]], video_to_tax: Dict[str, List
 async def batch_embeddings_openai(texts: List[str], batch_size: int = 1000) -> List[List[float]]:
     return await get_openai_embeddings(texts)
 
+async def embeddings_with_artifact(yt_ids: List[str], texts: List[str], path: str = None) -> np.ndarray:
+    """
+    Embeddings dos textos, reaproveitando os do artefato (mesmo yt_id, texto e modelo); só os novos ou
+    alterados são enviados à API. O artefato é atualizado com os vetores gerados.
+    """
+    path = path or Config.EMBEDDINGS_PARQUET_PATH
+    hashes = [embedding_text_hash(t) for t in texts]
+    known_rows, known_ids, known_hashes, matrix = {}, [], [], None
+    if os.path.exists(path):
+        try:
+            known_ids, known_hashes, matrix = read_embeddings(path)
+            known_rows = {(yt_id, h): row for row, (yt_id, h) in enumerate(zip(known_ids, known_hashes))}
+        except Exception as e:
+            print(f"[INDEXER] Falha ao ler embeddings salvos, gerando todos. Erro: {e}")
+    missing = [i for i, key in enumerate(zip(yt_ids, hashes)) if key not in known_rows]
+    print(f"[INDEXER] Embeddings reaproveitados: {len(texts) - len(missing)} | a gerar: {len(missing)}")
+    new_vectors = np.asarray(await batch_embeddings_openai([texts[i] for i in missing]), dtype=np.float32) if missing else None
+    dim = new_vectors.shape[1] if new_vectors is not None else matrix.shape[1]
+    embeddings = np.empty((len(texts), dim), dtype=np.float32)
+    for i, key in enumerate(zip(yt_ids, hashes)):
+        if key in known_rows:
+            embeddings[i] = matrix[known_rows[key]]
+    if new_vectors is None:
+        return embeddings
+    embeddings[missing] = new_vectors
+    # Vetores antigos de vídeos fora deste lote são mantidos; os deste lote substituem versões anteriores
+    current = set(yt_ids)
+    keep = [row for row, yt_id in enumerate(known_ids) if yt_id not in current]
+    if matrix is not None and matrix.shape[1] != dim:
+        keep = []  # Modelo com outra dimensão: os vetores antigos não são mais utilizáveis
+    write_embeddings(
+        [known_ids[r] for r in keep] + list(yt_ids),
+        [known_hashes[r] for r in keep] + hashes,
+        np.concatenate([matrix[keep], embeddings]) if keep else embeddings,
+        path
+    )
+    return embeddings
+
 # --- Indexar no Qdrant ---
-async def index_to_qdrant_async(df: pd.DataFrame, client: QdrantClient, collection_name: str):
+async def index_to_qdrant_async(df: pd.DataFrame, client: QdrantClient, collection_name: str, skip_indexed: bool = True):
+    """
+    Indexa os vídeos do DataFrame. Com skip_indexed, vídeos presentes no checkpoint (indexed_ytids.json) são
+    pulados; sem ele todos são reenviados (ex.: a taxonomia mudou), e só os embeddings novos são gerados.
+    """
     # Garante que a coleção exista antes de indexar
     ensure_collection(client, vector_size=1536, collection_name=collection_name)  # 1536 para text-embedding-3-small
+    ensure_payload_indexes(client, collection_name)
     checkpoint_path = os.path.join('data', 'indexed_ytids.json')
     indexed_ytids = set()
-    if os.path.exists(checkpoint_path):
+    if skip_indexed and os.path.exists(checkpoint_path):
         try:
             with open(checkpoint_path, 'r', encoding='utf-8') as f:
                 indexed_ytids = set(json.load(f))
@@ -89,20 +193,27 @@ async def index_to_qdrant_async(df: pd.DataFrame, client: QdrantClient, collecti
     texts = (df_to_index['title'].fillna('') + ' ' + df_to_index['description_llm'].fillna('')).tolist()
     
     print("[INDEXER] Gerando embeddings com OpenAI...")
-    embeddings = await batch_embeddings_openai(texts)
+    embeddings = await embeddings_with_artifact(df_to_index['yt_id'].tolist(), texts)
     print(f"[INDEXER] {len(embeddings)} embeddings gerados.")
 
     assert len(embeddings) == len(df_to_index)
     ids = [uuid_from_ytid(ytid) for ytid in df_to_index['yt_id']]
     payloads = []
     for _, row in df_to_index.iterrows():
+        view_count = int(row['view_count']) if pd.notna(row.get('view_count')) else 0
         payloads.append({
             'yt_id': row['yt_id'],
             'title': row['title'],
             'description_llm': row['description_llm'],
             'intention': row.get('intention', ''),
             'named_entities': row.get('named_entities', []),
-            'taxonomy_ids': row.get('taxonomy_ids', [])
+            'taxonomy_ids': row.get('taxonomy_ids', []),
+            'taxonomy_ancestor_ids': row.get('taxonomy_ancestor_ids', []),
+            'view_count': view_count,
+            'view_sort_key': view_sort_key(row['yt_id'], view_count),
+            # Artefatos gravados antes da coluna duration_seconds ainda trazem a duração do CSV como texto
+            'duration_seconds': parse_duration_seconds(row.get('duration_seconds', row.get('duration'))),
+            'upload_date': parse_upload_date(row.get('upload_date'))
         })
 
     if payloads:
@@ -116,7 +227,7 @@ async def index_to_qdrant_async(df: pd.DataFrame, client: QdrantClient, collecti
         points = [
             qmodels.PointStruct(
                 id=pid,
-                vector=vec,
+                vector=vec.tolist(),
                 payload=pld
             ) for pid, vec, pld in zip(batch_ids, batch_vectors, batch_payloads)
         ]
@@ -133,15 +244,56 @@ async def index_to_qdrant_async(df: pd.DataFrame, client: QdrantClient, collecti
         with open(checkpoint_path, 'w', encoding='utf-8') as f:
             json.dump(list(indexed_ytids), f, indent=2, ensure_ascii=False)
 
+# --- Backfill de taxonomy_ancestor_ids em pontos já indexados ---
+def backfill_taxonomy_ancestors(client: QdrantClient, collection_name: str, id_to_ancestors: Dict[str, List[str]]) -> int:
+    """
+    Percorre a coleção via scroll (apenas o payload taxonomy_ids) e grava taxonomy_ancestor_ids.
+    Pontos com o mesmo conjunto de ancestrais são atualizados numa única chamada set_payload por página.
+    """
+    ensure_payload_indexes(client, collection_name)
+    updated = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=SCROLL_BATCH_SIZE,
+            offset=offset,
+            with_payload=['taxonomy_ids'],
+            with_vectors=False
+        )
+        groups: Dict[tuple, List[Any]] = {}
+        for point in points:
+            taxonomy_ids = (point.payload or {}).get('taxonomy_ids') or []
+            ancestors = tuple(expand_with_ancestors(taxonomy_ids, id_to_ancestors))
+            groups.setdefault(ancestors, []).append(point.id)
+        for ancestors, point_ids in groups.items():
+            client.set_payload(
+                collection_name=collection_name,
+                payload={'taxonomy_ancestor_ids': list(ancestors)},
+                points=point_ids,
+                wait=True
+            )
+            updated += len(point_ids)
+        print(f"[INDEXER] Backfill: {updated} pontos atualizados...")
+        if offset is None:
+            break
+    return updated
+
 if __name__ == '__main__':
-    print('Carregando modelo de embeddings...')
-    model = SentenceTransformer(Config.EMBEDDING_MODEL)
+    parser = argparse.ArgumentParser(description='Indexação de vídeos no Qdrant')
+    parser.add_argument('--backfill-ancestors', action='store_true',
+                        help='Apenas grava taxonomy_ancestor_ids nos pontos já indexados')
+    args = parser.parse_args()
     print('Conectando ao Qdrant...')
     client = QdrantClient(url=Config.QDRANT_URL)
-    ensure_collection(client, vector_size=384, collection_name=Config.QDRANT_COLLECTION_NAME)
-    print('Carregando dados...')
-    videos, video_to_tax = load_data()
-    df = prepare_dataframe(videos, video_to_tax)
-    print(f'{len(df)} vídeos prontos para indexação.')
-    asyncio.run(index_to_qdrant_async(df, client, Config.QDRANT_COLLECTION_NAME))
-    print('Indexação concluída.') 
\ No newline at end of file
+    id_to_ancestors = load_id_to_ancestors()
+    if args.backfill_ancestors:
+        total = backfill_taxonomy_ancestors(client, Config.QDRANT_COLLECTION_NAME, id_to_ancestors)
+        print(f'Backfill concluído. ({total} pontos atualizados)')
+    else:
+        print('Carregando dados...')
+        videos, video_to_tax = load_data()
+        df = prepare_dataframe(videos, video_to_tax, id_to_ancestors)
+        print(f'{len(df)} vídeos prontos para indexação.')
+        asyncio.run(index_to_qdrant_async(df, client, Config.QDRANT_COLLECTION_NAME))
+        print('Indexação concluída.')
@@ -0,0 +1,134 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from config import Config
+
+
+class LlmCache:
+    """
+    Cache persistente (SQLite) de respostas do LLM, chaveado por modelo + hash do prompt + generation config.
+    Permite re-executar o pipeline sem pagar de novo por prompts inalterados. Limitado a max_entries,
+    com remoção das entradas menos recentemente usadas.
+
+    As chamadas vêm do event loop com alta concorrência, então o caminho quente evita I/O: o nº de linhas
+    é mantido em memória e o limite só é verificado a cada evict_every inserções; os hits acumulam o
+    last_access em memória e são gravados em lote (touch_batch hits, antes de uma remoção ou em flush()).
+    """
+    def __init__(self, path: str = None, max_entries: int = None, evict_every: int = None, touch_batch: int = None):
+        self.path = path or Config.LLM_CACHE_PATH
+        self.max_entries = max_entries or Config.LLM_CACHE_MAX_ENTRIES
+        self.evict_every = evict_every or Config.LLM_CACHE_EVICT_EVERY
+        self.touch_batch = touch_batch or Config.LLM_CACHE_TOUCH_BATCH
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response_text TEXT NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                cost_usd REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+        self._conn.commit()
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        self._inserts_since_evict = 0
+        self._touched: Dict[str, float] = {}
+        self.stats = {"hits": 0, "misses": 0, "tokens_saved": 0, "cost_saved": 0.0}
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        config_json = json.dumps(generation_config or {}, sort_keys=True, default=str)
+        return hashlib.sha256(f"{model_name}\n{prompt_hash}\n{config_json}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response_text, input_tokens, output_tokens, cost_usd FROM llm_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touched()
+                self._conn.commit()
+            text, input_tokens, output_tokens, cost = row
+            self.stats["hits"] += 1
+            self.stats["tokens_saved"] += input_tokens + output_tokens
+            self.stats["cost_saved"] += cost
+            return {"text": text, "input_tokens": input_tokens, "output_tokens": output_tokens, "cost_usd": cost}
+
+    def set(self, key: str, model_name: str, text: str, input_tokens: int, output_tokens: int, cost_usd: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model_name, text, input_tokens, output_tokens, cost_usd, now, now)
+            )
+            self._touched.pop(key, None)
+            self._count += 1  # Limite superior: um REPLACE não aumenta a tabela (recontado em _evict)
+            self._inserts_since_evict += 1
+            if self._count > self.max_entries and self._inserts_since_evict >= self.evict_every:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany("UPDATE llm_cache SET last_access = ? WHERE key = ?",
+                                   [(at, key) for key, at in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self):
+        self._flush_touched()  # A ordem LRU precisa dos acessos pendentes
+        self._inserts_since_evict = 0
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        excess = self._count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+            self._count -= excess
+
+    def flush(self):
+        """Grava os last_access pendentes (chamado também na saída do processo)."""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+
+    def report(self) -> str:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        ratio = self.stats["hits"] / lookups if lookups else 0.0
+        return (
+            f"Cache LLM: {self.stats['hits']} hits / {self.stats['misses']} misses ({ratio:.1%}) | "
+            f"Tokens economizados: {self.stats['tokens_saved']} | Custo economizado: ${self.stats['cost_saved']:.8f}"
+        )
+
+
+_cache = None
+
+def get_llm_cache() -> Optional[LlmCache]:
+    """Instância compartilhada entre as etapas do pipeline (None se desabilitado em Config)."""
+    global _cache
+    if not Config.LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = LlmCache()
+        atexit.register(_cache.flush)
+    return _cache
@@ -4,15 +4,29 @@ import logging
 import google.generativeai as genai
 from typing import Dict, Any, List
 from config import Config
+from llm_cache import get_llm_cache
 from tqdm.asyncio import tqdm
 import asyncio
 import time
 import os
 
+BATCH_REQUIRED_KEYS = ('description', 'named_entities', 'intention', 'hierarchical_topics')
+
 class LlmProcessor:
     def __init__(self, api_key: str, model_name: str):
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(model_name)
+        self.model_name = model_name
+        self.cache = get_llm_cache()
+        self.stats = {"calls": 0, "batch_calls": 0, "batched_videos": 0, "retried_videos": 0, "wasted_batch_calls": 0}
+        self.batch_size = 1
+
+    @staticmethod
+    def transcript_for_prompt(video_data: Dict[str, Any]) -> str:
+        condensed = video_data.get('condensed_transcript')
+        if isinstance(condensed, str) and condensed:
+            return condensed
+        return video_data.get('full_transcript', '')[:Config.TRANSCRIPT_MAX_CHARS]
 
     def build_prompt(self, video_data: Dict[str, Any]) -> str:
         prompt_template = f"""
@@ -57,8 +71,70 @@ Video Transcript: "...we begin with choosing the right CPU for gaming and conten
 <video_data>
 Video Title: {video_data.get('title', '')}
 Video Description: {video_data.get('description', '')}
-Video Transcript: {video_data.get('full_transcript', '')[:Config.TRANSCRIPT_MAX_CHARS]}
+Video Transcript: {self.transcript_for_prompt(video_data)}
 </video_data>
+"""
+        return prompt_template
+
+    def build_batch_prompt(self, videos: List[Dict[str, Any]]) -> str:
+        """Prompt com vários vídeos: instruções e exemplo aparecem uma única vez por chamada."""
+        video_blocks = "\n".join(
+            f"""<video yt_id="{v['yt_id']}">
+Video Title: {v.get('title', '')}
+Video Description: {v.get('description', '')}
+Video Transcript: {self.transcript_for_prompt(v)}
+</video>"""
+            for v in videos
+        )
+        prompt_template = f"""
+<instructions>
+You are an expert agent specialized in extracting structured information from video data.
+You will receive {len(videos)} videos, each inside a <video yt_id="..."> tag. Analyze each video independently and return a single, valid JSON array with exactly one object per video.
+
+Each object in the array must contain the following keys:
+- yt_id: The yt_id of the video, copied exactly from its <video> tag.
+- description: A summarized, detailed description of the video content (max 250 tokens).
+- named_entities: An array of objects, each with 'name' and 'type', for all relevant entities (people, organizations, products).
+- intention: The main purpose of the video (e.g., "Tutorial", "Product Review", "Entertainment").
+- hierarchical_topics: An array of strings representing the main hierarchical topics. Generate up to 3 paths. Each path should go from a broad category to a specific subtopic, using ' > ' as a separator.
+
+RULES:
+1.  **Output Format:** You MUST return ONLY a single, valid JSON array. No other text or explanations.
+2.  **Case:** All generated text (categories, topics, etc.) MUST be in lower case, EXCEPT for the 'name' value in 'named_entities' and the 'yt_id'.
+3.  **Topic Abstraction:** Hierarchical topics should be general and reusable categories, not specific events or details from a single video.
+4.  **Consistency:** The paths in 'hierarchical_topics' should be logically consistent with each other.
+5.  **Isolation:** Never mix information between videos.
+</instructions>
+
+<example_input>
+<video yt_id="abc123">
+Video Title: "How to Build a Gaming PC in 2024"
+Video Description: "A full walkthrough of picking parts, assembling, and optimizing performance."
+Video Transcript: "...we begin with choosing the right CPU for gaming and content creation..."
+</video>
+</example_input>
+
+<example_output>
+[
+  {{
+    "yt_id": "abc123",
+    "description": "a comprehensive guide on building a gaming pc in 2024, covering part selection like cpus, assembly process, and performance optimization.",
+    "named_entities": [
+      {{"name": "Intel", "type": "brand"}},
+      {{"name": "Nvidia", "type": "brand"}}
+    ],
+    "intention": "educational tutorial",
+    "hierarchical_topics": [
+      "technology > hardware > pc building",
+      "gaming > equipment > custom builds"
+    ]
+  }}
+]
+</example_output>
+
+<videos>
+{video_blocks}
+</videos>
 """
         return prompt_template
 
@@ -75,8 +151,26 @@ Video Transcript: {video_data.get('full_transcript', '')[:Config.TRANSCRIPT_MAX_
             prompt = self.build_prompt(video_data)
             t0 = time.time()
             try:
+                cache_key = self.cache.make_key(self.model_name, prompt) if self.cache else None
+                cached = self.cache.get(cache_key) if self.cache else None
+                if cached:
+                    # Resposta idêntica já paga em uma execução anterior: sem tokens nem custo nesta execução
+                    parsed_json = self.clean_json_response(cached["text"])
+                    return {
+                        "yt_id": video_data['yt_id'],
+                        **parsed_json,
+                        "input_tokens": 0,
+                        "output_tokens": 0,
+                        "total_tokens": 0,
+                        "llm_cost_usd": 0.0,
+                        "llm_input_cost_usd": 0.0,
+                        "llm_output_cost_usd": 0.0,
+                        "llm_elapsed_sec": 0.0,
+                        "llm_cache_hit": True
+                    }
                 response = await self.model.generate_content_async(prompt)
                 elapsed = time.time() - t0
+                self.stats["calls"] += 1
                 usage = getattr(response, 'usage_metadata', None)
                 input_tokens = getattr(usage, 'prompt_token_count', 0) if usage else 0
                 output_tokens = getattr(usage, 'candidates_token_count', 0) if usage else 0
@@ -87,6 +181,8 @@ Video Transcript: {video_data.get('full_transcript', '')[:Config.TRANSCRIPT_MAX_
                 cost = input_cost + output_cost
                 logging.info(f"yt_id={video_data['yt_id']} | input_tokens={input_tokens} | output_tokens={output_tokens} | total_tokens={total_tokens} | cost=${cost:.8f} | elapsed={elapsed:.2f}s")
                 parsed_json = self.clean_json_response(response.text)
+                if self.cache and 'error' not in parsed_json:
+                    self.cache.set(cache_key, self.model_name, response.text, input_tokens, output_tokens, cost)
                 return {
                     "yt_id": video_data['yt_id'],
                     **parsed_json,
@@ -102,6 +198,133 @@ Video Transcript: {video_data.get('full_transcript', '')[:Config.TRANSCRIPT_MAX_
                 logging.error(f"yt_id={video_data['yt_id']} | error={str(e)}")
                 return {"yt_id": video_data['yt_id'], "error": str(e)}
 
+    def split_batch_response(self, response_text: str, expected_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Valida a resposta em lote e a separa por yt_id. Itens ausentes, duplicados, com yt_id
+        desconhecido ou sem os campos obrigatórios ficam de fora e são reprocessados individualmente.
+        """
+        parsed = self.clean_json_response(response_text)
+        if not isinstance(parsed, list):
+            return {}
+        expected = set(expected_ids)
+        by_id = {}
+        for item in parsed:
+            if not isinstance(item, dict):
+                continue
+            yt_id = str(item.get('yt_id', ''))
+            if yt_id not in expected or yt_id in by_id:
+                continue
+            if any(k not in item for k in BATCH_REQUIRED_KEYS) or not isinstance(item.get('hierarchical_topics'), list):
+                continue
+            by_id[yt_id] = {k: v for k, v in item.items() if k != 'yt_id'}
+        return by_id
+
+    async def process_video_batch(self, rows: List[Dict[str, Any]], semaphore: asyncio.Semaphore) -> List[Dict[str, Any]]:
+        """
+        Extrai vários vídeos em uma única chamada. Tokens e custo são rateados entre os itens válidos;
+        apenas os itens que falharem na validação são refeitos com process_single_video. Se nenhum item
+        for válido, a chamada em lote desperdiçada é rateada entre os vídeos refeitos.
+        """
+        ids = [str(r['yt_id']) for r in rows]
+        by_id = {}
+        input_tokens = output_tokens = 0
+        cost = elapsed = 0.0
+        cache_hit = False
+        async with semaphore:
+            prompt = self.build_batch_prompt(rows)
+            t0 = time.time()
+            try:
+                cache_key = self.cache.make_key(self.model_name, prompt) if self.cache else None
+                cached = self.cache.get(cache_key) if self.cache else None
+                if cached:
+                    by_id = self.split_batch_response(cached["text"], ids)
+                    cache_hit = True
+                else:
+                    response = await self.model.generate_content_async(prompt)
+                    elapsed = time.time() - t0
+                    self.stats["calls"] += 1
+                    self.stats["batch_calls"] += 1
+                    usage = getattr(response, 'usage_metadata', None)
+                    input_tokens = getattr(usage, 'prompt_token_count', 0) if usage else 0
+                    output_tokens = getattr(usage, 'candidates_token_count', 0) if usage else 0
+                    cost = (input_tokens / 1_000_000) * Config.LLM_VIDEO_INPUT_COST_PER_M + (output_tokens / 1_000_000) * Config.LLM_VIDEO_OUTPUT_COST_PER_M
+                    by_id = self.split_batch_response(response.text, ids)
+                    logging.info(f"batch={len(rows)} | ok={len(by_id)} | input_tokens={input_tokens} | output_tokens={output_tokens} | cost=${cost:.8f} | elapsed={elapsed:.2f}s")
+                    if self.cache and by_id:
+                        self.cache.set(cache_key, self.model_name, response.text, input_tokens, output_tokens, cost)
+            except Exception as e:
+                logging.error(f"batch={ids} | error={str(e)}")
+                by_id = {}
+        results = []
+        n_ok = max(len(by_id), 1)
+        for row, yt_id in zip(rows, ids):
+            if yt_id not in by_id:
+                continue
+            item_input = input_tokens / n_ok
+            item_output = output_tokens / n_ok
+            item_input_cost = (item_input / 1_000_000) * Config.LLM_VIDEO_INPUT_COST_PER_M
+            item_output_cost = (item_output / 1_000_000) * Config.LLM_VIDEO_OUTPUT_COST_PER_M
+            results.append({
+                "yt_id": row['yt_id'],
+                **by_id[yt_id],
+                "input_tokens": round(item_input),
+                "output_tokens": round(item_output),
+                "total_tokens": round(item_input + item_output),
+                "llm_cost_usd": float(f"{item_input_cost + item_output_cost:.8f}"),
+                "llm_input_cost_usd": float(f"{item_input_cost:.8f}"),
+                "llm_output_cost_usd": float(f"{item_output_cost:.8f}"),
+                "llm_elapsed_sec": elapsed / n_ok,
+                "llm_batch_size": len(rows),
+                **({"llm_cache_hit": True} if cache_hit else {})
+            })
+        self.stats["batched_videos"] += len(results)
+        failed = [row for row, yt_id in zip(rows, ids) if yt_id not in by_id]
+        if failed:
+            self.stats["retried_videos"] += len(failed)
+            retries = await asyncio.gather(*(self.process_single_video(row, semaphore) for row in failed))
+            if not by_id and (input_tokens or output_tokens):
+                self.stats["wasted_batch_calls"] += 1
+                for retry in retries:
+                    self.add_batch_overhead(retry, input_tokens / len(retries), output_tokens / len(retries), elapsed / len(retries))
+            results.extend(retries)
+        return results
+
+    @staticmethod
+    def add_batch_overhead(result: Dict[str, Any], input_tokens: float, output_tokens: float, elapsed: float):
+        """Soma ao resultado de um vídeo refeito a sua parte de uma chamada em lote sem nenhum item válido."""
+        input_cost = (input_tokens / 1_000_000) * Config.LLM_VIDEO_INPUT_COST_PER_M
+        output_cost = (output_tokens / 1_000_000) * Config.LLM_VIDEO_OUTPUT_COST_PER_M
+        result["input_tokens"] = result.get("input_tokens", 0) + round(input_tokens)
+        result["output_tokens"] = result.get("output_tokens", 0) + round(output_tokens)
+        result["total_tokens"] = result.get("total_tokens", 0) + round(input_tokens + output_tokens)
+        result["llm_cost_usd"] = float(f"{result.get('llm_cost_usd', 0.0) + input_cost + output_cost:.8f}")
+        result["llm_input_cost_usd"] = float(f"{result.get('llm_input_cost_usd', 0.0) + input_cost:.8f}")
+        result["llm_output_cost_usd"] = float(f"{result.get('llm_output_cost_usd', 0.0) + output_cost:.8f}")
+        result["llm_elapsed_sec"] = result.get("llm_elapsed_sec", 0.0) + elapsed
+        result["llm_batch_overhead_usd"] = float(f"{input_cost + output_cost:.8f}")
+
+    def throughput_report(self, results: List[Dict[str, Any]], elapsed: float) -> str:
+        """Custo efetivo e vazão da etapa, com a economia estimada em relação ao modo de um vídeo por chamada."""
+        n = len(results)
+        cost = sum(r.get('llm_cost_usd', 0) for r in results if isinstance(r, dict))
+        mode = f"lote de {self.batch_size}" if self.batch_size > 1 else "um vídeo por chamada"
+        report = (
+            f"[LLM] Modo: {mode} | Chamadas ao modelo: {self.stats['calls']} | "
+            f"Vazão: {n / elapsed if elapsed else 0.0:.2f} vídeos/s | "
+            f"Custo efetivo: ${cost / n if n else 0.0:.8f}/vídeo"
+        )
+        if self.batch_size > 1:
+            # Cada vídeo agrupado deixa de pagar o bloco de instruções + exemplo (~4 caracteres por token)
+            shared_tokens = len(self.build_prompt({})) / 4
+            saved_tokens = max(self.stats["batched_videos"] - self.stats["batch_calls"], 0) * shared_tokens
+            saved_cost = (saved_tokens / 1_000_000) * Config.LLM_VIDEO_INPUT_COST_PER_M
+            report += (
+                f"\n[LLM] Vídeos em lote: {self.stats['batched_videos']} | Refeitos individualmente: {self.stats['retried_videos']} | "
+                f"Lotes sem item válido (custo somado aos refeitos): {self.stats['wasted_batch_calls']} | "
+                f"Economia estimada vs. modo individual: ~{saved_tokens:.0f} tokens de entrada (${saved_cost:.8f})"
+            )
+        return report
+
     async def process_batch(self, df, concurrency_limit: int) -> List[Dict[str, Any]]:
         print(f"\n[LLM] Iniciando processamento batch com sample_size={len(df)}, modelo={self.model.model_name}, concurrency={concurrency_limit}")
         t_batch = time.time()
@@ -152,13 +375,15 @@ Video Transcript: {video_data.get('full_transcript', '')[:Config.TRANSCRIPT_MAX_
             print(f"[LLM] Batch concluído em {time.time()-t_batch:.2f}s | Total tokens: {total_tokens} | Custo estimado: ${total_cost:.8f}")
             return results
 
-    async def process_batch_stream(self, df, concurrency_limit: int):
+    async def process_batch_stream(self, df, concurrency_limit: int, batch_size: int = 1):
         """
         Processa vídeos um a um, yieldando cada resultado assim que estiver pronto.
+        Com batch_size > 1, agrupa vários vídeos por chamada (ver process_video_batch).
         Permite controle de erros consecutivos e interrupção imediata.
         """
-        print(f"\n[LLM] Iniciando processamento batch (stream) com sample_size={len(df)}, modelo={self.model.model_name}, concurrency={concurrency_limit}")
+        print(f"\n[LLM] Iniciando processamento batch (stream) com sample_size={len(df)}, modelo={self.model.model_name}, concurrency={concurrency_limit}, batch_size={batch_size}")
         semaphore = asyncio.Semaphore(concurrency_limit)
+        self.batch_size = batch_size
         processed_path = os.path.join('data', 'processed_videos.json')
         processed = []
         processed_ids = set()
@@ -174,21 +399,41 @@ Video Transcript: {video_data.get('full_transcript', '')[:Config.TRANSCRIPT_MAX_
                 processed_ids = set()
         to_process = df[~df['yt_id'].isin(processed_ids)]
         results = []
-        for idx, (_, row) in enumerate(to_process.iterrows(), 1):
+        try:
+            if batch_size > 1:
+                # Modo em lote: vários vídeos por prompt, lotes concorrentes limitados pelo semáforo
+                rows = [row for _, row in to_process.iterrows()]
+                tasks = [
+                    asyncio.ensure_future(self.process_video_batch(rows[i:i + batch_size], semaphore))
+                    for i in range(0, len(rows), batch_size)
+                ]
+                try:
+                    for future in asyncio.as_completed(tasks):
+                        for res in await future:
+                            results.append(res)
+                            if len(results) % 10 == 0:
+                                print(f"[LLM] {len(results)} vídeos processados neste lote...")
+                            yield res
+                finally:
+                    for task in tasks:
+                        task.cancel()
+            else:
+                for idx, (_, row) in enumerate(to_process.iterrows(), 1):
+                    try:
+                        res = await self.process_single_video(row, semaphore)
+                        results.append(res)
+                        if idx % 10 == 0:
+                            print(f"[LLM] {idx} vídeos processados neste lote...")
+                        yield res
+                    except Exception as e:
+                        err = {"yt_id": row.get('yt_id', None), "error": str(e)}
+                        results.append(err)
+                        yield err
+        finally:
+            # Salvo também quando o consumidor interrompe o stream (aclose), para a retomada pular o que já foi feito
+            all_results = processed + results
             try:
-                res = await self.process_single_video(row, semaphore)
-                results.append(res)
-                if idx % 10 == 0:
-                    print(f"[LLM] {idx} vídeos processados neste lote...")
-                yield res
+                with open(processed_path, 'w', encoding='utf-8') as f:
+                    json.dump(all_results, f, indent=2, ensure_ascii=False)
             except Exception as e:
-                err = {"yt_id": row.get('yt_id', None), "error": str(e)}
-                results.append(err)
-                yield err
-        # Salvar apenas ao final do lote
-        all_results = processed + results
-        try:
-            with open(processed_path, 'w', encoding='utf-8') as f:
-                json.dump(all_results, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"[LLM] Falha ao salvar checkpoint final: {e}") 
\ No newline at end of file
+                print(f"[LLM] Falha ao salvar checkpoint final: {e}") 
\ No newline at end of file
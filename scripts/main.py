@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 from dotenv import load_dotenv
 import logging
@@ -5,32 +6,38 @@ from config import Config
 from data_handler import DataHandler
 from llm_processor import LlmProcessor
 from result_handler import ResultHandler
-from taxonomy_draft_builder import build_draft_taxonomy
-from taxonomy_refiner import build_canonical_taxonomy
-from taxonomy_builder import run_taxonomy_builder
-from taxonomy_mapper import add_ids_to_taxonomy, build_path_to_id_map, map_videos_to_taxonomy
+from taxonomy_draft_builder import build_draft_taxonomy, DRAFT_TAXONOMY_PATH, DRAFT_COUNTS_PATH
+from taxonomy_refiner import build_canonical_taxonomy_async, CANONICAL_TAXONOMY_PATH
+from taxonomy_builder import run_taxonomy_builder, MASTER_TAXONOMY_PATH
+from llm_cache import get_llm_cache
+from transcript_condenser import condense_dataframe
+from artifacts import write_videos, read_videos, read_video_records, read_taxonomy_map
+from pipeline_runner import PipelineAborted, PipelineRunner, Stage
+from taxonomy_mapper import add_ids_to_taxonomy, build_path_to_id_map, build_id_to_ancestors_map, map_videos_to_taxonomy, compute_node_counts, annotate_taxonomy_with_counts
 import time
 import json
 import requests
 import os
+import sys
 
 # NOVO: Limite de erros consecutivos permitidos
 MAX_CONSECUTIVE_ERRORS = 5
+TAXONOMY_UPLOAD_URL = "http://147.79.111.195:8000/taxonomy/upload"
 
-async def main():
-    load_dotenv()
-    logging.basicConfig(level=logging.INFO)
 
-    print("\n=== ViewStats Pipeline ===")
-    print(f"Sample size: {Config.SAMPLE_SIZE}")
-    print(f"LLM model (video extraction): {Config.LLM_MODEL_VIDEO}")
-    print(f"LLM model (taxonomy): {Config.LLM_MODEL_TAXONOMY}")
-    print(f"Concurrency limit: {Config.CONCURRENCY_LIMIT}")
-    print(f"Input CSV: {Config.INPUT_CSV_PATH}")
-    print(f"Output JSON: {Config.OUTPUT_JSON_PATH}")
-    print("========================\n")
+def load_canonical_taxonomy():
+    with open(CANONICAL_TAXONOMY_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def remove_checkpoint(path: str):
+    """Checkpoints só valem para retomar a mesma execução; com entradas novas a etapa recomeça do zero."""
+    if os.path.exists(path):
+        os.remove(path)
+        print(f"[PIPELINE] Checkpoint anterior descartado: {path}")
+
 
-    t0 = time.time()
+# --- Etapas ---
+async def stage_extract(ctx):
     print("1. Loading and preparing data...")
     t_load = time.time()
     raw_df = DataHandler.load_data(Config.INPUT_CSV_PATH, Config.SAMPLE_SIZE)
@@ -38,8 +45,10 @@ async def main():
     print(f"Loaded {len(raw_df)} videos, prepared {len(prepared_df)} valid videos for processing. [Tempo: {time.time()-t_load:.2f}s]")
 
     if prepared_df.empty:
-        print("No valid videos to process after cleaning. Exiting.")
-        return
+        raise PipelineAborted("No valid videos to process after cleaning.")
+    prepared_df = condense_dataframe(prepared_df)
+    if not ctx.resume:
+        remove_checkpoint(Config.OUTPUT_JSON_PATH)
 
     print(f"2. Starting LLM processing for {len(prepared_df)} videos...")
     t_llm = time.time()
@@ -48,104 +57,159 @@ async def main():
     # NOVO: Controle de erros consecutivos
     consecutive_errors = 0
     llm_results = []
+    stream = processor.process_batch_stream(prepared_df, Config.CONCURRENCY_LIMIT, Config.LLM_BATCH_SIZE)
     try:
-        async for result in processor.process_batch_stream(prepared_df, Config.CONCURRENCY_LIMIT):
+        async for result in stream:
             llm_results.append(result)
             if isinstance(result, dict) and 'error' in result:
                 consecutive_errors += 1
                 print(f"[ERROR] Consecutive errors: {consecutive_errors} (yt_id={result.get('yt_id')}, error={result.get('error')})")
                 if consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
-                    print(f"[FATAL] Exceeded maximum consecutive errors ({MAX_CONSECUTIVE_ERRORS}). Aborting pipeline.")
-                    # Salvar progresso parcial
-                    ResultHandler.save_results(prepared_df, Config.OUTPUT_JSON_PATH)
-                    return
+                    raise PipelineAborted(f"Exceeded maximum consecutive errors ({MAX_CONSECUTIVE_ERRORS}). Aborting pipeline.")
             else:
                 consecutive_errors = 0
-    except KeyboardInterrupt:
-        print("\n[Pipeline] Interrompido pelo usuário (Ctrl+C). Salvando progresso parcial e finalizando com segurança...")
-        ResultHandler.save_results(prepared_df, Config.OUTPUT_JSON_PATH)
-        return
-    except Exception as e:
-        print(f"[FATAL] Erro inesperado: {e}. Salvando progresso parcial e abortando.")
-        ResultHandler.save_results(prepared_df, Config.OUTPUT_JSON_PATH)
-        return
+    finally:
+        # Fecha o stream: o checkpoint da extração é salvo com o progresso parcial
+        await stream.aclose()
     print(f"LLM processing completed. [Tempo: {time.time()-t_llm:.2f}s]")
+    print(processor.throughput_report(llm_results, time.time()-t_llm))
 
-    total_tokens_llm = sum(r.get('total_tokens', 0) for r in llm_results if isinstance(r, dict))
-    total_cost_llm = sum(r.get('llm_cost_usd', 0) for r in llm_results if isinstance(r, dict))
+    ctx.shared['total_tokens_llm'] = sum(r.get('total_tokens', 0) for r in llm_results if isinstance(r, dict))
+    ctx.shared['total_cost_llm'] = sum(r.get('llm_cost_usd', 0) for r in llm_results if isinstance(r, dict))
 
     print("3. Merging results and saving output...")
     t_merge = time.time()
     final_df = ResultHandler.process_results(prepared_df, llm_results)
-    ResultHandler.save_results(final_df, Config.OUTPUT_JSON_PATH)
+    write_videos(final_df, Config.PROCESSED_VIDEOS_PARQUET_PATH)
     print(f"Results merged and saved. [Tempo: {time.time()-t_merge:.2f}s]")
+    return len(prepared_df)
 
+def stage_draft(ctx):
     print("4. Building draft taxonomy from processed videos...")
-    t_draft = time.time()
-    build_draft_taxonomy()
-    print(f"Draft taxonomy built. [Tempo: {time.time()-t_draft:.2f}s]")
+    return build_draft_taxonomy(Config.PROCESSED_VIDEOS_PARQUET_PATH)
 
+async def stage_refine(ctx):
     print("5. Refining taxonomy with LLM (two-pass)...")
-    t_refine = time.time()
-    stats = build_canonical_taxonomy(return_stats=True)
-    total_tokens_refine = stats.get('total_tokens', 0)
-    total_cost_refine = stats.get('total_cost', 0)
-    total_time_refine = stats.get('total_time', 0)
-    print(f"Taxonomy refined. [Tempo: {time.time()-t_refine:.2f}s]")
-
+    if not ctx.resume:
+        remove_checkpoint(CANONICAL_TAXONOMY_PATH)
+    stats = await build_canonical_taxonomy_async(return_stats=True)
+    ctx.shared['total_tokens_refine'] = stats.get('total_tokens', 0)
+    ctx.shared['total_cost_refine'] = stats.get('total_cost', 0)
+    ctx.shared['total_time_refine'] = stats.get('total_time', 0)
+
+def stage_master(ctx):
     print("6. Saving master taxonomy for compatibility...")
-    t_master = time.time()
     run_taxonomy_builder()
-    print(f"Master taxonomy saved. [Tempo: {time.time()-t_master:.2f}s]")
 
+def stage_map(ctx):
     print("7. Mapping videos to canonical taxonomy (no LLM)...")
-    t_map = time.time()
-    CANONICAL_TAXONOMY_PATH = 'data/canonical_taxonomy.json'
-    PROCESSED_VIDEOS_PATH = 'data/processed_videos.json'
-    OUTPUT_MAP_PATH = 'data/video_to_taxonomy_map.json'
-    with open(CANONICAL_TAXONOMY_PATH, 'r', encoding='utf-8') as f:
-        canonical_taxonomy = json.load(f)
-    taxonomy_with_ids = add_ids_to_taxonomy(canonical_taxonomy)
-    path_to_id = build_path_to_id_map(taxonomy_with_ids)
-    with open(PROCESSED_VIDEOS_PATH, 'r', encoding='utf-8') as f:
-        processed_videos = json.load(f)
-    video_to_taxonomy_map = map_videos_to_taxonomy(processed_videos, path_to_id)
-    with open(OUTPUT_MAP_PATH, 'w', encoding='utf-8') as f:
-        json.dump(video_to_taxonomy_map, f, indent=2, ensure_ascii=False)
-    print(f"Video-to-taxonomy mapping saved. [Tempo: {time.time()-t_map:.2f}s] ({len(video_to_taxonomy_map)} vídeos mapeados)")
-
+    if not ctx.resume:
+        remove_checkpoint(Config.TAXONOMY_MAP_PARQUET_PATH)
+    path_to_id = build_path_to_id_map(add_ids_to_taxonomy(load_canonical_taxonomy()))
+    # Só as colunas usadas no mapeamento; o restante do artefato não é lido
+    topics_by_video = read_video_records(Config.PROCESSED_VIDEOS_PARQUET_PATH, columns=['yt_id', 'hierarchical_topics'])
+    video_to_taxonomy_map = map_videos_to_taxonomy(topics_by_video, path_to_id, Config.TAXONOMY_MAP_PARQUET_PATH)
+    print(f"Video-to-taxonomy mapping saved. ({len(video_to_taxonomy_map)} vídeos mapeados)")
+    return len(topics_by_video)
+
+def stage_counts(ctx):
+    # Taxonomia servida pela API: canônica + contagem de vídeos por nó (inclusiva da sub-árvore)
+    canonical_taxonomy = load_canonical_taxonomy()
+    id_to_ancestors = build_id_to_ancestors_map(add_ids_to_taxonomy(canonical_taxonomy))
+    video_to_taxonomy_map = read_taxonomy_map(Config.TAXONOMY_MAP_PARQUET_PATH)
+    node_counts = compute_node_counts(video_to_taxonomy_map, id_to_ancestors)
+    with open(Config.SERVED_TAXONOMY_PATH, 'w', encoding='utf-8') as f:
+        json.dump(annotate_taxonomy_with_counts(canonical_taxonomy, node_counts), f, ensure_ascii=False)
+    print(f"Taxonomia com contagens salva em {Config.SERVED_TAXONOMY_PATH} ({len(node_counts)} nós com vídeos)")
+    return len(video_to_taxonomy_map)
+
+async def stage_index(ctx):
     print("8. Indexando vídeos no Qdrant...")
-    t_index = time.time()
     from indexer import prepare_dataframe, index_to_qdrant_async
     from qdrant_client import QdrantClient
     print(f"Usando embeddings OpenAI: {Config.EMBEDDING_MODEL_OPENAI}")
     client = QdrantClient(url=Config.QDRANT_URL)
-    import pandas as pd
-    df = prepare_dataframe(processed_videos, video_to_taxonomy_map)
-    await index_to_qdrant_async(df, client, Config.QDRANT_COLLECTION_NAME)
-    print(f"Indexação Qdrant concluída. [Tempo: {time.time()-t_index:.2f}s] ({len(df)} vídeos indexados)")
-
+    id_to_ancestors = build_id_to_ancestors_map(add_ids_to_taxonomy(load_canonical_taxonomy()))
+    video_to_taxonomy_map = read_taxonomy_map(Config.TAXONOMY_MAP_PARQUET_PATH)
+    df = prepare_dataframe(read_videos(Config.PROCESSED_VIDEOS_PARQUET_PATH), video_to_taxonomy_map, id_to_ancestors)
+    # Só uma retomada pode pular vídeos já enviados; com entradas novas todos os payloads são atualizados
+    await index_to_qdrant_async(df, client, Config.QDRANT_COLLECTION_NAME, skip_indexed=ctx.resume)
+    return len(df)
+
+def stage_upload(ctx):
     # Enviar taxonomia final para o endpoint externo
-    API_URL = "http://147.79.111.195:8000/taxonomy/upload"
-    API_KEY = os.getenv("INTERNAL_API_KEY")
-    taxonomy_path = 'data/canonical_taxonomy.json'
-    if API_KEY:
-        print("Enviando taxonomia final para o endpoint externo...")
-        try:
-            with open(taxonomy_path, 'rb') as f:
-                files = {'taxonomy_file': f}
-                headers = {'X-Internal-API-Key': API_KEY}
-                response = requests.post(API_URL, files=files, headers=headers)
-            if response.status_code == 200:
-                print("Upload da taxonomia concluído com sucesso!")
-            else:
-                print(f"Falha no upload da taxonomia. Status: {response.status_code}. Resposta: {response.text}")
-        except Exception as e:
-            print(f"Erro ao enviar taxonomia: {e}")
-    else:
+    api_key = os.getenv("INTERNAL_API_KEY")
+    if not api_key:
         print("INTERNAL_API_KEY não definida. Pulei o upload da taxonomia.")
+        return
+    print("Enviando taxonomia final para o endpoint externo...")
+    with open(Config.SERVED_TAXONOMY_PATH, 'rb') as f:
+        files = {'taxonomy_file': f}
+        headers = {'X-Internal-API-Key': api_key}
+        response = requests.post(TAXONOMY_UPLOAD_URL, files=files, headers=headers)
+    if response.status_code != 200:
+        raise PipelineAborted(f"Falha no upload da taxonomia. Status: {response.status_code}. Resposta: {response.text}")
+    print("Upload da taxonomia concluído com sucesso!")
+
+def build_stages():
+    parquet = Config.PROCESSED_VIDEOS_PARQUET_PATH
+    video_map = Config.TAXONOMY_MAP_PARQUET_PATH
+    return [
+        Stage('extract', stage_extract, inputs=[Config.INPUT_CSV_PATH], outputs=[parquet], params={
+            'sample_size': Config.SAMPLE_SIZE, 'transcript_min_length': Config.TRANSCRIPT_MIN_LENGTH,
+            'transcript_token_budget': Config.TRANSCRIPT_TOKEN_BUDGET, 'model': Config.LLM_MODEL_VIDEO,
+            'batch_size': Config.LLM_BATCH_SIZE
+        }),
+        Stage('draft', stage_draft, inputs=[parquet], outputs=[DRAFT_TAXONOMY_PATH, DRAFT_COUNTS_PATH],
+              params={'min_count': Config.DRAFT_MIN_NODE_COUNT}),
+        Stage('refine', stage_refine, inputs=[DRAFT_TAXONOMY_PATH], outputs=[CANONICAL_TAXONOMY_PATH],
+              params={'model': Config.LLM_MODEL_TAXONOMY, 'chunk_max_chars': Config.TAXONOMY_CHUNK_MAX_CHARS}),
+        Stage('master', stage_master, inputs=[CANONICAL_TAXONOMY_PATH], outputs=[MASTER_TAXONOMY_PATH]),
+        Stage('map', stage_map, inputs=[CANONICAL_TAXONOMY_PATH, parquet], outputs=[video_map]),
+        Stage('counts', stage_counts, inputs=[CANONICAL_TAXONOMY_PATH, video_map], outputs=[Config.SERVED_TAXONOMY_PATH]),
+        Stage('index', stage_index, inputs=[CANONICAL_TAXONOMY_PATH, parquet, video_map], params={
+            'qdrant_url': Config.QDRANT_URL, 'collection': Config.QDRANT_COLLECTION_NAME,
+            'embedding_model': Config.EMBEDDING_MODEL_OPENAI
+        }),
+        Stage('upload', stage_upload, inputs=[Config.SERVED_TAXONOMY_PATH],
+              params={'url': TAXONOMY_UPLOAD_URL, 'enabled': bool(os.getenv("INTERNAL_API_KEY"))}),
+    ]
+
+async def main(argv=None):
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    stages = build_stages()
+    parser = argparse.ArgumentParser(description='ViewStats Pipeline')
+    parser.add_argument('--only', help=f"Etapas separadas por vírgula ({','.join(s.name for s in stages)}); sempre executadas")
+    parser.add_argument('--from', dest='start', help='Executa a etapa e todas as que dependem dela')
+    parser.add_argument('--force', action='store_true', help='Ignora o cache e executa todas as etapas selecionadas')
+    parser.add_argument('--jobs', type=int, default=Config.PIPELINE_MAX_PARALLEL_STAGES, help='Etapas independentes em paralelo')
+    args = parser.parse_args(argv)
+
+    print("\n=== ViewStats Pipeline ===")
+    print(f"Sample size: {Config.SAMPLE_SIZE}")
+    print(f"LLM model (video extraction): {Config.LLM_MODEL_VIDEO}")
+    print(f"LLM model (taxonomy): {Config.LLM_MODEL_TAXONOMY}")
+    print(f"Concurrency limit: {Config.CONCURRENCY_LIMIT}")
+    print(f"LLM batch size: {Config.LLM_BATCH_SIZE}")
+    print(f"Input CSV: {Config.INPUT_CSV_PATH}")
+    print(f"Output: {Config.PROCESSED_VIDEOS_PARQUET_PATH}")
+    print("========================\n")
 
-    print(f"\nPipeline completed in {time.time()-t0:.2f} seconds.")
+    runner = PipelineRunner(stages, max_parallel=args.jobs)
+    only = [s.strip() for s in args.only.split(',') if s.strip()] if args.only else None
+    shared = {}
+    try:
+        report = await runner.run(only=only, start=args.start, force=args.force, shared=shared)
+    except ValueError as e:
+        parser.error(str(e))
+
+    total_tokens_llm = shared.get('total_tokens_llm', 0)
+    total_cost_llm = shared.get('total_cost_llm', 0)
+    total_tokens_refine = shared.get('total_tokens_refine', 0)
+    total_cost_refine = shared.get('total_cost_refine', 0)
+    print(f"\nPipeline completed in {report['wall_time_sec']:.2f} seconds.")
+    print(PipelineRunner.format_report(report))
     print("\n=== RELATÓRIO FINAL ===")
     print(f"Tokens LLM processamento vídeos: {total_tokens_llm}")
     print(f"Tokens LLM refinamento taxonomia: {total_tokens_refine}")
@@ -153,8 +217,16 @@ async def main():
     print(f"Custo LLM processamento vídeos: ${total_cost_llm:.8f}")
     print(f"Custo LLM refinamento taxonomia: ${total_cost_refine:.8f}")
     print(f"Custo total LLM: ${total_cost_llm + total_cost_refine:.8f}")
-    print(f"Tempo total refinamento taxonomia: {total_time_refine:.2f}s")
+    print(f"Tempo total refinamento taxonomia: {shared.get('total_time_refine', 0):.2f}s")
+    llm_cache = get_llm_cache()
+    if llm_cache:
+        print(llm_cache.report())
     print("=======================\n")
+    failed = PipelineRunner.failed_stages(report)
+    if failed:
+        print(f"[PIPELINE] Etapas com falha: {', '.join(failed)}")
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    sys.exit(asyncio.run(main()))
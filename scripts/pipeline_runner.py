@@ -0,0 +1,321 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from config import Config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+HASH_CHUNK_SIZE = 1 << 20
+RSS_SAMPLE_INTERVAL = 0.2
+
+# Executor de etapas do pipeline: cada etapa declara arquivos de entrada/saída e parâmetros de Config.
+# A impressão digital (hash do conteúdo das entradas + parâmetros) decide se a etapa pode ser pulada;
+# etapas sem dependência entre si rodam em paralelo.
+
+
+def process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool para o trabalho paralelo das etapas. Usa "spawn": as etapas rodam em threads do executor, e
+    um fork feito com outras threads ativas pode copiar locks presos por elas e travar o processo filho.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+class PipelineAborted(Exception):
+    """Erro que interrompe a etapa (e as que dependem dela) sem stack trace no relatório."""
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable, inputs: List[str] = (), outputs: List[str] = (), params: Dict[str, Any] = None):
+        """
+        func(ctx) pode ser síncrona ou async e retorna o número de itens processados (ou None).
+        params entra na impressão digital: mudar um valor faz a etapa rodar de novo.
+        """
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+
+
+class StageContext:
+    def __init__(self, stage: Stage, resume: bool, shared: Dict[str, Any]):
+        self.stage = stage
+        # True quando a última execução com a mesma impressão digital não terminou:
+        # checkpoints da etapa podem ser reaproveitados; caso contrário ela deve começar do zero
+        self.resume = resume
+        self.shared = shared
+
+
+def _max_rss(who) -> int:
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _current_rss() -> Optional[int]:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        return _max_rss(resource.RUSAGE_SELF)  # Sem /proc: pico do processo
+    return None
+
+
+class _RssSampler:
+    """Amostra o RSS do processo e guarda o pico observado enquanto cada etapa roda."""
+    def __init__(self):
+        self.peaks: Dict[str, int] = {}
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def enter(self, name: str):
+        with self._lock:
+            self._running.add(name)
+        self._sample()
+
+    def leave(self, name: str):
+        self._sample()
+        with self._lock:
+            self._running.discard(name)
+
+    def _sample(self):
+        rss = _current_rss()
+        if rss is None:
+            return
+        with self._lock:
+            for name in self._running:
+                self.peaks[name] = max(self.peaks.get(name, 0), rss)
+
+    def _loop(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            self._sample()
+
+
+class PipelineRunner:
+    def __init__(self, stages: List[Stage], state_path: str = None, reports_dir: str = None, max_parallel: int = None):
+        self.stages = {s.name: s for s in stages}
+        self.order = [s.name for s in stages]
+        self.state_path = state_path or Config.PIPELINE_STATE_PATH
+        self.reports_dir = reports_dir or Config.PIPELINE_REPORTS_DIR
+        self.max_parallel = max_parallel or Config.PIPELINE_MAX_PARALLEL_STAGES
+        producers = {path: s.name for s in stages for path in s.outputs}
+        self.deps = {s.name: sorted({producers[p] for p in s.inputs if p in producers} - {s.name}) for s in stages}
+        self.state = self._load_state()
+        self._state_lock = threading.Lock()
+
+    # --- Estado persistente (impressões digitais e hashes de arquivos) ---
+    def _load_state(self) -> Dict[str, Any]:
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                state.setdefault('stages', {})
+                state.setdefault('files', {})
+                return state
+            except Exception as e:
+                print(f"[PIPELINE] Falha ao ler estado, todas as etapas vão rodar. Erro: {e}")
+        return {'stages': {}, 'files': {}}
+
+    def _save_state(self):
+        with self._state_lock:
+            os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_path)
+
+    def file_hash(self, path: str) -> Optional[str]:
+        """sha256 do conteúdo; reaproveitado enquanto tamanho e mtime não mudarem."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._state_lock:
+            cached = self.state['files'].get(path)
+        if cached and cached['size'] == st.st_size and cached['mtime_ns'] == st.st_mtime_ns:
+            return cached['sha256']
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        with self._state_lock:
+            self.state['files'][path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def fingerprint(self, stage: Stage) -> str:
+        payload = {
+            'stage': stage.name,
+            'params': stage.params,
+            'inputs': {path: self.file_hash(path) for path in stage.inputs},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _is_cached(self, stage: Stage, fingerprint: str) -> bool:
+        previous = self.state['stages'].get(stage.name)
+        if not previous or previous.get('status') != 'done' or previous.get('fingerprint') != fingerprint:
+            return False
+        # Saídas apagadas ou alteradas fora do pipeline invalidam o cache
+        return all(self.file_hash(path) == digest for path, digest in previous.get('outputs', {}).items())
+
+    # --- Seleção de etapas ---
+    def downstream(self, name: str) -> List[str]:
+        selected = {name}
+        for stage_name in self.order:
+            if any(dep in selected for dep in self.deps[stage_name]):
+                selected.add(stage_name)
+        return [n for n in self.order if n in selected]
+
+    def select(self, only: List[str] = None, start: str = None) -> List[str]:
+        for name in (only or []) + ([start] if start else []):
+            if name not in self.stages:
+                raise ValueError(f"Etapa desconhecida: {name} (disponíveis: {', '.join(self.order)})")
+        if only:
+            return [n for n in self.order if n in only]
+        if start:
+            return self.downstream(start)
+        return list(self.order)
+
+    # --- Execução ---
+    async def run(self, only: List[str] = None, start: str = None, force: bool = False, shared: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Roda as etapas selecionadas respeitando as dependências. --only/--from forçam as etapas escolhidas;
+        sem seleção, etapas com a mesma impressão digital da última execução bem-sucedida são puladas.
+        """
+        selected = self.select(only, start)
+        forced = set(selected) if (force or only or start) else set()
+        shared = shared if shared is not None else {}
+        records = {name: {'stage': name, 'status': 'not_selected'} for name in self.order}
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        sampler = _RssSampler()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str):
+            stage = self.stages[name]
+            record = records[name]
+            dep_tasks = [tasks[d] for d in self.deps[name] if d in tasks]
+            if dep_tasks:
+                await asyncio.gather(*dep_tasks)
+            failed_deps = [d for d in self.deps[name] if records[d]['status'] in ('failed', 'blocked')]
+            if failed_deps:
+                record['status'] = 'blocked'
+                record['error'] = f"Dependências falharam: {', '.join(failed_deps)}"
+                return
+            missing = [p for p in stage.inputs if not os.path.exists(p)]
+            if missing:
+                record['status'] = 'failed'
+                record['error'] = f"Entradas ausentes: {', '.join(missing)}"
+                print(f"[PIPELINE] {name}: {record['error']}")
+                return
+            async with semaphore:
+                fingerprint = await asyncio.to_thread(self.fingerprint, stage)
+                record['fingerprint'] = fingerprint
+                if name not in forced and self._is_cached(stage, fingerprint):
+                    record['status'] = 'cached'
+                    print(f"[PIPELINE] {name}: sem mudanças, pulando.")
+                    return
+                previous = self.state['stages'].get(name) or {}
+                resume = previous.get('fingerprint') == fingerprint and previous.get('status') == 'running'
+                self.state['stages'][name] = {'fingerprint': fingerprint, 'status': 'running'}
+                self._save_state()
+                print(f"[PIPELINE] {name}: iniciando{' (retomando checkpoint)' if resume else ''}...")
+                ctx = StageContext(stage, resume, shared)
+                sampler.enter(name)
+                t0 = time.time()
+                try:
+                    if inspect.iscoroutinefunction(stage.func):
+                        items = await asyncio.to_thread(asyncio.run, stage.func(ctx))
+                    else:
+                        items = await asyncio.to_thread(stage.func, ctx)
+                except Exception as e:
+                    record['status'] = 'failed'
+                    record['error'] = str(e) if isinstance(e, PipelineAborted) else f"{type(e).__name__}: {e}"
+                    print(f"[PIPELINE] {name}: falhou: {record['error']}")
+                    return
+                finally:
+                    record['wall_time_sec'] = round(time.time() - t0, 3)
+                    sampler.leave(name)
+                    if name in sampler.peaks:
+                        record['peak_rss_mb'] = round(sampler.peaks[name] / (1 << 20), 1)
+                record['status'] = 'ran'
+                if items is not None:
+                    record['items'] = items
+                    record['items_per_sec'] = round(items / record['wall_time_sec'], 2) if record['wall_time_sec'] > 0 else None
+                outputs = {}
+                for path in stage.outputs:
+                    digest = await asyncio.to_thread(self.file_hash, path)
+                    if digest is not None:
+                        outputs[path] = digest
+                self.state['stages'][name] = {'fingerprint': fingerprint, 'status': 'done', 'outputs': outputs, 'finished_at': time.time()}
+                self._save_state()
+                print(f"[PIPELINE] {name}: concluída em {record['wall_time_sec']:.2f}s")
+
+        started_at = datetime.now(timezone.utc)
+        t_run = time.time()
+        sampler.start()
+        try:
+            for name in selected:
+                tasks[name] = asyncio.ensure_future(run_stage(name))
+            await asyncio.gather(*tasks.values())
+        finally:
+            sampler.stop()
+        report = {
+            'run_id': started_at.strftime('%Y%m%dT%H%M%SZ'),
+            'started_at': started_at.isoformat(),
+            'wall_time_sec': round(time.time() - t_run, 3),
+            'selected': selected,
+            'forced': sorted(forced),
+            'stages': [records[name] for name in self.order],
+        }
+        if resource is not None:
+            # Processos filhos (pools da condensação e do draft) não entram no RSS por etapa
+            report['peak_rss_children_mb'] = round(_max_rss(resource.RUSAGE_CHILDREN) / (1 << 20), 1)
+        self._save_state()
+        self.save_report(report)
+        return report
+
+    def save_report(self, report: Dict[str, Any]) -> str:
+        os.makedirs(self.reports_dir, exist_ok=True)
+        path = os.path.join(self.reports_dir, f"run-{report['run_id']}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        report['report_path'] = path
+        return path
+
+    @staticmethod
+    def failed_stages(report: Dict[str, Any]) -> List[str]:
+        """Etapas que falharam ou foram bloqueadas por uma dependência que falhou."""
+        return [r['stage'] for r in report['stages'] if r['status'] in ('failed', 'blocked')]
+
+    @staticmethod
+    def format_report(report: Dict[str, Any]) -> str:
+        lines = [f"{'Etapa':<10} {'Status':<13} {'Tempo (s)':>10} {'Itens':>8} {'Itens/s':>9} {'Pico RSS (MB)':>14}"]
+        for r in report['stages']:
+            lines.append(
+                f"{r['stage']:<10} {r['status']:<13} {r.get('wall_time_sec', ''):>10} {r.get('items', ''):>8} "
+                f"{r.get('items_per_sec') or '':>9} {r.get('peak_rss_mb', ''):>14}"
+            )
+        lines.append(f"Tempo total: {report['wall_time_sec']:.2f}s | Relatório: {report.get('report_path', '')}")
+        return '\n'.join(lines)
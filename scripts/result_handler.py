@@ -14,7 +14,7 @@ class ResultHandler:
         if 'title' in df_results.columns:
             df_results = df_results.drop(columns=['title'])
         # Only keep basic columns and LLM results, drop transcript and subtitles
-        basic_cols = ['yt_id', 'title', 'description']
+        basic_cols = ['yt_id', 'title', 'description', 'view_count', 'duration', 'upload_date']
         # Find which basic columns exist in df
         available_basic_cols = [col for col in basic_cols if col in df.columns]
         # Merge only on the basic columns and LLM results
@@ -33,4 +33,4 @@ class ResultHandler:
     @staticmethod
     def save_results(df: pd.DataFrame, file_path: str):
         df.to_json(file_path, orient='records', indent=2)
-        print(f"Successfully processed and saved {len(df)} videos to {file_path}") 
\ No newline at end of file
+        print(f"Successfully processed and saved {len(df)} videos to {file_path}")
\ No newline at end of file
@@ -1,39 +1,196 @@
 import json
 import os
-from collections import defaultdict
+from collections import Counter
+from typing import Any, Dict, Iterator, Tuple
+import pyarrow.parquet as pq
 from config import Config
+from pipeline_runner import process_pool
 
 DRAFT_TAXONOMY_PATH = os.path.join(Config.DATA_DIR, 'draft_taxonomy.json')
+DRAFT_COUNTS_PATH = os.path.join(Config.DATA_DIR, 'draft_taxonomy_counts.json')
 PROCESSED_VIDEOS_PATH = Config.OUTPUT_JSON_PATH
+PROCESSED_VIDEOS_PARQUET_PATH = Config.PROCESSED_VIDEOS_PARQUET_PATH
+READ_CHUNK_SIZE = 1 << 20
+MIN_SHARD_BYTES = 4 << 20  # Arquivos menores que isso por worker são lidos no próprio processo
+MIN_SHARD_ROWS = 50_000  # Idem para Parquet, em linhas
 
-def insert_path(taxonomy, path):
-    parts = [p.strip() for p in path.split('>')]
-    current = taxonomy
-    for part in parts:
-        if part not in current:
-            current[part] = {}
-        current = current[part]
 
+def iter_json_array(f, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Lê um array JSON de objetos de forma incremental, sem carregar o arquivo inteiro."""
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size).lstrip()
+    if not buf.startswith('['):
+        raise ValueError("Esperado um array JSON")
+    pos = 1
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(buf):
+            buf, pos = f.read(chunk_size), 0
+            if not buf:
+                return
+            continue
+        if buf[pos] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            more = f.read(chunk_size)
+            if not more:
+                raise
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield obj
+        pos = end
 
-def build_draft_taxonomy(processed_videos_path=PROCESSED_VIDEOS_PATH, draft_taxonomy_path=DRAFT_TAXONOMY_PATH):
-    if not os.path.exists(processed_videos_path):
-        print(f"Arquivo não encontrado: {processed_videos_path}")
+
+def iter_parquet_topics(path: str, row_groups=None) -> Iterator[Dict[str, Any]]:
+    """Lê só a coluna hierarchical_topics do Parquet, um row group por vez."""
+    parquet = pq.ParquetFile(path, memory_map=True)
+    for batch in parquet.iter_batches(columns=['hierarchical_topics'], row_groups=row_groups):
+        for topics in batch.column(0).to_pylist():
+            yield {'hierarchical_topics': topics}
+
+
+def iter_processed_videos(path: str) -> Iterator[Dict[str, Any]]:
+    """Registros de vídeos processados, um a um (Parquet, JSONL ou array JSON)."""
+    if path.endswith('.parquet'):
+        yield from iter_parquet_topics(path)
         return
-    with open(processed_videos_path, 'r', encoding='utf-8') as f:
-        videos = json.load(f)
-    taxonomy = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f)
+
+
+def video_node_keys(video: Dict[str, Any]) -> set:
+    """Todos os nós (prefixos dos caminhos) citados por um vídeo; cada nó conta uma vez por vídeo."""
+    keys = set()
+    for path in video.get('hierarchical_topics') or []:
+        if not isinstance(path, str):
+            continue
+        parts = tuple(p.strip() for p in path.split('>') if p.strip())
+        for depth in range(1, len(parts) + 1):
+            keys.add(parts[:depth])
+    return keys
+
+
+def count_nodes(videos) -> Tuple[Counter, int]:
+    counts = Counter()
+    n_videos = 0
     for video in videos:
-        paths = video.get('hierarchical_topics') or []
-        for path in paths:
-            insert_path(taxonomy, path)
+        counts.update(video_node_keys(video))
+        n_videos += 1
+    return counts, n_videos
+
+
+def count_jsonl_shard(args) -> Tuple[Counter, int]:
+    """Conta os nós das linhas que começam no intervalo de bytes [start, end) de um JSONL."""
+    path, start, end = args
+    counts = Counter()
+    n_videos = 0
+    with open(path, 'rb') as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                counts.update(video_node_keys(json.loads(line)))
+                n_videos += 1
+    return counts, n_videos
+
+
+def count_parquet_shard(args) -> Tuple[Counter, int]:
+    """Conta os nós de um subconjunto de row groups de um Parquet."""
+    path, row_groups = args
+    return count_nodes(iter_parquet_topics(path, row_groups))
+
+
+def count_parquet_sharded(path: str, workers: int) -> Tuple[Counter, int]:
+    parquet = pq.ParquetFile(path)
+    n_groups = parquet.num_row_groups
+    n_shards = max(1, min(workers, n_groups, parquet.metadata.num_rows // MIN_SHARD_ROWS))
+    shards = [(path, list(range(i, n_groups, n_shards))) for i in range(n_shards)]
+    if n_shards == 1:
+        return count_parquet_shard(shards[0])
+    counts = Counter()
+    n_videos = 0
+    with process_pool(n_shards) as executor:
+        for shard_counts, shard_videos in executor.map(count_parquet_shard, shards):
+            counts.update(shard_counts)
+            n_videos += shard_videos
+    return counts, n_videos
+
+
+def count_nodes_sharded(path: str, workers: int = None) -> Tuple[Counter, int]:
+    """
+    Conta ocorrências por nó. Parquet é dividido por row groups e JSONL em faixas de bytes, processados
+    em paralelo, e os contadores parciais são mesclados; array JSON é lido em streaming no próprio processo.
+    """
+    workers = workers or Config.DRAFT_WORKERS
+    if path.endswith('.parquet'):
+        return count_parquet_sharded(path, workers)
+    if not path.endswith('.jsonl'):
+        return count_nodes(iter_processed_videos(path))
+    size = os.path.getsize(path)
+    n_shards = max(1, min(workers, size // MIN_SHARD_BYTES))
+    bounds = [size * i // n_shards for i in range(n_shards + 1)]
+    shards = [(path, bounds[i], bounds[i + 1]) for i in range(n_shards)]
+    if n_shards == 1:
+        return count_jsonl_shard(shards[0])
+    counts = Counter()
+    n_videos = 0
+    with process_pool(n_shards) as executor:
+        for shard_counts, shard_videos in executor.map(count_jsonl_shard, shards):
+            counts.update(shard_counts)
+            n_videos += shard_videos
+    return counts, n_videos
+
+
+def build_tree(counts: Counter, min_count: int) -> Dict[str, Any]:
+    """Árvore do draft (folhas = null) só com nós citados por pelo menos min_count vídeos."""
+    taxonomy = {}
+    for parts in sorted(counts, key=len):
+        if counts[parts] < min_count:
+            continue
+        current = taxonomy
+        for part in parts[:-1]:
+            current = current.get(part)
+            if current is None:
+                break
+        else:
+            current.setdefault(parts[-1], {})
     # Converter dicts vazios para null
     def clean(d):
         return {k: clean(v) if v else None for k, v in d.items()}
-    taxonomy = clean(taxonomy)
+    return clean(taxonomy)
+
+
+def build_draft_taxonomy(processed_videos_path=None, draft_taxonomy_path=DRAFT_TAXONOMY_PATH, counts_path=DRAFT_COUNTS_PATH, min_count=None, workers=None):
+    if processed_videos_path is None:
+        # Parquet permite ler só a coluna de tópicos, em paralelo; o checkpoint JSON do LLM fica como fallback
+        processed_videos_path = PROCESSED_VIDEOS_PARQUET_PATH if os.path.exists(PROCESSED_VIDEOS_PARQUET_PATH) else PROCESSED_VIDEOS_PATH
+    if not os.path.exists(processed_videos_path):
+        print(f"Arquivo não encontrado: {processed_videos_path}")
+        return
+    min_count = Config.DRAFT_MIN_NODE_COUNT if min_count is None else min_count
+    counts, n_videos = count_nodes_sharded(processed_videos_path, workers)
+    taxonomy = build_tree(counts, min_count)
+    kept = sum(1 for c in counts.values() if c >= min_count)
     os.makedirs(os.path.dirname(draft_taxonomy_path), exist_ok=True)
     with open(draft_taxonomy_path, 'w', encoding='utf-8') as f:
         json.dump(taxonomy, f, ensure_ascii=False, indent=2)
-    print(f"Draft taxonomy salva em {draft_taxonomy_path}")
+    with open(counts_path, 'w', encoding='utf-8') as f:
+        json.dump({' > '.join(parts): c for parts, c in sorted(counts.items())}, f, ensure_ascii=False, indent=2)
+    print(f"Draft taxonomy salva em {draft_taxonomy_path} ({n_videos} vídeos, {kept}/{len(counts)} nós com >= {min_count} ocorrências)")
+    print(f"Contagens por nó salvas em {counts_path}")
+    return n_videos
 
 if __name__ == "__main__":
-    build_draft_taxonomy() 
\ No newline at end of file
+    build_draft_taxonomy()
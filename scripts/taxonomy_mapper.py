@@ -1,10 +1,12 @@
 import json
 import os
 from typing import Dict, List, Any
+from config import Config
+from artifacts import read_taxonomy_map, read_video_records, write_taxonomy_map
 
 CANONICAL_TAXONOMY_PATH = os.path.join('data', 'canonical_taxonomy.json')
-PROCESSED_VIDEOS_PATH = os.path.join('data', 'processed_videos.json')
-OUTPUT_MAP_PATH = os.path.join('data', 'video_to_taxonomy_map.json')
+PROCESSED_VIDEOS_PATH = Config.PROCESSED_VIDEOS_PARQUET_PATH
+OUTPUT_MAP_PATH = Config.TAXONOMY_MAP_PARQUET_PATH
 
 # --- Etapa 1: Atribuir IDs únicos à taxonomia canônica ---
 def add_ids_to_taxonomy(taxonomy: Dict[str, Any], path: List[str] = None) -> Dict[str, Any]:
@@ -41,23 +43,85 @@ def build_path_to_id_map(taxonomy: Dict[str, Any], path: List[str] = None, resul
                 build_path_to_id_map({subkey: subval}, current_path, result)
     return result
 
+# --- Etapa 2b: Mapa de ID para IDs ancestrais (incluindo o próprio nó) ---
+def build_id_to_ancestors_map(taxonomy: Dict[str, Any], ancestors: List[str] = None, result: Dict[str, List[str]] = None) -> Dict[str, List[str]]:
+    """
+    Para cada nó da taxonomia com IDs, retorna a lista [raiz, ..., pai, nó].
+    Usado para filtrar uma sub-árvore inteira com um único match no payload (taxonomy_ancestor_ids).
+    """
+    if ancestors is None:
+        ancestors = []
+    if result is None:
+        result = {}
+    for key, value in taxonomy.items():
+        if key == '__id__' or not isinstance(value, dict):
+            continue
+        node_id = value.get('__id__')
+        current = ancestors + [node_id] if node_id else ancestors
+        if node_id:
+            result[node_id] = current
+        build_id_to_ancestors_map(value, current, result)
+    return result
+
+def expand_with_ancestors(taxonomy_ids: List[str], id_to_ancestors: Dict[str, List[str]]) -> List[str]:
+    """Une os ancestrais de todos os IDs atribuídos a um vídeo, sem duplicatas e preservando a ordem."""
+    expanded = {}
+    for node_id in taxonomy_ids:
+        for ancestor_id in id_to_ancestors.get(node_id, [node_id]):
+            expanded[ancestor_id] = None
+    return list(expanded)
+
+# --- Etapa 2c: Contagem de vídeos por nó (inclusiva da sub-árvore) ---
+def compute_node_counts(video_to_taxonomy_map: Dict[str, List[str]], id_to_ancestors: Dict[str, List[str]]) -> Dict[str, int]:
+    """
+    Conta, para cada nó, quantos vídeos estão nele ou em algum descendente.
+    Cada vídeo conta uma única vez por nó, mesmo com vários caminhos na mesma sub-árvore.
+    """
+    counts: Dict[str, int] = {}
+    for taxonomy_ids in video_to_taxonomy_map.values():
+        for node_id in expand_with_ancestors(taxonomy_ids, id_to_ancestors):
+            counts[node_id] = counts.get(node_id, 0) + 1
+    return counts
+
+def annotate_taxonomy_with_counts(taxonomy: Dict[str, Any], counts: Dict[str, int], path: List[str] = None) -> Dict[str, Any]:
+    """
+    Copia a taxonomia canônica (nomes -> filhos|null) adicionando '__count__' a cada nó.
+    Folhas passam a ser {'__count__': n} em vez de null.
+    """
+    if path is None:
+        path = []
+    annotated = {}
+    for key, value in taxonomy.items():
+        current_path = path + [key]
+        node_id = '-'.join([p.lower().replace(' ', '_') for p in current_path])
+        node = annotate_taxonomy_with_counts(value, counts, current_path) if isinstance(value, dict) else {}
+        node['__count__'] = counts.get(node_id, 0)
+        annotated[key] = node
+    return annotated
+
 # --- Etapa 3: Mapear vídeos para IDs da taxonomia ---
-def map_videos_to_taxonomy(processed_videos: List[Dict[str, Any]], path_to_id: Dict[str, str], checkpoint_path=OUTPUT_MAP_PATH) -> Dict[str, List[str]]:
+def map_videos_to_taxonomy(processed_videos: List[Dict[str, Any]], path_to_id: Dict[str, str], checkpoint_path=OUTPUT_MAP_PATH,
+                           checkpoint_every: int = None) -> Dict[str, List[str]]:
+    """
+    Mapeia os caminhos de cada vídeo para IDs da taxonomia. O resultado (também o checkpoint) é salvo em
+    Parquet a cada checkpoint_every vídeos mapeados e ao final.
+    """
+    checkpoint_every = checkpoint_every or Config.TAXONOMY_MAP_CHECKPOINT_EVERY
     # Checkpoint: carregar progresso parcial
     video_map = {}
     if os.path.exists(checkpoint_path):
         try:
-            with open(checkpoint_path, 'r', encoding='utf-8') as f:
-                video_map = json.load(f)
+            video_map = read_taxonomy_map(checkpoint_path)
             print(f"[MAPPER] Checkpoint: {len(video_map)} vídeos já mapeados serão pulados.")
         except Exception as e:
             print(f"[MAPPER] Falha ao ler checkpoint, começando do zero. Erro: {e}")
             video_map = {}
+    pending = 0
     for video in processed_videos:
         yt_id = video.get('yt_id')
         if yt_id in video_map:
             continue  # Pular vídeos já mapeados
-        topics = video.get('hierarchical_topics', [])
+        topics = video.get('hierarchical_topics') or []
         ids = []
         for topic_path in topics:
             topic_path_norm = topic_path.strip().lower()
@@ -66,9 +130,11 @@ def map_videos_to_taxonomy(processed_videos: List[Dict[str, Any]], path_to_id: D
                 ids.append(node_id)
         if ids:
             video_map[yt_id] = ids
-            # Salvar progresso incremental
-            with open(checkpoint_path, 'w', encoding='utf-8') as f:
-                json.dump(video_map, f, indent=2, ensure_ascii=False)
+            pending += 1
+            if pending >= checkpoint_every:
+                write_taxonomy_map(video_map, checkpoint_path)
+                pending = 0
+    write_taxonomy_map(video_map, checkpoint_path)
     return video_map
 
 if __name__ == '__main__':
@@ -79,12 +145,8 @@ if __name__ == '__main__':
     taxonomy_with_ids = add_ids_to_taxonomy(canonical_taxonomy)
     # Construir mapa de caminho para ID
     path_to_id = build_path_to_id_map(taxonomy_with_ids)
-    # Carregar vídeos processados
-    with open(PROCESSED_VIDEOS_PATH, 'r', encoding='utf-8') as f:
-        processed_videos = json.load(f)
-    # Mapear vídeos
+    # Carregar vídeos processados (só as colunas usadas)
+    processed_videos = read_video_records(PROCESSED_VIDEOS_PATH, columns=['yt_id', 'hierarchical_topics'])
+    # Mapear vídeos (o resultado é salvo em OUTPUT_MAP_PATH)
     video_to_taxonomy_map = map_videos_to_taxonomy(processed_videos, path_to_id)
-    # Salvar resultado
-    with open(OUTPUT_MAP_PATH, 'w', encoding='utf-8') as f:
-        json.dump(video_to_taxonomy_map, f, indent=2, ensure_ascii=False)
     print(f"Mapeamento salvo em {OUTPUT_MAP_PATH} ({len(video_to_taxonomy_map)} vídeos mapeados)") 
\ No newline at end of file
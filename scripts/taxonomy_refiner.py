@@ -1,7 +1,9 @@
+import asyncio
 import json
 import os
 import google.generativeai as genai
 from config import Config
+from llm_cache import get_llm_cache
 import re
 import time
 
@@ -23,11 +25,57 @@ def prompt_top_level_refinement(categories):
     )
     return prompt
 
-def call_llm(prompt, model_name=None):
-    genai.configure(api_key=Config.API_KEY)
-    model = genai.GenerativeModel(model_name or Config.LLM_MODEL_TAXONOMY)
-    response = model.generate_content(prompt)
-    return response.text
+_models = {}
+
+def get_model(model_name=None):
+    """Configura o genai uma única vez e reaproveita o GenerativeModel por nome."""
+    model_name = model_name or Config.LLM_MODEL_TAXONOMY
+    if not _models:
+        genai.configure(api_key=Config.API_KEY)
+    if model_name not in _models:
+        _models[model_name] = genai.GenerativeModel(model_name)
+    return _models[model_name]
+
+def extract_usage(response):
+    """Tokens reais de input/output a partir de usage_metadata da resposta do Gemini."""
+    usage = getattr(response, 'usage_metadata', None)
+    input_tokens = getattr(usage, 'prompt_token_count', 0) if usage else 0
+    output_tokens = getattr(usage, 'candidates_token_count', 0) if usage else 0
+    return input_tokens or 0, output_tokens or 0
+
+def llm_cost(input_tokens, output_tokens):
+    input_cost = (input_tokens / 1_000_000) * Config.LLM_TAXONOMY_INPUT_COST_PER_M
+    output_cost = (output_tokens / 1_000_000) * Config.LLM_TAXONOMY_OUTPUT_COST_PER_M
+    return input_cost + output_cost
+
+def _try_parse(parse, text):
+    try:
+        return parse(text)
+    except Exception:
+        return None
+
+async def call_llm_async(prompt, parse, model_name=None):
+    """
+    Chamada assíncrona ao Gemini. Retorna (parse(texto), input_tokens, output_tokens, tempo), com None no
+    lugar do resultado se parse falhar. Só respostas que passam por parse vão para o cache: uma resposta
+    malformada não é reaproveitada nas próximas execuções (e uma já em cache que não passa é refeita).
+    Respostas em cache não consomem tokens (retornam 0 tokens e 0s).
+    """
+    model_name = model_name or Config.LLM_MODEL_TAXONOMY
+    cache = get_llm_cache()
+    cache_key = cache.make_key(model_name, prompt) if cache else None
+    cached = cache.get(cache_key) if cache else None
+    if cached:
+        result = _try_parse(parse, cached["text"])
+        if result is not None:
+            return result, 0, 0, 0.0
+    t0 = time.time()
+    response = await get_model(model_name).generate_content_async(prompt)
+    input_tokens, output_tokens = extract_usage(response)
+    result = _try_parse(parse, response.text)
+    if cache and result is not None:
+        cache.set(cache_key, model_name, response.text, input_tokens, output_tokens, llm_cost(input_tokens, output_tokens))
+    return result, input_tokens, output_tokens, time.time() - t0
 
 def clean_json_response(response_text):
     cleaned = re.sub(r"^```json|^```|```$", "", response_text.strip(), flags=re.MULTILINE).strip()
@@ -42,17 +90,27 @@ def extract_json_from_text(text):
         return json_block
     return text  # fallback: retorna o texto original
 
-def refine_top_categories(draft_taxonomy):
+def parse_top_categories(response_text):
+    return json.loads(clean_json_response(response_text))
+
+def parse_subtree(response_text):
+    """Sub-árvore refinada (dict); levanta ValueError se a resposta não for um objeto JSON."""
+    refined = json.loads(extract_json_from_text(clean_json_response(response_text)))
+    if not isinstance(refined, dict):
+        raise ValueError("a sub-árvore refinada não é um objeto JSON")
+    return refined
+
+async def refine_top_categories(draft_taxonomy):
+    """Retorna (categorias refinadas, total_tokens, custo, tempo)."""
     categories = get_top_level_categories(draft_taxonomy)
     prompt = prompt_top_level_refinement(categories)
-    response = call_llm(prompt)
-    cleaned = clean_json_response(response)
-    try:
-        refined = json.loads(cleaned)
-    except Exception:
+    refined, input_tokens, output_tokens, elapsed = await call_llm_async(prompt, parse_top_categories)
+    cost = llm_cost(input_tokens, output_tokens)
+    print(f"[REFINER] Topo | input_tokens: {input_tokens} | output_tokens: {output_tokens} | custo: ${cost:.8f} | tempo: {elapsed:.2f}s")
+    if refined is None:
         print("Erro ao decodificar resposta do LLM para topo. Usando lista original.")
         refined = categories
-    return refined
+    return refined, input_tokens + output_tokens, float(f"{cost:.8f}"), elapsed
 
 # --- Passada 2: Refinamento das sub-árvores ---
 def prompt_subtree_refinement(category, subtree):
@@ -74,26 +132,64 @@ def prompt_subtree_refinement(category, subtree):
     )
     return prompt
 
-def refine_subtree(category, subtree):
-    prompt = prompt_subtree_refinement(category, subtree)
-    t0 = time.time()
-    response = call_llm(prompt)
-    elapsed = time.time() - t0
-    input_tokens = len(prompt.split())
-    output_tokens = len(response.split())
-    total_tokens = input_tokens + output_tokens
-    # Novo cálculo de custo
-    input_cost = (input_tokens / 1_000_000) * Config.LLM_TAXONOMY_INPUT_COST_PER_M
-    output_cost = (output_tokens / 1_000_000) * Config.LLM_TAXONOMY_OUTPUT_COST_PER_M
-    cost = input_cost + output_cost
-    print(f"[REFINER] Categoria: {category} | input_tokens: {input_tokens} | output_tokens: {output_tokens} | total_tokens: {total_tokens} | custo: ${cost:.8f} | tempo: {elapsed:.2f}s")
-    cleaned = clean_json_response(response)
-    json_candidate = extract_json_from_text(cleaned)
-    try:
-        refined = json.loads(json_candidate)
-    except Exception as e:
+def split_subtree(subtree, max_chars=None):
+    """
+    Divide uma sub-árvore grande em pedaços (agrupando filhos de primeiro nível) cujo JSON
+    não exceda max_chars. Um filho maior que o limite sozinho vira um pedaço próprio.
+    """
+    max_chars = max_chars or Config.TAXONOMY_CHUNK_MAX_CHARS
+    if not isinstance(subtree, dict) or len(json.dumps(subtree, ensure_ascii=False)) <= max_chars:
+        return [subtree]
+    chunks = []
+    current = {}
+    current_size = 0
+    for key, value in subtree.items():
+        size = len(json.dumps({key: value}, ensure_ascii=False))
+        if current and current_size + size > max_chars:
+            chunks.append(current)
+            current, current_size = {}, 0
+        current[key] = value
+        current_size += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+def merge_subtrees(target, source):
+    """Merge recursivo de sub-árvores refinadas (null = folha; dict vence null)."""
+    for key, value in (source or {}).items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_subtrees(target[key], value)
+        elif isinstance(value, dict) or key not in target:
+            target[key] = value
+    return target
+
+async def refine_chunk(category, chunk, semaphore):
+    """Refina um pedaço de sub-árvore. Retorna (refinado, input_tokens, output_tokens, tempo)."""
+    prompt = prompt_subtree_refinement(category, chunk)
+    async with semaphore:
+        refined, input_tokens, output_tokens, elapsed = await call_llm_async(prompt, parse_subtree)
+    if refined is None:
         print(f"[REFINER] Erro ao decodificar resposta do LLM para '{category}'. Usando sub-árvore original.")
-        refined = subtree
+        refined = chunk
+    return refined, input_tokens, output_tokens, elapsed
+
+async def refine_subtree(category, subtree, semaphore):
+    """
+    Refina a sub-árvore de uma categoria; sub-árvores grandes são divididas em pedaços
+    refinados em paralelo (limitados pelo semáforo) e depois mesclados.
+    """
+    chunks = split_subtree(subtree)
+    results = await asyncio.gather(*(refine_chunk(category, chunk, semaphore) for chunk in chunks))
+    refined = {}
+    for chunk_refined, _, _, _ in results:
+        if isinstance(chunk_refined, dict):
+            merge_subtrees(refined, chunk_refined)
+    input_tokens = sum(r[1] for r in results)
+    output_tokens = sum(r[2] for r in results)
+    elapsed = sum(r[3] for r in results)
+    total_tokens = input_tokens + output_tokens
+    cost = llm_cost(input_tokens, output_tokens)
+    print(f"[REFINER] Categoria: {category} | pedaços: {len(chunks)} | input_tokens: {input_tokens} | output_tokens: {output_tokens} | total_tokens: {total_tokens} | custo: ${cost:.8f} | tempo: {elapsed:.2f}s")
     return refined, total_tokens, float(f"{cost:.8f}"), elapsed
 
 def aggregate_subtrees_for_canonical(cat, top_categories, draft):
@@ -133,7 +229,15 @@ def aggregate_subtrees_for_canonical(cat, top_categories, draft):
                         merged[k].update(v)
     return merged
 
-def build_canonical_taxonomy(draft_taxonomy_path=DRAFT_TAXONOMY_PATH, canonical_taxonomy_path=CANONICAL_TAXONOMY_PATH, return_stats=False):
+def save_checkpoint(canonical, canonical_taxonomy_path):
+    """Escrita atômica (arquivo temporário + rename): um checkpoint nunca fica pela metade."""
+    os.makedirs(os.path.dirname(canonical_taxonomy_path), exist_ok=True)
+    tmp_path = f"{canonical_taxonomy_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(canonical, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, canonical_taxonomy_path)
+
+async def build_canonical_taxonomy_async(draft_taxonomy_path=DRAFT_TAXONOMY_PATH, canonical_taxonomy_path=CANONICAL_TAXONOMY_PATH, return_stats=False, concurrency_limit=None):
     print("\n[REFINER] Iniciando refinamento de taxonomia...")
     t0 = time.time()
     if not os.path.exists(draft_taxonomy_path):
@@ -143,7 +247,7 @@ def build_canonical_taxonomy(draft_taxonomy_path=DRAFT_TAXONOMY_PATH, canonical_
         return
     with open(draft_taxonomy_path, 'r', encoding='utf-8') as f:
         draft = json.load(f)
-    top_categories = refine_top_categories(draft)
+    top_categories, total_tokens, total_cost, total_time = await refine_top_categories(draft)
     # Checkpoint: carregar progresso parcial
     canonical = {}
     if os.path.exists(canonical_taxonomy_path):
@@ -154,25 +258,29 @@ def build_canonical_taxonomy(draft_taxonomy_path=DRAFT_TAXONOMY_PATH, canonical_
         except Exception as e:
             print(f"[REFINER] Falha ao ler checkpoint, começando do zero. Erro: {e}")
             canonical = {}
-    total_tokens = 0
-    total_cost = 0.0
-    total_time = 0
-    for cat in top_categories:
-        if cat in canonical:
-            continue  # Pular categorias já refinadas
+    semaphore = asyncio.Semaphore(concurrency_limit or Config.TAXONOMY_CONCURRENCY_LIMIT)
+    checkpoint_lock = asyncio.Lock()
+    stats = {"total_tokens": total_tokens, "total_cost": total_cost, "total_time": total_time}
+
+    async def refine_category(cat):
         subtree = aggregate_subtrees_for_canonical(cat, top_categories, draft)
-        refined, tokens, cost, elapsed = refine_subtree(cat, subtree)
-        canonical[cat] = refined
-        total_tokens += tokens
-        total_cost += cost
-        total_time += elapsed
-        # Salvar progresso incremental
-        os.makedirs(os.path.dirname(canonical_taxonomy_path), exist_ok=True)
-        with open(canonical_taxonomy_path, 'w', encoding='utf-8') as f:
-            json.dump(canonical, f, ensure_ascii=False, indent=2)
-    print(f"[REFINER] Refinamento concluído em {time.time()-t0:.2f}s | Total tokens: {total_tokens} | Custo estimado: ${total_cost:.8f} | Tempo total LLM: {total_time:.2f}s\n")
+        refined, tokens, cost, elapsed = await refine_subtree(cat, subtree, semaphore)
+        # Cada categoria concluída é gravada sob lock, sobre o estado acumulado de todas as tarefas
+        async with checkpoint_lock:
+            canonical[cat] = refined
+            stats["total_tokens"] += tokens
+            stats["total_cost"] += cost
+            stats["total_time"] += elapsed
+            save_checkpoint(canonical, canonical_taxonomy_path)
+
+    pending = [cat for cat in top_categories if cat not in canonical]  # Pular categorias já refinadas
+    await asyncio.gather(*(refine_category(cat) for cat in pending))
+    print(f"[REFINER] Refinamento concluído em {time.time()-t0:.2f}s | Total tokens: {stats['total_tokens']} | Custo estimado: ${stats['total_cost']:.8f} | Tempo total LLM: {stats['total_time']:.2f}s\n")
     if return_stats:
-        return {"total_tokens": total_tokens, "total_cost": float(f"{total_cost:.8f}"), "total_time": total_time}
+        return {"total_tokens": stats["total_tokens"], "total_cost": float(f"{stats['total_cost']:.8f}"), "total_time": stats["total_time"]}
+
+def build_canonical_taxonomy(draft_taxonomy_path=DRAFT_TAXONOMY_PATH, canonical_taxonomy_path=CANONICAL_TAXONOMY_PATH, return_stats=False):
+    return asyncio.run(build_canonical_taxonomy_async(draft_taxonomy_path, canonical_taxonomy_path, return_stats))
 
 if __name__ == "__main__":
-    build_canonical_taxonomy() 
\ No newline at end of file
+    build_canonical_taxonomy()
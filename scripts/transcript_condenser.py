@@ -0,0 +1,169 @@
+import os
+import re
+import time
+import zlib
+import numpy as np
+from functools import partial
+from typing import List
+from config import Config
+from pipeline_runner import process_pool
+
+# Marcações de legenda e hesitações que não carregam conteúdo
+FILLER_RE = re.compile(
+    r"\[[^\]]{0,30}\]|\((?:music|applause|laughter|laughs|inaudible)\)|♪+|>>+|"
+    r"\b(?:u+h+|u+m+|uhm+|e+r+m+|h+m+|m+h?m+|a+h+)\b[,.]?",
+    re.IGNORECASE
+)
+WHITESPACE_RE = re.compile(r"\s+")
+NORMALIZE_RE = re.compile(r"[^\w]+")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+WORD_RE = re.compile(r"[a-zà-ÿ0-9']+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it its just like me my "
+    "not of on or our so that the their them then there they this to was we were what when which who "
+    "will with you your yeah okay oh gonna going got get know really right think".split()
+)
+MAX_SENTENCE_WORDS = 40  # Legendas automáticas sem pontuação são quebradas em janelas desse tamanho
+WINDOW_WORDS = 25
+MIN_SENTENCE_WORDS = 4
+MIN_OVERLAP_WORDS = 3
+HASH_FEATURES = 1024  # Potência de 2: termos são mapeados por hash (crc32) para colunas
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def strip_filler(text: str) -> str:
+    return WHITESPACE_RE.sub(" ", FILLER_RE.sub(" ", text)).strip()
+
+
+def dedupe_segments(segments: List[str]) -> List[str]:
+    """
+    Remove segmentos de legenda repetidos (em qualquer ponto da transcrição) e a sobreposição
+    típica das legendas "rolantes", em que cada linha repete o final da anterior.
+    """
+    kept, kept_words, seen = [], [], set()
+    for segment in segments:
+        text = strip_filler(str(segment))
+        words = text.split()
+        if not words:
+            continue
+        norm = NORMALIZE_RE.sub(" ", text.lower()).strip()
+        if not norm or norm in seen:
+            continue
+        if kept:
+            prev_norm = kept_words[-1]
+            cur_norm = norm.split()
+            # Linha atual estende a anterior: substitui
+            if len(cur_norm) > len(prev_norm) and cur_norm[:len(prev_norm)] == prev_norm:
+                seen.add(norm)
+                kept[-1], kept_words[-1] = text, cur_norm
+                continue
+            # Linha atual começa com o final da anterior: descarta a parte repetida
+            for k in range(min(len(prev_norm), len(cur_norm) - 1), MIN_OVERLAP_WORDS - 1, -1):
+                if prev_norm[-k:] == cur_norm[:k]:
+                    words = words[k:]
+                    cur_norm = cur_norm[k:]
+                    break
+            if not words:
+                continue
+        seen.add(norm)
+        kept.append(" ".join(words))
+        kept_words.append(NORMALIZE_RE.sub(" ", " ".join(words).lower()).split())
+    return kept
+
+
+def split_sentences(text: str) -> List[str]:
+    sentences = []
+    for piece in SENTENCE_SPLIT_RE.split(text):
+        words = piece.split()
+        if len(words) <= MAX_SENTENCE_WORDS:
+            sentences.append(piece)
+        else:
+            sentences.extend(" ".join(words[i:i + WINDOW_WORDS]) for i in range(0, len(words), WINDOW_WORDS))
+    return [s for s in sentences if len(s.split()) >= MIN_SENTENCE_WORDS]
+
+
+def sentence_matrix(sentences: List[str]) -> np.ndarray:
+    """Matriz TF-IDF (log-tf, hashing) com linhas normalizadas: uma linha por sentença."""
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for word in WORD_RE.findall(sentence.lower()):
+            if word not in STOPWORDS:
+                rows.append(i)
+                cols.append(zlib.crc32(word.encode("utf-8")) & (HASH_FEATURES - 1))
+    flat = np.asarray(rows, dtype=np.int64) * HASH_FEATURES + np.asarray(cols, dtype=np.int64)
+    matrix = np.bincount(flat, minlength=len(sentences) * HASH_FEATURES).reshape(len(sentences), HASH_FEATURES).astype(np.float32)
+    doc_freq = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1.0 + len(sentences)) / (1.0 + doc_freq)) + 1.0
+    matrix = np.log1p(matrix) * idf.astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-9)
+
+
+def select_sentences(sentences: List[str], token_budget: int) -> List[str]:
+    """
+    Seleção extrativa: pontua cada sentença pela similaridade com o centróide da transcrição e
+    escolhe, em rodízio, as melhores de cada trecho (bins por posição) para cobrir o vídeo inteiro.
+    A ordem original é preservada.
+    """
+    tokens = np.fromiter((estimate_tokens(s) + 1 for s in sentences), dtype=np.int64, count=len(sentences))
+    matrix = sentence_matrix(sentences)
+    centroid = matrix.sum(axis=0)
+    centroid /= max(float(np.linalg.norm(centroid)), 1e-9)
+    scores = matrix @ centroid
+    n_bins = int(min(len(sentences), max(1, token_budget // max(int(np.median(tokens)), 1))))
+    bins = (np.arange(len(sentences)) * n_bins) // len(sentences)
+    by_bin = np.lexsort((-scores, bins))
+    sorted_bins = bins[by_bin]
+    rank_in_bin = np.empty(len(sentences), dtype=np.int64)
+    rank_in_bin[by_bin] = np.arange(len(sentences)) - np.searchsorted(sorted_bins, sorted_bins, side="left")
+    order = np.lexsort((-scores, rank_in_bin))
+    fits = np.cumsum(tokens[order]) <= token_budget
+    chosen = np.sort(order[fits])
+    return [sentences[i] for i in chosen]
+
+
+def condense_segments(segments: List[str], token_budget: int) -> str:
+    """Transcrição (lista de segmentos de legenda) condensada para caber em token_budget."""
+    text = " ".join(dedupe_segments(segments))
+    if estimate_tokens(text) <= token_budget:
+        return text
+    sentences = split_sentences(text)
+    if not sentences:
+        return text[:token_budget * CHARS_PER_TOKEN]
+    return " ".join(select_sentences(sentences, token_budget))
+
+
+def condense_transcripts(segment_lists: List[List[str]], token_budget: int = None, workers: int = None) -> List[str]:
+    """Condensa várias transcrições em paralelo (process pool); lotes pequenos rodam no próprio processo."""
+    token_budget = token_budget or Config.TRANSCRIPT_TOKEN_BUDGET
+    workers = workers or Config.TRANSCRIPT_CONDENSE_WORKERS
+    condense = partial(condense_segments, token_budget=token_budget)
+    if workers <= 1 or len(segment_lists) < workers * 4:
+        return [condense(segments) for segments in segment_lists]
+    chunksize = max(1, len(segment_lists) // (workers * 8))
+    with process_pool(workers) as executor:
+        return list(executor.map(condense, segment_lists, chunksize=chunksize))
+
+
+def condense_dataframe(df, token_budget: int = None, workers: int = None):
+    """Adiciona a coluna condensed_transcript a partir de transcript_segments e imprime a redução obtida."""
+    t0 = time.time()
+    df['condensed_transcript'] = condense_transcripts(df['transcript_segments'].tolist(), token_budget, workers)
+    before = int(df['full_transcript'].str.len().sum())
+    after = int(df['condensed_transcript'].str.len().sum())
+    ratio = after / before if before else 0.0
+    print(f"[CONDENSER] {len(df)} transcrições condensadas: ~{before // CHARS_PER_TOKEN} -> ~{after // CHARS_PER_TOKEN} tokens ({ratio:.1%}) [Tempo: {time.time()-t0:.2f}s]")
+    return df.drop(columns=['transcript_segments'])
+
+
+if __name__ == '__main__':
+    import json
+    from data_handler import DataHandler
+    raw_df = DataHandler.load_data(Config.INPUT_CSV_PATH, Config.SAMPLE_SIZE)
+    prepared_df = condense_dataframe(DataHandler.prepare_data(raw_df, Config.TRANSCRIPT_MIN_LENGTH))
+    sample = prepared_df[['yt_id', 'condensed_transcript']].head(3).to_dict(orient='records')
+    print(json.dumps(sample, indent=2, ensure_ascii=False))